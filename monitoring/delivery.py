@@ -0,0 +1,365 @@
+"""Async HTTP delivery for notifiers
+
+- DeliveryPool: one pooled aiohttp session shared by every notifier
+  (keep-alive connections, a cap on connections per host)
+- fan_out() posts to many destinations concurrently, so a slow endpoint
+  costs its own timeout, not N x timeout
+- Failed deliveries (network errors, timeouts, 429, 5xx) go to a bounded
+  retry queue and are re-sent with jittered exponential backoff (429
+  honours Retry-After / Telegram's retry_after). Other 4xx are permanent
+- Per-destination metrics: sent / failed / retried / dropped, average and
+  max latency, last error (pool.stats())
+- BackgroundDelivery runs a pool on its own event-loop thread for
+  synchronous callers such as the Flask bot
+
+Run `python -m monitoring.delivery` from the repository root for a demo
+against local stand-in endpoints (running the file directly puts
+monitoring/ first on sys.path, where email.py shadows the standard library
+module aiohttp needs).
+
+Usage:
+    async with DeliveryPool() as pool:
+        await pool.fan_out([(url, payload, headers) for url in urls])
+        print(pool.stats())
+"""
+
+import asyncio
+import heapq
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+try:
+    import aiohttp
+except Exception:
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+
+class DestinationStats:
+    __slots__ = ('sent', 'failed', 'retried', 'dropped', 'latency_total', 'latency_max', 'last_error')
+
+    def __init__(self):
+        self.sent = self.failed = self.retried = self.dropped = 0
+        self.latency_total = self.latency_max = 0.0
+        self.last_error = None
+
+    def observe(self, latency):
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def as_dict(self):
+        attempts = self.sent + self.failed
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'dropped': self.dropped,
+            'latency_avg_ms': round(self.latency_total / attempts * 1000, 2) if attempts else None,
+            'latency_max_ms': round(self.latency_max * 1000, 2),
+            'last_error': self.last_error,
+        }
+
+
+class DeliveryError(Exception):
+    def __init__(self, message, retry=True, retry_after=None):
+        super().__init__(message)
+        self.retry = retry
+        self.retry_after = retry_after
+
+
+def _label(url):
+    # never put the full URL (it may embed a bot token) into metrics
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'
+
+
+class DeliveryPool:
+    def __init__(self, concurrency=20, limit_per_host=10, timeout=5.0, retries=5, backoff=0.5,
+                 max_backoff=60.0, retry_queue_size=1000, keepalive_timeout=60.0):
+        """timeout is per attempt; a delivery is tried at most retries + 1
+        times. retry_queue_size bounds deliveries waiting for a retry;
+        beyond it new failures are dropped (and counted)."""
+        if aiohttp is None:
+            raise RuntimeError('aiohttp is required for DeliveryPool')
+        self.concurrency = concurrency
+        self.limit_per_host = limit_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_queue_size = retry_queue_size
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._keepalive_timeout = keepalive_timeout
+        self._session = None
+        self._retry_heap = []  # (due, seq, attempt, method, url, kwargs, destination)
+        self._seq = 0
+        self._retry_wakeup = None
+        self._retry_task = None
+        self._inflight_retries = set()
+        self._stats = {}
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.limit_per_host,
+                                             keepalive_timeout=self._keepalive_timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self._timeout)
+        if self._retry_task is None:
+            self._retry_wakeup = asyncio.Event()
+            self._retry_task = asyncio.ensure_future(self._retry_loop())
+
+    async def close(self, drain_timeout=0.0):
+        """Stop retrying and close the session. With drain_timeout > 0, wait
+        up to that long for queued retries first."""
+        deadline = time.monotonic() + drain_timeout
+        while (self._retry_heap or self._inflight_retries) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._retry_task is not None:
+            self._retry_task.cancel()
+            await asyncio.gather(self._retry_task, *self._inflight_retries, return_exceptions=True)
+            self._retry_task = None
+        if self._session is not None:
+            await self._session.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # -- metrics -----------------------------------------------------------
+
+    def _dest(self, destination):
+        s = self._stats.get(destination)
+        if s is None:
+            s = self._stats[destination] = DestinationStats()
+        return s
+
+    def stats(self):
+        """{destination: metrics} plus the retry queue depth."""
+        out = {d: s.as_dict() for d, s in self._stats.items()}
+        return {'destinations': out, 'retry_queue': len(self._retry_heap)}
+
+    # -- delivery ----------------------------------------------------------
+
+    async def _attempt(self, method, url, kwargs, destination):
+        stats = self._dest(destination)
+        t0 = time.perf_counter()
+        try:
+            async with self._session.request(method, url, **kwargs) as resp:
+                text = await resp.text()
+                if resp.status == 429 or resp.status >= 500:
+                    retry_after = None
+                    try:
+                        retry_after = float(resp.headers.get('Retry-After', ''))
+                    except ValueError:
+                        try:
+                            # Telegram: {"parameters": {"retry_after": 5}}
+                            retry_after = float((await resp.json(content_type=None))['parameters']['retry_after'])
+                        except Exception:
+                            pass
+                    raise DeliveryError(f'HTTP {resp.status}', retry=True, retry_after=retry_after)
+                if resp.status >= 400:
+                    raise DeliveryError(f'HTTP {resp.status}: {text[:200]}', retry=False)
+                stats.sent += 1
+                stats.observe(time.perf_counter() - t0)
+                try:
+                    return True, await resp.json(content_type=None)
+                except Exception:
+                    return True, text
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            stats.failed += 1
+            stats.observe(time.perf_counter() - t0)
+            stats.last_error = str(e) or type(e).__name__
+            raise
+
+    async def request(self, method, url, destination=None, retry=True, **kwargs):
+        """One attempt now; on a retryable failure the delivery is queued
+        for retry in the background. Returns (ok, response body or error)."""
+        await self.start()
+        destination = destination or _label(url)
+        try:
+            return await self._attempt(method, url, kwargs, destination)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            transient = not isinstance(e, DeliveryError) or e.retry
+            if retry and transient:
+                self._schedule_retry(1, method, url, kwargs, destination, getattr(e, 'retry_after', None))
+            return False, str(e) or type(e).__name__
+
+    async def post(self, url, json=None, data=None, headers=None, destination=None, retry=True):
+        kwargs = {'headers': headers}
+        if json is not None:
+            kwargs['json'] = json
+        if data is not None:
+            kwargs['data'] = data
+        return await self.request('POST', url, destination=destination, retry=retry, **kwargs)
+
+    async def fan_out(self, deliveries):
+        """POST concurrently. deliveries: iterable of (url, json_payload,
+        headers) or (url, json_payload, headers, destination label);
+        returns [(ok, body)] in the same order."""
+        return await asyncio.gather(*[self.post(d[0], json=d[1], headers=d[2], destination=d[3] if len(d) > 3 else None)
+                                      for d in deliveries])
+
+    # -- retry queue -------------------------------------------------------
+
+    def _delay(self, attempt, retry_after):
+        if retry_after is not None:
+            return min(self.max_backoff, retry_after)
+        base = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return base / 2 + random.random() * base / 2
+
+    def _schedule_retry(self, attempt, method, url, kwargs, destination, retry_after=None):
+        stats = self._dest(destination)
+        if attempt > self.retries or len(self._retry_heap) >= self.retry_queue_size:
+            stats.dropped += 1
+            logger.warning('dropping delivery to %s after %d attempts', destination, attempt)
+            return
+        self._seq += 1
+        due = time.monotonic() + self._delay(attempt, retry_after)
+        heapq.heappush(self._retry_heap, (due, self._seq, attempt, method, url, kwargs, destination))
+        self._retry_wakeup.set()
+
+    async def _retry_loop(self):
+        sem = asyncio.Semaphore(self.concurrency)
+        while True:
+            if not self._retry_heap:
+                self._retry_wakeup.clear()
+                await self._retry_wakeup.wait()
+                continue
+            delay = self._retry_heap[0][0] - time.monotonic()
+            if delay > 0:
+                self._retry_wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._retry_wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, _, attempt, method, url, kwargs, destination = heapq.heappop(self._retry_heap)
+            await sem.acquire()
+            task = asyncio.ensure_future(self._retry_one(sem, attempt, method, url, kwargs, destination))
+            self._inflight_retries.add(task)
+            task.add_done_callback(self._inflight_retries.discard)
+
+    async def _retry_one(self, sem, attempt, method, url, kwargs, destination):
+        try:
+            self._dest(destination).retried += 1
+            await self._attempt(method, url, kwargs, destination)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not isinstance(e, DeliveryError) or e.retry:
+                self._schedule_retry(attempt + 1, method, url, kwargs, destination, getattr(e, 'retry_after', None))
+        finally:
+            sem.release()
+
+
+class BackgroundDelivery:
+    """A DeliveryPool on a daemon event-loop thread, for synchronous code.
+
+    call() waits for the first attempt's result; submit() returns a
+    concurrent.futures.Future immediately.
+    """
+
+    def __init__(self, **pool_kwargs):
+        self._pool_kwargs = pool_kwargs
+        self._lock = threading.Lock()
+        self._loop = None
+        self.pool = None
+
+    def _ensure(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self.pool = DeliveryPool(**self._pool_kwargs)
+                threading.Thread(target=self._loop.run_forever, name='delivery', daemon=True).start()
+                asyncio.run_coroutine_threadsafe(self.pool.start(), self._loop).result()
+
+    def submit(self, coro_fn, *args, **kwargs):
+        """Run pool.<coro_fn>(*args, **kwargs) on the delivery loop."""
+        self._ensure()
+        return asyncio.run_coroutine_threadsafe(getattr(self.pool, coro_fn)(*args, **kwargs), self._loop)
+
+    def call(self, coro_fn, *args, timeout=None, **kwargs):
+        return self.submit(coro_fn, *args, **kwargs).result(timeout)
+
+    def close(self, drain_timeout=0.0):
+        """Close the pool and stop the loop thread."""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.pool.close(drain_timeout), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+    def stats(self):
+        if self._loop is None:
+            return {'destinations': {}, 'retry_queue': 0}
+        return asyncio.run_coroutine_threadsafe(self._stats(), self._loop).result()
+
+    async def _stats(self):
+        return self.pool.stats()
+
+
+if __name__ == '__main__':
+    from aiohttp import web
+
+    # local stand-ins: fast, slow, flaky (fails twice, then works), down
+    hits = {'flaky': 0}
+
+    async def fast(request):
+        return web.json_response({'ok': True})
+
+    async def slow(request):
+        await asyncio.sleep(1.0)
+        return web.json_response({'ok': True})
+
+    async def flaky(request):
+        hits['flaky'] += 1
+        if hits['flaky'] <= 2:
+            return web.json_response({'ok': False}, status=503)
+        return web.json_response({'ok': True})
+
+    async def limited(request):
+        hits['limited'] = hits.get('limited', 0) + 1
+        if hits['limited'] == 1:
+            return web.json_response({'ok': False, 'parameters': {'retry_after': 0.3}}, status=429)
+        return web.json_response({'ok': True})
+
+    async def down(request):
+        return web.Response(status=500)
+
+    async def demo():
+        app = web.Application()
+        app.add_routes([web.post('/fast/{i}', fast), web.post('/slow', slow), web.post('/flaky', flaky),
+                        web.post('/limited', limited), web.post('/down', down)])
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        base = f'http://127.0.0.1:{port}'
+        urls = [f'{base}/fast/{i}' for i in range(20)] + [f'{base}/{p}' for p in ('slow', 'flaky', 'limited', 'down')]
+        async with DeliveryPool(retries=3, backoff=0.1) as pool:
+            t0 = time.perf_counter()
+            # label metrics by path so each stand-in shows up on its own
+            results = await asyncio.gather(*[pool.post(u, json={'event': 'demo'}, destination=urlsplit(u).path)
+                                             for u in urls])
+            took = time.perf_counter() - t0
+            print(f'{len(urls)} webhooks in {took:.2f}s (one slow endpoint at 1s); first-attempt ok: '
+                  f'{sum(ok for ok, _ in results)}')
+            await pool.close(drain_timeout=5.0)
+            for dest, s in pool.stats()['destinations'].items():
+                if not dest.startswith('/fast/'):
+                    print(dest, s)
+        await runner.cleanup()
+
+    asyncio.run(demo())
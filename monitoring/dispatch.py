@@ -0,0 +1,386 @@
+"""Alert dispatch pipeline between engine/ and the notifiers
+
+- Cooldown: an alert whose (type, ticker) was already let through within
+  the rule's cooldown is dropped. Per-symbol types (PER_SYMBOL_TYPES)
+  without a ticker, e.g. engine/alerts.py check_price_change() output,
+  are logged and passed through without a cooldown, so one symbol never
+  silences another
+- Digest: alerts that pass are collected for `digest_window` seconds and
+  sent as one message per destination
+- Rate limits per channel: a global messages-per-second cap plus a minimum
+  interval per destination (Telegram: 30 msg/s overall, 1 msg/s per chat).
+  Digests waiting for the same destination are merged into one message
+- Delivery runs on asyncio tasks; submit() only appends to a buffer, so
+  the alert engine never waits for Telegram/SMTP/webhooks. Blocking
+  notifiers (TelegramNotifier.send_alert, ...) run in a thread, coroutine
+  senders are awaited directly
+
+Usage:
+    from dispatch import AlertDispatcher, telegram_channel, webhook_channel
+    async with AlertDispatcher([telegram_channel(TelegramNotifier(config), [chat_id]),
+                                webhook_channel(WebhookNotifier(config))]) as d:
+        for alert in engine.update(symbol, price, ts):
+            d.submit(alert)
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# seconds before the same (type, ticker) alert is sent again
+DEFAULT_COOLDOWNS = {
+    'price_change': 300,
+    'volatility': 900,
+    'stop_loss': 3600,
+    'take_profit': 3600,
+    'low_balance': 3600,
+}
+
+# alert types that describe one symbol; their cooldown needs a ticker
+PER_SYMBOL_TYPES = frozenset(('price_change', 'volatility', 'stop_loss', 'take_profit'))
+
+
+def alert_key(alert):
+    """Cooldown key (type, ticker); None for a per-symbol alert without a
+    ticker."""
+    kind, ticker = alert.get('type'), alert.get('ticker')
+    if ticker is None and kind in PER_SYMBOL_TYPES:
+        return None
+    return kind, ticker
+
+
+def format_alert(alert):
+    kind = alert.get('type')
+    ticker = alert.get('ticker') or ''
+    if kind == 'price_change':
+        return f"{ticker} price {alert['percent']:+.2f}% ({alert['from']} -> {alert['to']})".strip()
+    if kind == 'volatility':
+        return f"{ticker} volatility {alert['vol_percent']:.2f}% over {alert['window_minutes']}m".strip()
+    if kind in ('stop_loss', 'take_profit'):
+        label = 'stop loss' if kind == 'stop_loss' else 'take profit'
+        return f"{ticker} {label}: {alert['percent']:+.2f}% (entry {alert['entry']}, now {alert['current']})"
+    if kind == 'low_balance':
+        return f"Low balance: {alert['balance_usd']:.2f} USD (threshold {alert['threshold']})"
+    return str(alert)
+
+
+def format_digest(alerts):
+    if len(alerts) == 1:
+        return format_alert(alerts[0])
+    return f'{len(alerts)} alerts:\n' + '\n'.join(format_alert(a) for a in alerts)
+
+
+def jsonable(alert):
+    return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in alert.items()}
+
+
+class Channel:
+    def __init__(self, name, send, destinations, rate=30.0, min_interval=1.0, concurrency=4, max_alerts=50):
+        """send(destination, alerts) delivers one digest and returns a truthy
+        value on success; it may be a plain function (run in a thread) or a
+        coroutine function. rate caps messages per second for the channel,
+        min_interval is the minimum gap between messages to one destination,
+        max_alerts caps how many alerts one merged message carries."""
+        self.name = name
+        self.send = send
+        self.destinations = list(destinations)
+        self.rate = rate
+        self.min_interval = min_interval
+        self.concurrency = concurrency
+        self.max_alerts = max_alerts
+        self.stats = {'messages': 0, 'alerts': 0, 'failed': 0, 'dropped': 0}
+
+
+def telegram_channel(notifier, chat_ids, **kwargs):
+    """TelegramNotifier (or anything with send_alert(text, chat_id=...))."""
+    send_alert = notifier.send_alert
+    if asyncio.iscoroutinefunction(send_alert):
+        async def send(chat_id, alerts):
+            return await send_alert(format_digest(alerts), chat_id=chat_id)
+    else:
+        def send(chat_id, alerts):
+            return send_alert(format_digest(alerts), chat_id=chat_id)
+    kwargs.setdefault('rate', 30.0)
+    kwargs.setdefault('min_interval', 1.0)
+    return Channel('telegram', send, chat_ids, **kwargs)
+
+
+def webhook_channel(notifier, **kwargs):
+    """WebhookNotifier (or anything with push(payload)); one destination."""
+    push = notifier.push
+
+    def payload(alerts):
+        return {'title': 'Binance alerts', 'text': format_digest(alerts), 'alerts': [jsonable(a) for a in alerts]}
+
+    if asyncio.iscoroutinefunction(push):
+        async def send(url, alerts):
+            return await push(payload(alerts))
+    else:
+        def send(url, alerts):
+            return push(payload(alerts))
+    kwargs.setdefault('rate', 10.0)
+    kwargs.setdefault('min_interval', 0.0)
+    return Channel('webhook', send, [getattr(notifier, 'url', None)], **kwargs)
+
+
+def email_channel(sender, to_addrs, subject='Binance alerts', **kwargs):
+    """EmailSender; one email per recipient at most every min_interval s."""
+    def send(to_addr, alerts):
+        rows = ''.join(f'<li>{format_alert(a)}</li>' for a in alerts)
+        return sender.send_html_report(to_addr, subject, f'<ul>{rows}</ul>')
+    kwargs.setdefault('rate', 1.0)
+    kwargs.setdefault('min_interval', 60.0)
+    kwargs.setdefault('concurrency', 1)
+    kwargs.setdefault('max_alerts', 500)
+    return Channel('email', send, to_addrs, **kwargs)
+
+
+class _Pacer:
+    """At most `rate` events per second, evenly spaced."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        delay = self._next - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # count from when we actually woke up, so late wakeups never bunch up
+        self._next = loop.time() + self.interval
+
+
+class _ChannelWorker:
+    def __init__(self, channel, max_pending):
+        self.channel = channel
+        self.max_pending = max_pending
+        self.pending = {d: deque() for d in channel.destinations}
+        self.next_at = {}
+        self.ready = []  # heap of (time, seq, destination)
+        self.scheduled = set()
+        self.seq = 0
+        self.wakeup = asyncio.Event()
+        self.pacer = _Pacer(channel.rate)
+        self.slots = asyncio.Semaphore(channel.concurrency)
+        self.inflight = set()
+
+    def put(self, destination, alerts):
+        q = self.pending.setdefault(destination, deque())
+        size = self.channel.max_alerts
+        for i in range(0, len(alerts), size):
+            q.append(alerts[i:i + size])
+        while len(q) > self.max_pending:
+            self.channel.stats['dropped'] += len(q.popleft())
+        if destination not in self.scheduled:
+            when = max(asyncio.get_running_loop().time(), self.next_at.get(destination, 0.0))
+            self.seq += 1
+            heapq.heappush(self.ready, (when, self.seq, destination))
+            self.scheduled.add(destination)
+            self.wakeup.set()
+
+    def idle(self):
+        return not self.scheduled and not self.inflight
+
+    def _take(self, destination):
+        # merge everything waiting for this destination, up to max_alerts
+        q = self.pending[destination]
+        alerts = []
+        while q and (not alerts or len(alerts) + len(q[0]) <= self.channel.max_alerts):
+            alerts.extend(q.popleft())
+        return alerts
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self.ready:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            when, _, destination = self.ready[0]
+            delay = when - loop.time()
+            if delay > 0:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self.ready)
+            alerts = self._take(destination)
+            await self.pacer.wait()
+            await self.slots.acquire()
+            task = asyncio.ensure_future(self._deliver(destination, alerts))
+            self.inflight.add(task)
+            task.add_done_callback(self.inflight.discard)
+            self.next_at[destination] = loop.time() + self.channel.min_interval
+            if self.pending[destination]:
+                self.seq += 1
+                heapq.heappush(self.ready, (self.next_at[destination], self.seq, destination))
+            else:
+                self.scheduled.discard(destination)
+
+    async def _deliver(self, destination, alerts):
+        ch = self.channel
+        try:
+            if asyncio.iscoroutinefunction(ch.send):
+                ok = await ch.send(destination, alerts)
+            else:
+                ok = await asyncio.to_thread(ch.send, destination, alerts)
+        except Exception as e:
+            logger.exception('%s delivery to %s failed: %s', ch.name, destination, e)
+            ok = False
+        finally:
+            self.slots.release()
+        if ok:
+            ch.stats['messages'] += 1
+            ch.stats['alerts'] += len(alerts)
+        else:
+            ch.stats['failed'] += 1
+
+
+class AlertDispatcher:
+    def __init__(self, channels, cooldowns=None, default_cooldown=300, digest_window=5.0, max_pending=100):
+        """cooldowns maps alert type -> seconds (DEFAULT_COOLDOWNS plus
+        default_cooldown for other types); digest_window=0 sends every
+        alert on its own. max_pending caps queued digests per destination;
+        the oldest are dropped beyond it."""
+        self.channels = list(channels)
+        self.cooldowns = dict(DEFAULT_COOLDOWNS, **(cooldowns or {}))
+        self.default_cooldown = default_cooldown
+        self.digest_window = digest_window
+        self.max_pending = max_pending
+        self.stats = {'submitted': 0, 'suppressed': 0, 'uncooled': 0, 'digests': 0}
+        self._last_sent = {}
+        self._buffer = []
+        self._flush_handle = None
+        self._workers = []
+        self._tasks = []
+        self._loop = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._workers = [_ChannelWorker(ch, self.max_pending) for ch in self.channels]
+        self._tasks = [asyncio.ensure_future(w.run()) for w in self._workers]
+
+    async def close(self, timeout=30.0):
+        """Flush the open digest and wait (up to timeout) for delivery."""
+        if self._loop is None:
+            return
+        self.flush()
+        deadline = self._loop.time() + timeout
+        while any(not w.idle() for w in self._workers) and self._loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        inflight = [t for w in self._workers for t in w.inflight]
+        if inflight:
+            await asyncio.wait(inflight, timeout=max(0.0, deadline - self._loop.time()))
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def submit(self, alert):
+        """Queue an alert for delivery; never blocks. Safe to call from
+        other threads (e.g. a synchronous engine loop)."""
+        if self._loop is None:
+            raise RuntimeError('AlertDispatcher is not started')
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._submit(alert)
+        else:
+            self._loop.call_soon_threadsafe(self._submit, alert)
+
+    def submit_many(self, alerts):
+        for a in alerts:
+            self.submit(a)
+
+    def _submit(self, alert):
+        self.stats['submitted'] += 1
+        key = alert_key(alert)
+        if key is None:
+            logger.warning('%s alert without a ticker, sent without cooldown: %s', alert.get('type'), alert)
+            self.stats['uncooled'] += 1
+        else:
+            now = time.monotonic()
+            last = self._last_sent.get(key)
+            if last is not None and now - last < self.cooldowns.get(key[0], self.default_cooldown):
+                self.stats['suppressed'] += 1
+                return
+            self._last_sent[key] = now
+        self._buffer.append(alert)
+        if self.digest_window <= 0:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.digest_window, self.flush)
+
+    def flush(self):
+        """Send the alerts collected so far as one digest per destination."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._buffer:
+            return
+        alerts, self._buffer = self._buffer, []
+        self.stats['digests'] += 1
+        for w in self._workers:
+            for destination in w.channel.destinations:
+                w.put(destination, alerts)
+
+    def as_dict(self):
+        return dict(self.stats, channels={ch.name: dict(ch.stats) for ch in self.channels})
+
+
+if __name__ == '__main__':
+    import random
+
+    sent = []
+
+    async def fake_telegram(chat_id, alerts):
+        sent.append((time.monotonic(), chat_id, len(alerts)))
+        await asyncio.sleep(0.02)
+        return True
+
+    async def demo():
+        # a volatile minute: 2000 alerts across 200 symbols for 40 chats
+        chats = [f'chat{i}' for i in range(40)]
+        channel = Channel('telegram', fake_telegram, chats, rate=30.0, min_interval=1.0)
+        rng = random.Random(5)
+        async with AlertDispatcher([channel], digest_window=0.5,
+                                   cooldowns={'price_change': 1.0, 'volatility': 2.0}) as d:
+            t_submit = 0.0
+            for i in range(2000):
+                kind = rng.choice(['price_change', 'volatility'])
+                alert = {'type': kind, 'ticker': f'SYM{rng.randrange(200)}USDT', 'percent': 3.5,
+                         'from': 1.0, 'to': 1.035, 'vol_percent': 3.0, 'window_minutes': 60}
+                t0 = time.perf_counter()
+                d.submit(alert)
+                t_submit += time.perf_counter() - t0
+                await asyncio.sleep(0.001)
+        print(d.as_dict())
+        print(f'submit: {t_submit / 2000 * 1e6:.1f}us per alert')
+        times = sorted(t for t, _, _ in sent)
+        worst = max(sum(1 for u in times if t <= u < t + 1.0) for t in times)
+        per_chat = {}
+        gaps = []
+        for t, c, _ in sorted(sent):
+            if c in per_chat:
+                gaps.append(t - per_chat[c])
+            per_chat[c] = t
+        print(f'{len(sent)} messages; busiest second {worst} (limit 30); '
+              f'closest messages to one chat {min(gaps):.3f}s apart (limit 1s)')
+
+    asyncio.run(demo())
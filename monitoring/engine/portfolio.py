@@ -0,0 +1,192 @@
+"""Columnar portfolio risk checks
+
+PortfolioRisk keeps holdings as NumPy columns (entry price, current price,
+amount) with a ticker -> rows index, so stop-loss / take-profit, low
+balance and aggregate PnL are array operations instead of a Python loop
+over holding dicts. The same ticker may appear in several rows (several
+accounts).
+
+update_prices() only re-checks the rows whose price changed and keeps the
+portfolio value up to date by deltas, so a tick for a few symbols
+costs O(changed rows), not O(portfolio).
+
+Alerts are the dicts alerts.check_stop_take / check_low_balance return,
+in holdings order:
+
+    risk = PortfolioRisk.from_config(holdings, load_config())
+    alerts = risk.check()                        # full pass
+    alerts = risk.update_prices({'BTCUSDT': 45100.0})  # changed rows only
+"""
+import numpy as np
+
+try:
+    from .alerts import check_low_balance
+except ImportError:
+    from alerts import check_low_balance
+
+# recompute value / cost totals from the columns after this many delta updates
+_RESUM_EVERY = 1024
+
+
+def _column(holdings, key):
+    # None (or anything non-numeric) becomes NaN, which the checks skip
+    out = np.empty(len(holdings))
+    for i, h in enumerate(holdings):
+        v = h.get(key)
+        try:
+            out[i] = float(v) if v is not None else np.nan
+        except (TypeError, ValueError):
+            out[i] = np.nan
+    return out
+
+
+class PortfolioRisk:
+    def __init__(self, holdings, stop_percent=5.0, take_percent=10.0, low_balance_usd=10.0):
+        """holdings: list of {'ticker','entry_price','current_price','amount'}"""
+        self.stop_percent = stop_percent
+        self.take_percent = take_percent
+        self.low_balance_usd = low_balance_usd
+        self.tickers = np.array([h.get('ticker') for h in holdings], dtype=object)
+        self.entry = _column(holdings, 'entry_price')
+        self.current = _column(holdings, 'current_price')
+        self.amount = np.nan_to_num(_column(holdings, 'amount'))
+        self.rows = {}
+        for i, t in enumerate(self.tickers):
+            self.rows.setdefault(t, []).append(i)
+        self.rows = {t: np.array(r, dtype=np.intp) for t, r in self.rows.items()}
+        self._resum()
+
+    @classmethod
+    def from_config(cls, holdings, config):
+        a = (config or {}).get('alerts', {})
+        return cls(holdings, stop_percent=a.get('stop_loss_percent', 5.0),
+                   take_percent=a.get('take_profit_percent', 10.0),
+                   low_balance_usd=a.get('low_balance_threshold_usd', 10.0))
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def _resum(self):
+        self.value = float(np.nansum(self.amount * self.current))
+        self.cost = float(np.nansum(self.amount * self.entry))
+        self._updates = 0
+
+    # -- checks ------------------------------------------------------------
+
+    def _stop_take(self, rows=None):
+        entry = self.entry if rows is None else self.entry[rows]
+        cur = self.current if rows is None else self.current[rows]
+        # check_stop_take skips holdings with a missing or zero price
+        ok = (entry != 0) & (cur != 0) & ~np.isnan(entry) & ~np.isnan(cur)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pc = (cur - entry) / entry * 100.0
+        stop = ok & (pc <= -abs(self.stop_percent))
+        take = ok & ~stop & (pc >= abs(self.take_percent))
+        hit = np.flatnonzero(stop | take)
+        if not len(hit):
+            return []
+        idx = hit if rows is None else rows[hit]
+        kinds = np.where(stop[hit], 'stop_loss', 'take_profit').tolist()
+        return [{'type': k, 'ticker': t, 'percent': p, 'entry': e, 'current': c}
+                for k, t, p, e, c in zip(kinds, self.tickers[idx].tolist(), pc[hit].tolist(),
+                                         entry[hit].tolist(), cur[hit].tolist())]
+
+    def check_stop_take(self):
+        """Stop-loss / take-profit alerts for every holding."""
+        return self._stop_take()
+
+    def check_low_balance(self):
+        return check_low_balance(self.value, self.low_balance_usd)
+
+    def check(self):
+        """Full pass: stop/take alerts followed by the low-balance alert."""
+        alerts = self._stop_take()
+        low = self.check_low_balance()
+        if low:
+            alerts.append(low)
+        return alerts
+
+    def pnl(self):
+        """Aggregate value, cost basis and unrealized PnL (USD and %)."""
+        pnl = self.value - self.cost
+        return {'value': self.value, 'cost': self.cost, 'pnl': pnl,
+                'pnl_percent': pnl / self.cost * 100.0 if self.cost else 0.0}
+
+    # -- updates -----------------------------------------------------------
+
+    def update_prices(self, prices):
+        """Apply {ticker: price} and return the alerts for the affected rows
+        (stop/take in holdings order, then low balance). Unknown tickers are
+        ignored."""
+        idx, values = [], []
+        for ticker, price in prices.items():
+            r = self.rows.get(ticker)
+            if r is not None:
+                idx.append(r)
+                values.append(np.full(len(r), price, dtype=float))
+        if not idx:
+            return []
+        rows = np.concatenate(idx)
+        new = np.concatenate(values)
+        order = np.argsort(rows, kind='stable')
+        rows, new = rows[order], new[order]
+        old = self.current[rows]
+        delta = self.amount[rows] * (np.nan_to_num(new) - np.nan_to_num(old))
+        self.current[rows] = new
+        self.value += float(delta.sum())
+        self._updates += 1
+        if self._updates >= _RESUM_EVERY:
+            self._resum()
+        alerts = self._stop_take(rows)
+        low = self.check_low_balance()
+        if low:
+            alerts.append(low)
+        return alerts
+
+
+if __name__ == '__main__':
+    import json
+    import random
+    import time
+    from pathlib import Path
+    from alerts import check_stop_take
+
+    sample = Path(__file__).parents[1] / 'sample_data' / 'portfolio_sample.json'
+    holdings = json.loads(sample.read_text())['holdings']
+    risk = PortfolioRisk(holdings)
+    assert risk.check_stop_take() == check_stop_take(holdings)
+    print('sample:', risk.check(), risk.pnl())
+
+    # many accounts holding the same 500 symbols
+    rng = random.Random(1)
+    tickers = [f'SYM{i:03d}USDT' for i in range(500)]
+    base = {t: rng.uniform(0.1, 1000) for t in tickers}
+    holdings = [{'ticker': t, 'amount': rng.uniform(0.1, 10),
+                 'entry_price': base[t] * rng.uniform(0.95, 1.06), 'current_price': base[t]}
+                for _ in range(200) for t in tickers]
+    risk = PortfolioRisk(holdings)
+
+    t0 = time.perf_counter()
+    ref = check_stop_take(holdings)
+    t_loop = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    got = risk.check_stop_take()
+    t_vec = time.perf_counter() - t0
+    assert got == ref, 'vectorized checks differ from check_stop_take'
+    print(f'{len(holdings)} holdings, {len(ref)} alerts: loop {t_loop * 1000:.1f}ms, vectorized {t_vec * 1000:.1f}ms')
+
+    # ticks for 10 symbols at a time: only their rows are re-checked
+    n, t_upd = 200, 0.0
+    for _ in range(n):
+        changed = {t: base[t] * rng.uniform(0.97, 1.03) for t in rng.sample(tickers, 10)}
+        t0 = time.perf_counter()
+        alerts = risk.update_prices(changed)
+        t_upd += time.perf_counter() - t0
+        for h in holdings:
+            if h['ticker'] in changed:
+                h['current_price'] = changed[h['ticker']]
+    expected = [a for a in check_stop_take(holdings) if a['ticker'] in changed]
+    assert [a for a in alerts if a['type'] != 'low_balance'] == expected
+    value = sum(h['amount'] * h['current_price'] for h in holdings)
+    assert abs(risk.value - value) < 1e-6 * value
+    print(f'partial update (10 symbols, {10 * 200} rows): {t_upd / n * 1000:.2f}ms per tick;', risk.pnl())
@@ -4,11 +4,20 @@ Usage:
     from telegram import TelegramNotifier
     n = TelegramNotifier(config)
     n.send_alert("Price moved 5%", chat_id=config['telegram']['chat_id'])
+
+    # async, pooled session, failed sends retried in the background
+    n = AsyncTelegramNotifier(config, pool)
+    await n.send_alert("Price moved 5%", chat_id=config['telegram']['chat_id'])
 """
 
 import requests
 import logging
 
+try:
+    from .delivery import DeliveryPool
+except ImportError:
+    from delivery import DeliveryPool
+
 logger = logging.getLogger(__name__)
 
 class TelegramNotifier:
@@ -28,3 +37,25 @@ class TelegramNotifier:
         except Exception as e:
             logger.exception('Failed to send telegram message: %s', e)
             return False
+
+
+class AsyncTelegramNotifier:
+    def __init__(self, config, pool=None):
+        """pool: a shared DeliveryPool (one is created on first use if None)."""
+        self.token = config.get('telegram', {}).get('bot_token')
+        self.chat_id = config.get('telegram', {}).get('chat_id')
+        self.base = f'https://api.telegram.org/bot{self.token}' if self.token else None
+        self.pool = pool
+
+    async def send_alert(self, message, chat_id=None):
+        if not self.base:
+            logger.error('Telegram token not configured')
+            return False
+        if self.pool is None:
+            self.pool = DeliveryPool()
+        chat_id = chat_id or self.chat_id
+        ok, body = await self.pool.post(f'{self.base}/sendMessage', json={'chat_id': chat_id, 'text': message},
+                                        destination=f'telegram:{chat_id}')
+        if not ok:
+            logger.error('Failed to send telegram message to %s: %s', chat_id, body)
+        return ok
@@ -4,11 +4,20 @@ Usage:
     from webhook import WebhookNotifier
     n = WebhookNotifier(config)
     n.push({'title':'Alert','text':'Price moved 4%'})
+
+    # async: posts to webhook.url and every webhook.urls entry concurrently
+    n = AsyncWebhookNotifier(config, pool)
+    await n.push({'title':'Alert','text':'Price moved 4%'})
 """
 
 import requests
 import logging
 
+try:
+    from .delivery import DeliveryPool
+except ImportError:
+    from delivery import DeliveryPool
+
 logger = logging.getLogger(__name__)
 
 class WebhookNotifier:
@@ -26,3 +35,26 @@ class WebhookNotifier:
         except Exception as e:
             logger.exception('Failed to call webhook: %s', e)
             return False
+
+
+class AsyncWebhookNotifier:
+    def __init__(self, config, pool=None):
+        """pool: a shared DeliveryPool (one is created on first use if None)."""
+        cfg = config.get('webhook', {})
+        self.urls = [u for u in [cfg.get('url'), *cfg.get('urls', [])] if u]
+        self.url = self.urls[0] if self.urls else None
+        self.pool = pool
+
+    async def push(self, payload):
+        """True if every webhook accepted the first attempt; failures are
+        retried in the background by the pool."""
+        if not self.urls:
+            logger.error('Webhook URL not configured')
+            return False
+        if self.pool is None:
+            self.pool = DeliveryPool()
+        results = await self.pool.fan_out([(u, payload, None) for u in self.urls])
+        for u, (ok, body) in zip(self.urls, results):
+            if not ok:
+                logger.error('Failed to call webhook %s: %s', u, body)
+        return all(ok for ok, _ in results)
@@ -1,14 +1,18 @@
 """
 Async API client helpers
 - Parallel requests using asyncio.gather with semaphore for concurrency
-- Command queue to respect rate limits (token bucket)
+- Command queue to respect rate limits (weight-aware FIFO token bucket)
+- Server-side weight feedback from X-MBX-USED-WEIGHT-* headers
+- Single-flight coalescing of identical in-flight GETs
 - Retry logic with exponential backoff
 """
 from __future__ import annotations
 import asyncio
+import collections
+import re
 import time
 import random
-from typing import Any, Callable, Coroutine, Optional, List
+from typing import Any, Callable, Coroutine, Deque, Dict, Optional, List, Tuple
 
 try:
     import aiohttp
@@ -22,7 +26,11 @@ except Exception:
 
 
 class RateLimiter:
-    """Simple token-bucket rate limiter."""
+    """Simple token-bucket rate limiter.
+
+    Kept as the reference implementation for benchmarks; AsyncAPIClient uses
+    WeightedRateLimiter.
+    """
 
     def __init__(self, rate: float, per: float = 1.0):
         self._capacity = rate
@@ -51,33 +59,407 @@ class RateLimiter:
         await self.acquire(tokens)
 
 
+# Request weights for the REST endpoints this project uses (spot API).
+# Values are for the single-symbol form; see endpoint_weight() for the
+# variants that depend on parameters.
+ENDPOINT_WEIGHTS = {
+    '/api/v3/ping': 1,
+    '/api/v3/time': 1,
+    '/api/v3/exchangeInfo': 20,
+    '/api/v3/klines': 2,
+    '/api/v3/avgPrice': 2,
+    '/api/v3/ticker/price': 2,
+    '/api/v3/ticker/bookTicker': 2,
+    '/api/v3/ticker/24hr': 2,
+    '/api/v3/account': 20,
+    '/api/v3/myTrades': 20,
+    '/api/v3/allOrders': 20,
+    '/api/v3/openOrders': 6,
+    '/api/v3/userDataStream': 2,
+}
+
+_DEPTH_WEIGHTS = ((100, 5), (500, 25), (1000, 50), (5000, 250))
+
+_USED_WEIGHT_RE = re.compile(r'^x-mbx-used-weight-(\d+)([smhd])$', re.IGNORECASE)
+_INTERVAL_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def endpoint_weight(method: str, path: str, params: dict | None = None) -> int:
+    """Return the Binance request weight for method+path+params."""
+    path = '/' + path.lstrip('/')
+    params = params or {}
+    if path == '/api/v3/depth':
+        limit = int(params.get('limit', 100))
+        for upper, weight in _DEPTH_WEIGHTS:
+            if limit <= upper:
+                return weight
+        return _DEPTH_WEIGHTS[-1][1]
+    if path in ('/api/v3/ticker/price', '/api/v3/ticker/bookTicker'):
+        return 2 if 'symbol' in params else 4
+    if path == '/api/v3/ticker/24hr':
+        if 'symbol' in params:
+            return 2
+        symbols = params.get('symbols')
+        if symbols is None:
+            return 80
+        n = len(symbols) if isinstance(symbols, (list, tuple)) else str(symbols).count(',') + 1
+        return 2 if n <= 20 else 40 if n <= 100 else 80
+    if path == '/api/v3/openOrders':
+        return 6 if 'symbol' in params else 80
+    if path == '/api/v3/order':
+        return 4 if method.upper() == 'GET' else 1
+    return ENDPOINT_WEIGHTS.get(path, 1)
+
+
+def parse_used_weight(headers) -> List[Tuple[float, int]]:
+    """Extract (window_seconds, used_weight) pairs from response headers."""
+    out = []
+    for name, value in headers.items():
+        m = _USED_WEIGHT_RE.match(name)
+        if not m:
+            continue
+        try:
+            out.append((int(m.group(1)) * _INTERVAL_SECONDS[m.group(2).lower()], int(value)))
+        except ValueError:
+            continue
+    return out
+
+
+class WeightedRateLimiter:
+    """Weight-aware sliding-window limiter with FIFO waiters.
+
+    - At most `capacity` weight (default `rate`) is granted inside any `per`
+      seconds, so no fixed server window (X-MBX-USED-WEIGHT-1M counts per
+      clock minute) can see more than the budget. A token bucket refilling
+      at rate/per could grant a full bucket plus a window of refill, ~2x.
+    - Monotonic clock, so wall-clock jumps do not mint or drain budget.
+    - Uncontended acquires are granted synchronously (no lock: all state is
+      touched from the event loop between awaits).
+    - Contended acquires queue a future; a single drain task grants them in
+      arrival order, so a heavy request is not starved by light ones. It
+      sleeps until enough weight leaves the window, or until the head
+      waiter is cancelled. A queued grant is reserved by the drain task and
+      enters the window when its caller resumes (about when it sends), so
+      scheduling lag cannot push two windows' worth into one.
+    - sync_used() raises the used weight to what the server reports, and
+      penalize() pauses all grants after a 429/418 Retry-After.
+    """
+
+    def __init__(self, rate: float, per: float = 1.0, capacity: float | None = None):
+        self._capacity = capacity if capacity is not None else rate
+        self._per = per
+        self._granted: Deque[Tuple[float, float]] = collections.deque()  # (time, weight) inside the window
+        self._used = 0.0
+        self._reserved = 0.0    # granted to waiters that have not resumed yet
+        self._paused_until = 0.0
+        self._waiters: Deque[Tuple[float, asyncio.Future]] = collections.deque()
+        self._drainer: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Future] = None
+
+    @property
+    def capacity(self) -> float:
+        return self._capacity
+
+    @property
+    def pending(self) -> int:
+        return len(self._waiters)
+
+    def _expire(self, now: float):
+        granted = self._granted
+        cutoff = now - self._per
+        while granted and granted[0][0] <= cutoff:
+            self._used -= granted.popleft()[1]
+        if not granted:
+            self._used = 0.0
+
+    def _take(self, now: float, tokens: float):
+        self._granted.append((now, tokens))
+        self._used += tokens
+
+    def _fits_at(self, tokens: float) -> float:
+        """Monotonic time at which `tokens` more fit in the window."""
+        excess = self._used + self._reserved + tokens - self._capacity
+        for t, w in self._granted:
+            excess -= w
+            if excess <= 0:
+                return t + self._per
+        # only the reserved grants, once taken, can make room
+        return time.monotonic() + self._per
+
+    def available(self) -> float:
+        self._expire(time.monotonic())
+        return self._capacity - self._used - self._reserved
+
+    async def acquire(self, tokens: float = 1.0):
+        # a request heavier than the whole window could never be granted
+        tokens = min(tokens, self._capacity)
+        now = time.monotonic()
+        self._expire(now)
+        if not self._waiters and now >= self._paused_until and self._used + self._reserved + tokens <= self._capacity:
+            self._take(now, tokens)
+            return
+        fut = asyncio.get_running_loop().create_future()
+        fut.add_done_callback(self._waiter_done)
+        self._waiters.append((tokens, fut))
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.ensure_future(self._drain())
+        try:
+            await fut
+        finally:
+            if fut.done() and not fut.cancelled():
+                self._reserved -= tokens
+                self._take(time.monotonic(), tokens)
+
+    def _waiter_done(self, fut: asyncio.Future):
+        # a cancelled head waiter must not keep the drain task asleep
+        if fut.cancelled() and self._wake is not None and not self._wake.done():
+            self._wake.set_result(None)
+
+    async def _sleep(self, delay: float):
+        loop = asyncio.get_running_loop()
+        self._wake = wake = loop.create_future()
+        handle = loop.call_later(delay, lambda: wake.done() or wake.set_result(None))
+        try:
+            await wake
+        finally:
+            handle.cancel()
+            self._wake = None
+
+    async def _drain(self):
+        waiters = self._waiters
+        while waiters:
+            tokens, fut = waiters[0]
+            if fut.done():
+                # cancelled by the caller while queued
+                waiters.popleft()
+                continue
+            now = time.monotonic()
+            if now < self._paused_until:
+                await self._sleep(self._paused_until - now)
+                continue
+            self._expire(now)
+            if self._used + self._reserved + tokens <= self._capacity:
+                self._reserved += tokens
+                waiters.popleft()
+                fut.set_result(None)
+                continue
+            await self._sleep(self._fits_at(tokens) - now)
+
+    def sync_used(self, used: float, window: float):
+        """Resync from a server-reported used weight over `window` seconds.
+
+        Only headers for the window this limiter models (per) are applied,
+        and only to raise the local count: the server also counts requests
+        from other processes sharing the IP. The difference is recorded as
+        weight spent now, so it leaves the window like any other grant.
+        """
+        if abs(window - self._per) > 1e-9:
+            return
+        now = time.monotonic()
+        self._expire(now)
+        extra = used - self._used
+        if extra > 0:
+            self._take(now, extra)
+
+    def penalize(self, retry_after: float):
+        """Block all grants for retry_after seconds (429/418 responses)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+
+def request_key(method: str, path: str, params: dict | None = None) -> tuple:
+    """Normalized identity of a request: method, path and sorted params."""
+    items = []
+    for k, v in sorted((params or {}).items()):
+        if isinstance(v, (list, tuple)):
+            v = tuple(v)
+        items.append((k, v))
+    return (method.upper(), '/' + path.lstrip('/'), tuple(items))
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key.
+
+    The call runs as its own task, so a caller that gets cancelled does not
+    cancel the result for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Any, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Any, fn: Callable[[], Coroutine[Any, Any, Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _t: self._calls.pop(key, None))
+        return await asyncio.shield(task)
+
+    def as_dict(self) -> dict:
+        total = self.leaders + self.coalesced
+        return {
+            'requests': total,
+            'sent': self.leaders,
+            'coalesced': self.coalesced,
+            'coalesced_ratio': self.coalesced / total if total else None,
+        }
+
+
+class PoolStats:
+    """Connection pool counters fed by aiohttp trace hooks."""
+
+    def __init__(self):
+        self.created = 0
+        self.reused = 0
+        self.connect_time_s = 0.0
+        self.queued = 0
+        self.queued_time_s = 0.0
+
+    def trace_config(self) -> "aiohttp.TraceConfig":
+        tc = aiohttp.TraceConfig()
+
+        async def create_start(session, ctx, params):
+            ctx.connect_t0 = time.monotonic()
+
+        async def create_end(session, ctx, params):
+            self.created += 1
+            self.connect_time_s += time.monotonic() - ctx.connect_t0
+
+        async def reuse(session, ctx, params):
+            self.reused += 1
+
+        async def queued_start(session, ctx, params):
+            ctx.queued_t0 = time.monotonic()
+
+        async def queued_end(session, ctx, params):
+            self.queued += 1
+            self.queued_time_s += time.monotonic() - ctx.queued_t0
+
+        tc.on_connection_create_start.append(create_start)
+        tc.on_connection_create_end.append(create_end)
+        tc.on_connection_reuseconn.append(reuse)
+        tc.on_connection_queued_start.append(queued_start)
+        tc.on_connection_queued_end.append(queued_end)
+        return tc
+
+    def as_dict(self) -> dict:
+        total = self.created + self.reused
+        return {
+            'connections_created': self.created,
+            'connections_reused': self.reused,
+            'reuse_ratio': self.reused / total if total else None,
+            'connect_time_mean_s': self.connect_time_s / self.created if self.created else None,
+            'queued_acquisitions': self.queued,
+            'queued_time_mean_s': self.queued_time_s / self.queued if self.queued else None,
+        }
+
+
 class AsyncAPIClient:
-    def __init__(self, base_url: str = "https://api.binance.com", concurrency: int = 10, rate: float = 20.0, per: float = 1.0):
+    def __init__(self, base_url: str = "https://api.binance.com", concurrency: int = 10, rate: float = 1200.0, per: float = 60.0,
+                 pooled: bool = False, keepalive_timeout: float = 60.0, dns_ttl: int = 300, warmup: int = 0,
+                 timeout: float = 10.0, connect_timeout: float = 5.0, coalesce: bool = True, cache: Any = None):
+        """rate/per is the request-weight budget (Binance counts weight, not calls).
+
+        per defaults to the server's 60 s window, so the X-MBX-USED-WEIGHT-1M
+        header resyncs the limiter after each response; a per that matches no
+        reported window (e.g. per=1) disables the resync.
+
+        pooled=True uses a tuned keep-alive connector: connection limit matched
+        to `concurrency`, DNS cache for `dns_ttl` seconds, idle connections
+        kept `keepalive_timeout` seconds, and `warmup` connections opened by
+        start() so TLS handshakes happen before the first order is sent.
+        aiohttp already sets TCP_NODELAY on every connection it opens.
+
+        coalesce=True makes concurrent identical GETs share one HTTP call
+        (counters in `client.singleflight.as_dict()`). `cache` is a TTLCache
+        (e.g. cache.price_cache) that get(..., cache_key=...) reads first and
+        fills once per completed call.
+        """
         if aiohttp is None:
             raise RuntimeError("aiohttp is required for AsyncAPIClient")
         self.base_url = base_url.rstrip('/')
         self._session: Optional[aiohttp.ClientSession] = None
+        self._concurrency = concurrency
         self._sem = asyncio.Semaphore(concurrency)
-        self._rate_limiter = RateLimiter(rate=rate, per=per)
+        self._rate_limiter = WeightedRateLimiter(rate=rate, per=per)
+        self._pooled = pooled
+        self._keepalive_timeout = keepalive_timeout
+        self._dns_ttl = dns_ttl
+        self._warmup = min(warmup, concurrency)
+        self._timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=connect_timeout)
+        self.pool_stats = PoolStats()
+        self._coalesce = coalesce
+        self._cache = cache
+        self.singleflight = SingleFlight()
+
+    def _make_session(self) -> "aiohttp.ClientSession":
+        trace_configs = [self.pool_stats.trace_config()]
+        if not self._pooled:
+            return aiohttp.ClientSession(timeout=self._timeout, trace_configs=trace_configs)
+        connector = aiohttp.TCPConnector(
+            limit=self._concurrency,
+            limit_per_host=self._concurrency,
+            use_dns_cache=True,
+            ttl_dns_cache=self._dns_ttl,
+            keepalive_timeout=self._keepalive_timeout,
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=self._timeout, trace_configs=trace_configs)
 
     async def _ensure_session(self):
         if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession()
+            self._session = self._make_session()
+
+    async def start(self):
+        """Create the session and pre-open `warmup` connections."""
+        await self._ensure_session()
+        if self._warmup:
+            # _request, not get(): identical pings would be coalesced into one call
+            await asyncio.gather(*[self._request('GET', '/api/v3/ping') for _ in range(self._warmup)],
+                                 return_exceptions=True)
 
     async def close(self):
         if self._session:
             await self._session.close()
 
-    async def _request(self, method: str, path: str, params: dict | None = None, json_body: Any = None, headers: dict | None = None, retries: int = 3) -> Any:
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _apply_rate_headers(self, resp):
+        for window, used in parse_used_weight(resp.headers):
+            self._rate_limiter.sync_used(used, window)
+        if resp.status in (418, 429):
+            try:
+                retry_after = float(resp.headers.get('Retry-After', 1))
+            except ValueError:
+                retry_after = 1.0
+            self._rate_limiter.penalize(retry_after)
+
+    async def _request(self, method: str, path: str, params: dict | None = None, json_body: Any = None, headers: dict | None = None, retries: int = 3, weight: int | None = None) -> Any:
         await self._ensure_session()
         url = f"{self.base_url}/{path.lstrip('/')}"
+        if weight is None:
+            weight = endpoint_weight(method, path, params)
         backoff = 0.2
         for attempt in range(retries + 1):
-            await self._rate_limiter.acquire()
+            await self._rate_limiter.acquire(weight)
             async with self._sem:
                 try:
-                    async with self._session.request(method, url, params=params, json=json_body, headers=headers, timeout=10) as resp:
+                    async with self._session.request(method, url, params=params, json=json_body, headers=headers) as resp:
                         text = await resp.text()
+                        self._apply_rate_headers(resp)
+                        if resp.status in (418, 429):
+                            raise RuntimeError(f"rate limited: {resp.status}")
                         if resp.status >= 500:
                             raise RuntimeError(f"server error: {resp.status}")
                         if resp.status >= 400:
@@ -98,12 +480,36 @@ class AsyncAPIClient:
                     backoff *= 2
         raise RuntimeError("unreachable")
 
-    async def get(self, path: str, params: dict | None = None, **kwargs) -> Any:
-        return await self._request('GET', path, params=params, **kwargs)
+    async def get(self, path: str, params: dict | None = None, cache_key: str | None = None, **kwargs) -> Any:
+        if cache_key is not None and self._cache is not None:
+            hit = await self._cache.get(cache_key)
+            if hit is not None:
+                return hit
+        if not self._coalesce:
+            return await self._fetch(path, params, cache_key, kwargs)
+        key = request_key('GET', path, params)
+        return await self.singleflight.do(key, lambda: self._fetch(path, params, cache_key, kwargs))
+
+    async def _fetch(self, path: str, params: dict | None, cache_key: str | None, kwargs: dict) -> Any:
+        res = await self._request('GET', path, params=params, **kwargs)
+        # Binance error payloads look like {"code": -1121, "msg": ...}
+        if cache_key is not None and self._cache is not None and not (isinstance(res, dict) and 'code' in res):
+            await self._cache.set(cache_key, res)
+        return res
+
+    async def get_price(self, symbol: str) -> Any:
+        """Ticker price for one symbol, cached under the symbol name."""
+        return await self.get('/api/v3/ticker/price', params={'symbol': symbol}, cache_key=symbol)
 
     async def post(self, path: str, json_body: Any = None, **kwargs) -> Any:
         return await self._request('POST', path, json_body=json_body, **kwargs)
 
+    async def put(self, path: str, params: dict | None = None, **kwargs) -> Any:
+        return await self._request('PUT', path, params=params, **kwargs)
+
+    async def delete(self, path: str, params: dict | None = None, **kwargs) -> Any:
+        return await self._request('DELETE', path, params=params, **kwargs)
+
     async def parallel_get(self, paths: List[str], params_list: Optional[List[dict]] = None, concurrency: int = 20) -> List[Any]:
         params_list = params_list or [None] * len(paths)
         sem = asyncio.Semaphore(concurrency)
@@ -0,0 +1,130 @@
+"""
+Ticker fan-in for AsyncAPIClient
+- Collects per-symbol price lookups over a short window (a few ms)
+- Sends them as one /api/v3/ticker/price?symbols=[...] call, or the full-book
+  call when the batch is larger than full_book_threshold
+- Splits the response back to each waiting caller and fills price_cache
+
+One ticker call per holding costs weight 2 each; a batch costs 4 in total.
+"""
+from __future__ import annotations
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import orjson as _json
+except Exception:
+    import json as _json
+
+TICKER_PATH = '/api/v3/ticker/price'
+
+
+def symbols_param(symbols: Iterable[str]) -> str:
+    """Binance expects a compact JSON array: ["BTCUSDT","ETHUSDT"]."""
+    out = _json.dumps(sorted(symbols))
+    return out.decode() if isinstance(out, bytes) else out.replace(' ', '')
+
+
+class TickerBatcher:
+    def __init__(self, client, window: float = 0.005, full_book_threshold: int = 100, cache: Any = None):
+        self._client = client
+        self._window = window
+        self._threshold = full_book_threshold
+        self._cache = cache
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.batches = 0
+        self.full_book_calls = 0
+        self.lookups = 0
+
+    async def price(self, symbol: str) -> Optional[dict]:
+        """Ticker dict {'symbol', 'price'} for one symbol, or None if unknown."""
+        symbol = symbol.upper()
+        self.lookups += 1
+        if self._cache is not None:
+            hit = await self._cache.get(symbol)
+            if hit is not None:
+                return hit
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.setdefault(symbol, []).append(fut)
+        if self._timer is None:
+            self._timer = loop.call_later(self._window, self._schedule_flush)
+        return await fut
+
+    async def prices(self, symbols: Iterable[str]) -> Dict[str, Optional[dict]]:
+        symbols = list(symbols)
+        res = await asyncio.gather(*[self.price(s) for s in symbols])
+        return dict(zip((s.upper() for s in symbols), res))
+
+    def _schedule_flush(self):
+        self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            asyncio.ensure_future(self._flush(batch))
+
+    async def _fetch(self, symbols: List[str]) -> Any:
+        if len(symbols) == 1:
+            return [await self._client.get(TICKER_PATH, params={'symbol': symbols[0]})]
+        if len(symbols) > self._threshold:
+            self.full_book_calls += 1
+            return await self._client.get(TICKER_PATH)
+        return await self._client.get(TICKER_PATH, params={'symbols': symbols_param(symbols)})
+
+    async def _flush(self, batch: Dict[str, List[asyncio.Future]]):
+        self.batches += 1
+        symbols = list(batch)
+        try:
+            rows = await self._fetch(symbols)
+            if isinstance(rows, dict) and 'code' in rows:
+                # one unknown symbol rejects the whole batch; look them up one by one
+                rows = await asyncio.gather(*[self._client.get(TICKER_PATH, params={'symbol': s}) for s in symbols])
+        except Exception as e:
+            for futs in batch.values():
+                for f in futs:
+                    if not f.done():
+                        f.set_exception(e)
+            return
+        by_symbol = {r['symbol']: r for r in rows if isinstance(r, dict) and 'symbol' in r}
+        for symbol, futs in batch.items():
+            row = by_symbol.get(symbol)
+            if row is not None and self._cache is not None:
+                await self._cache.set(symbol, row)
+            for f in futs:
+                if not f.done():
+                    f.set_result(row)
+
+    def as_dict(self) -> dict:
+        return {
+            'lookups': self.lookups,
+            'batches': self.batches,
+            'full_book_calls': self.full_book_calls,
+        }
+
+
+async def fill_current_prices(holdings: List[dict], batcher: TickerBatcher) -> List[dict]:
+    """Set holding['current_price'] for every holding with one batched call.
+
+    Holdings use the monitoring shape ({'ticker': 'BTCUSDT', ...}), so the
+    result can go straight into monitoring/engine/alerts.check_stop_take.
+    """
+    prices = await batcher.prices(h['ticker'] for h in holdings if h.get('ticker'))
+    for h in holdings:
+        row = prices.get(str(h.get('ticker', '')).upper())
+        if row is not None:
+            h['current_price'] = float(row['price'])
+    return holdings
+
+
+if __name__ == "__main__":
+    from async_api import AsyncAPIClient
+    from standin import StandinServer
+
+    async def demo():
+        async with StandinServer(symbols=['BTCUSDT', 'ETHUSDT', 'BNBUSDT']) as srv:
+            async with AsyncAPIClient(base_url=srv.base_url) as client:
+                batcher = TickerBatcher(client)
+                print(await batcher.prices(['BTCUSDT', 'ETHUSDT', 'BNBUSDT']))
+                print(batcher.as_dict(), 'server requests:', srv.requests)
+
+    asyncio.run(demo())
@@ -1,6 +1,12 @@
 """
 Benchmark and metrics collector
 - Measure API call latency and throughput
+- Compare rate limiter implementations under many queued waiters
+- Compare default and pooled client sessions against the local stand-in server
+- Compare per-symbol ticker calls with batched fan-in for large portfolios
+- Order book diff-depth update rate
+- TTL cache read/write throughput, eviction and reaper behaviour
+- Kline backfill into the backtest store: interrupted run, resume, incremental rerun
 - Simple JSON metrics output to metrics.json
 """
 from __future__ import annotations
@@ -46,7 +52,245 @@ async def run_benchmark(client_getter, paths: List[str], concurrency: int = 20,
     return metrics
 
 
+async def bench_rate_limiter(limiter, waiters: int = 10000, weights: List[int] | None = None, window: float = 1.0) -> Dict[str, Any]:
+    """Queue `waiters` acquires at once and measure how the limiter drains them.
+
+    Reports grant throughput, the heaviest weight granted inside any sliding
+    `window` (what the exchange would count) and the number of out-of-order
+    grants (FIFO inversions).
+    """
+    weights = weights or [1]
+    grants: List[tuple] = []
+
+    async def worker(i, w):
+        await limiter.acquire(w)
+        grants.append((time.monotonic(), i, w))
+
+    start = time.monotonic()
+    await asyncio.gather(*[worker(i, weights[i % len(weights)]) for i in range(waiters)])
+    total_time = time.monotonic() - start
+
+    max_window = 0
+    lo = 0
+    acc = 0
+    for hi in range(len(grants)):
+        acc += grants[hi][2]
+        while grants[hi][0] - grants[lo][0] >= window:
+            acc -= grants[lo][2]
+            lo += 1
+        max_window = max(max_window, acc)
+    inversions = sum(1 for a, b in zip(grants, grants[1:]) if b[1] < a[1])
+    return {
+        'waiters': waiters,
+        'total_time_s': total_time,
+        'grants_per_s': waiters / total_time if total_time > 0 else None,
+        'max_window_weight': max_window,
+        'fifo_inversions': inversions,
+    }
+
+
+async def compare_rate_limiters(waiters: int = 10000, rate: float = 10000.0, per: float = 1.0) -> Dict[str, Any]:
+    """Legacy RateLimiter vs WeightedRateLimiter with mixed endpoint weights."""
+    from async_api import RateLimiter, WeightedRateLimiter
+    weights = [1, 2, 2, 4, 20]
+    return {
+        'legacy': await bench_rate_limiter(RateLimiter(rate=rate, per=per), waiters, weights, per),
+        'weighted': await bench_rate_limiter(WeightedRateLimiter(rate=rate, per=per), waiters, weights, per),
+    }
+
+
+async def compare_pool_modes(requests: int = 2000, concurrency: int = 20, latency: float = 0.002) -> Dict[str, Any]:
+    """Default session vs pooled+warmed session against StandinServer.
+
+    Coalescing is off: the identical GETs would otherwise share a handful of
+    HTTP calls and the comparison would measure coalescing, not pooling.
+    """
+    from async_api import AsyncAPIClient
+    from standin import StandinServer
+    out = {}
+    for name, opts in (('default', {}), ('pooled', {'pooled': True, 'warmup': concurrency})):
+        async with StandinServer(latency=latency) as srv:
+            client = AsyncAPIClient(base_url=srv.base_url, concurrency=concurrency, rate=1e9, coalesce=False, **opts)
+            async with client:
+                async def getter(path):
+                    await client.get(path)
+                metrics = await run_benchmark(getter, ['/api/v3/ticker/price'], concurrency=concurrency, iterations=requests)
+            metrics.update(client.pool_stats.as_dict())
+            metrics['server_connections'] = srv.connections
+            out[name] = metrics
+    return out
+
+
+async def compare_ticker_fan_in(symbols: int = 200, latency: float = 0.005, concurrency: int = 20) -> Dict[str, Any]:
+    """One ticker call per holding (parallel_get) vs TickerBatcher.
+
+    The universe starts with the BTCUSDT symbol from test/mocks and is padded
+    with synthetic symbols served by StandinServer.
+    """
+    from async_api import AsyncAPIClient
+    from batch import TickerBatcher
+    from standin import StandinServer, load_mock
+    universe = [load_mock('ticker_price_BTCUSDT.json')['symbol']] + [f'SYM{i:04d}USDT' for i in range(symbols - 1)]
+    out = {}
+    for name in ('per_symbol', 'batched', 'batched_full_book'):
+        async with StandinServer(latency=latency, symbols=universe) as srv:
+            async with AsyncAPIClient(base_url=srv.base_url, concurrency=concurrency, rate=1e9) as client:
+                t0 = time.monotonic()
+                if name == 'per_symbol':
+                    await client.parallel_get(['/api/v3/ticker/price'] * len(universe), [{'symbol': s} for s in universe], concurrency=concurrency)
+                else:
+                    threshold = len(universe) if name == 'batched' else 100
+                    batcher = TickerBatcher(client, full_book_threshold=threshold)
+                    await batcher.prices(universe)
+                elapsed = time.monotonic() - t0
+            out[name] = {
+                'symbols': len(universe),
+                'total_time_s': elapsed,
+                'http_requests': srv.requests,
+                'used_weight': srv._used_weight,
+            }
+    return out
+
+
+async def bench_backfill(symbols: int = 10, days: int = 30, latency: float = 0.005, interrupt_after: float = 3.0) -> Dict[str, Any]:
+    """Backfill 1m klines for `symbols` x `days` from the stand-in, cancel
+    the first run part way, resume it, then rerun to check nothing is
+    refetched. Every stored series must be contiguous."""
+    import tempfile
+    from async_api import AsyncAPIClient
+    from klines import KlineDownloader, interval_ms
+    from standin import StandinServer
+    from strategies.backtest.store import KlineStore
+    import numpy as np
+    universe = [f'SYM{i:04d}USDT' for i in range(symbols)]
+    end = int(time.time() * 1000) // 60_000 * 60_000
+    start = end - days * 86_400_000
+    out: Dict[str, Any] = {'symbols': symbols, 'days': days}
+    with tempfile.TemporaryDirectory() as tmp:
+        async with StandinServer(latency=latency, symbols=universe) as srv:
+            async with AsyncAPIClient(base_url=srv.base_url, concurrency=20, rate=6000, per=60, pooled=True) as client:
+                store = KlineStore(tmp)
+                t0 = time.monotonic()
+                try:
+                    await asyncio.wait_for(KlineDownloader(client, store).backfill(universe, '1m', start, end), interrupt_after)
+                except asyncio.TimeoutError:
+                    pass
+                out['interrupted_after_rows'] = sum(store.rows(s, '1m') for s in universe)
+                dl = KlineDownloader(client, store)
+                await dl.backfill(universe, '1m', start, end)
+                out['resume_requests'] = dl.stats['requests']
+                out['total_time_s'] = time.monotonic() - t0
+                out['http_requests'] = srv.requests
+                out['pages_needed'] = symbols * -(-days * 1440 // 1000)
+                rerun = KlineDownloader(client, store)
+                await rerun.backfill(universe, '1m', start, end)
+                out['rerun_requests'] = rerun.stats['requests']
+                for s in universe:
+                    times = np.asarray(store.column(s, '1m', 'open_time'))
+                    assert len(times) == days * 1440 and times[0] == start
+                    assert (np.diff(times) == interval_ms('1m')).all()
+                out['rows'] = sum(store.rows(s, '1m') for s in universe)
+                out['used_weight'] = srv._used_weight
+    return out
+
+
+def bench_orderbook(events: int = 100000, levels: int = 1000, seed: int = 7) -> Dict[str, Any]:
+    """Apply synthetic depthUpdate events (string prices, like the stream)
+    to one OrderBook and measure events/s and price-level updates/s."""
+    import random
+    from orderbook import OrderBook
+    rnd = random.Random(seed)
+    tick = 0.01
+    mid = 42000.0
+    snapshot = {
+        'lastUpdateId': 1,
+        'bids': [[f'{mid - (i + 1) * tick:.2f}', '1.0'] for i in range(levels)],
+        'asks': [[f'{mid + (i + 1) * tick:.2f}', '1.0'] for i in range(levels)],
+    }
+    stream = []
+    u = 1
+    for _ in range(events):
+        mid += rnd.choice((-tick, 0.0, tick))
+        side_levels = []
+        for _side in range(2):
+            side_levels.append([[f'{mid + sign * rnd.randint(1, 50) * tick:.2f}', '0' if rnd.random() < 0.2 else f'{rnd.random() * 3:.4f}']
+                                for sign in ((-1,) if _side == 0 else (1,)) for _ in range(rnd.randint(1, 3))])
+        stream.append({'e': 'depthUpdate', 's': 'BTCUSDT', 'U': u + 1, 'u': u + 1, 'b': side_levels[0], 'a': side_levels[1]})
+        u += 1
+    ob = OrderBook('BTCUSDT')
+    ob.apply_snapshot(snapshot)
+    level_updates = sum(len(e['b']) + len(e['a']) for e in stream)
+    t0 = time.perf_counter()
+    for e in stream:
+        ob.apply_diff(e)
+    elapsed = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for _ in range(10000):
+        ob.best_bid()
+        ob.best_ask()
+    best_elapsed = time.perf_counter() - t0
+    return {
+        'events': events,
+        'events_per_s': events / elapsed,
+        'level_updates_per_s': level_updates / elapsed,
+        'book_levels': len(ob.bids) + len(ob.asks),
+        'best_bid_ask_us': best_elapsed / 10000 * 1e6,
+        'vwap_1btc': ob.vwap('BUY', 1.0),
+    }
+
+
+async def bench_cache(keys: int = 20000, ops: int = 200000, max_entries: int = 5000, ttl: float = 0.5) -> Dict[str, Any]:
+    """Mixed get/set load over more keys than the cache may hold."""
+    import random
+    from cache import TTLCache
+    rnd = random.Random(3)
+    cache = TTLCache(ttl=ttl, max_entries=max_entries, reap_interval=0.1)
+    names = [f'SYM{i}USDT' for i in range(keys)]
+    # half the traffic on a few hot symbols, half spread over the long tail
+    plan = [(rnd.random() < 0.2, names[int(rnd.paretovariate(1.2)) % keys if rnd.random() < 0.5 else rnd.randrange(keys)])
+            for _ in range(ops)]
+    t0 = time.perf_counter()
+    for is_set, key in plan:
+        if is_set:
+            await cache.set(key, {'symbol': key, 'price': '1.0'})
+        else:
+            await cache.get(key)
+    elapsed = time.perf_counter() - t0
+    size_before = len(cache)
+    await asyncio.sleep(ttl + 0.2)
+    out = {
+        'ops': ops,
+        'ops_per_s': ops / elapsed,
+        'entries_after_load': size_before,
+        'entries_after_ttl': len(cache),
+    }
+    out.update(cache.stats.as_dict())
+    await cache.close()
+    return out
+
+
 if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'limiter':
+        print(json.dumps(asyncio.run(compare_rate_limiters()), indent=2))
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == 'pool':
+        print(json.dumps(asyncio.run(compare_pool_modes()), indent=2))
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == 'cache':
+        print(json.dumps(asyncio.run(bench_cache()), indent=2))
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == 'orderbook':
+        print(json.dumps(bench_orderbook(), indent=2))
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == 'backfill':
+        print(json.dumps(asyncio.run(bench_backfill()), indent=2))
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == 'ticker':
+        print(json.dumps(asyncio.run(compare_ticker_fan_in()), indent=2))
+        sys.exit(0)
+
     import aiohttp
     from async_api import AsyncAPIClient
 
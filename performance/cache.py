@@ -1,89 +1,340 @@
 """
 Cache utilities for Binance skill
 - Price cache with TTL (5-10s configurable)
-- Balances cache (longer TTL)
+- Balances cache (no TTL, invalidated on balance changes)
 - Invalidation helpers
 
-Simple in-memory thread-safe caches using asyncio locks.
+TTLCache is sharded by key hash. Every shard is an LRU-ordered dict bounded
+by max_entries / max_bytes; expired keys are dropped on read and by a reaper
+task that sweeps one shard per tick, so keys nobody reads do not pile up.
+All access happens on the event loop, so reads and writes need no lock:
+nothing awaits between looking an entry up and updating it. The async
+methods are kept for compatibility; get_nowait()/set_nowait() are the same
+operations for synchronous callers on the loop.
+
+Stale-while-revalidate: with stale_ttl set, get_or_refresh() keeps serving
+an expired value for up to stale_ttl seconds while one background refresh
+runs, and with early_refresh_beta > 0 hot keys are refreshed shortly before
+they expire (probabilistic early expiration, "XFetch"), so a popular key
+does not expire for everyone at once. peek() exposes each entry's age.
 """
 from __future__ import annotations
+import math
+import random
 import time
 import asyncio
-from typing import Any, Dict, Optional
+import sys
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
 
 try:
     import orjson as _json
 except Exception:
     import json as _json
 
+_MISSING = object()
+
+
+def _sizeof(value: Any) -> int:
+    """Approximate payload size used for the max_bytes bound."""
+    try:
+        return len(_json.dumps(value))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    age: float      # seconds since the value was stored
+    stale: bool     # past its TTL (only served inside the stale_ttl grace window)
+
+
+class CacheStats:
+    __slots__ = ('hits', 'misses', 'evictions', 'expirations', 'reaped', 'stale_served', 'refreshes', 'early_refreshes')
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.reaped = 0
+        self.stale_served = 0
+        self.refreshes = 0
+        self.early_refreshes = 0
+
+    def as_dict(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else None,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'reaped': self.reaped,
+            'stale_served': self.stale_served,
+            'refreshes': self.refreshes,
+            'early_refreshes': self.early_refreshes,
+        }
+
+
+class _Shard:
+    __slots__ = ('entries', 'nbytes')
+
+    def __init__(self):
+        # key -> [value, expires_at, size, stored_at, load_time]; order is LRU -> MRU
+        self.entries: "OrderedDict[str, list]" = OrderedDict()
+        self.nbytes = 0
+
 
 class TTLCache:
-    def __init__(self, ttl: float = 5.0):
+    def __init__(self, ttl: Optional[float] = 5.0, shards: int = 16, max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None, reap_interval: Optional[float] = 1.0,
+                 stale_ttl: float = 0.0, early_refresh_beta: float = 0.0):
+        """ttl=None keeps entries until evicted or invalidated.
+
+        max_entries / max_bytes bound the whole cache (split evenly across
+        shards) with LRU eviction. reap_interval is the delay between reaper
+        ticks; the reaper starts on the first set() made inside a running loop.
+        stale_ttl is the grace window get_or_refresh() may serve expired
+        values in; early_refresh_beta scales how early hot keys refresh
+        (1.0 is the usual XFetch setting, 0 disables it).
+        """
         self._ttl = ttl
-        self._store: Dict[str, Any] = {}
-        self._exp: Dict[str, float] = {}
-        self._lock = asyncio.Lock()
+        self._stale_ttl = stale_ttl
+        self._beta = early_refresh_beta
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._shards: List[_Shard] = [_Shard() for _ in range(max(1, shards))]
+        n = len(self._shards)
+        self._max_entries = -(-max_entries // n) if max_entries else None
+        self._max_bytes = -(-max_bytes // n) if max_bytes else None
+        self._reap_interval = reap_interval
+        self._reaper: Optional[asyncio.Task] = None
+        self.stats = CacheStats()
 
-    async def get(self, key: str) -> Optional[Any]:
-        async with self._lock:
-            if key in self._store:
-                if time.time() < self._exp.get(key, 0):
-                    return self._store[key]
-                else:
-                    # expired
-                    del self._store[key]
-                    del self._exp[key]
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def __len__(self) -> int:
+        return sum(len(s.entries) for s in self._shards)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(s.nbytes for s in self._shards)
+
+    # -- synchronous core --------------------------------------------------
+
+    def get_nowait(self, key: str, default: Any = None) -> Any:
+        shard = self._shard(key)
+        entry = shard.entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return default
+        if entry[1] is not None and time.monotonic() >= entry[1]:
+            if time.monotonic() >= entry[1] + self._stale_ttl:
+                self._drop(shard, key)
+                self.stats.expirations += 1
+            self.stats.misses += 1
+            return default
+        shard.entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry[0]
+
+    def peek(self, key: str) -> Optional[CacheEntry]:
+        """Value and real age of an entry without touching LRU order or stats.
+        Expired entries are returned too (stale=True, whatever the grace
+        window) until they are reaped; None when nothing is stored."""
+        entry = self._shard(key).entries.get(key)
+        if entry is None:
             return None
+        now = time.monotonic()
+        return CacheEntry(entry[0], now - entry[3], entry[1] is not None and now >= entry[1])
+
+    def set_nowait(self, key: str, value: Any, ttl: Any = _MISSING, load_time: float = 0.0):
+        ttl = self._ttl if ttl is _MISSING else ttl
+        shard = self._shard(key)
+        size = _sizeof(value) if self._max_bytes else 0
+        old = shard.entries.pop(key, None)
+        if old is not None:
+            shard.nbytes -= old[2]
+        now = time.monotonic()
+        shard.entries[key] = [value, now + ttl if ttl is not None else None, size, now, load_time]
+        shard.nbytes += size
+        self._enforce_bounds(shard)
+        self._ensure_reaper()
+
+    def _drop(self, shard: _Shard, key: str):
+        entry = shard.entries.pop(key, None)
+        if entry is not None:
+            shard.nbytes -= entry[2]
+
+    def _enforce_bounds(self, shard: _Shard):
+        entries = shard.entries
+        while entries and ((self._max_entries and len(entries) > self._max_entries) or
+                           (self._max_bytes and shard.nbytes > self._max_bytes)):
+            _, entry = entries.popitem(last=False)
+            shard.nbytes -= entry[2]
+            self.stats.evictions += 1
+
+    # -- async API (drop-in for the previous lock-based cache) --------------
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self.get_nowait(key)
 
     async def set(self, key: str, value: Any):
-        async with self._lock:
-            self._store[key] = value
-            self._exp[key] = time.time() + self._ttl
+        self.set_nowait(key, value)
 
     async def invalidate(self, key: str):
-        async with self._lock:
-            if key in self._store:
-                del self._store[key]
-            if key in self._exp:
-                del self._exp[key]
+        self._drop(self._shard(key), key)
+
+    # -- stale-while-revalidate -------------------------------------------
+
+    async def get_or_refresh(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value, loading it with `loader` on a miss.
+
+        Inside the stale_ttl grace window the old value is returned at once
+        and one background refresh is started; fresh hot keys may start that
+        refresh early. Concurrent misses share a single load.
+        """
+        shard = self._shard(key)
+        entry = shard.entries.get(key)
+        if entry is not None:
+            now = time.monotonic()
+            expires = entry[1]
+            if expires is None or now < expires:
+                shard.entries.move_to_end(key)
+                self.stats.hits += 1
+                if expires is not None and self._beta > 0 and entry[4] > 0:
+                    # XFetch: refresh when now - load_time * beta * ln(rand) >= expiry
+                    if now - entry[4] * self._beta * math.log(random.random() or 1e-12) >= expires:
+                        if self._start_refresh(key, loader):
+                            self.stats.early_refreshes += 1
+                return entry[0]
+            if now < expires + self._stale_ttl:
+                self.stats.stale_served += 1
+                self._start_refresh(key, loader)
+                return entry[0]
+        self.stats.misses += 1
+        task = self._refreshing.get(key)
+        if task is None:
+            task = self._start_refresh(key, loader, count=False)
+        return await asyncio.shield(task)
+
+    def _start_refresh(self, key: str, loader: Callable[[], Awaitable[Any]], count: bool = True) -> Optional[asyncio.Task]:
+        if key in self._refreshing:
+            return None
+        if count:
+            self.stats.refreshes += 1
+
+        async def run():
+            t0 = time.monotonic()
+            try:
+                value = await loader()
+                self.set_nowait(key, value, load_time=time.monotonic() - t0)
+                return value
+            finally:
+                self._refreshing.pop(key, None)
+
+        task = asyncio.ensure_future(run())
+        # a failed background refresh keeps the stale value; nobody awaits it
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._refreshing[key] = task
+        return task
 
     async def clear(self):
-        async with self._lock:
-            self._store.clear()
-            self._exp.clear()
+        for shard in self._shards:
+            shard.entries.clear()
+            shard.nbytes = 0
+
+    # -- reaper ------------------------------------------------------------
+
+    def reap(self, shard_index: Optional[int] = None) -> int:
+        """Drop expired entries from one shard (or all); returns the count."""
+        shards = self._shards if shard_index is None else [self._shards[shard_index % len(self._shards)]]
+        now = time.monotonic()
+        removed = 0
+        for shard in shards:
+            expired = [k for k, e in shard.entries.items() if e[1] is not None and now >= e[1] + self._stale_ttl]
+            for k in expired:
+                self._drop(shard, k)
+            removed += len(expired)
+        self.stats.reaped += removed
+        return removed
+
+    def _ensure_reaper(self):
+        if self._reap_interval is None or self._ttl is None:
+            return
+        if self._reaper is not None and not self._reaper.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._reaper = loop.create_task(self._reap_loop())
+
+    async def _reap_loop(self):
+        i = 0
+        # one shard per tick keeps each pass short; a full sweep takes
+        # reap_interval * shards seconds
+        while True:
+            await asyncio.sleep(self._reap_interval / len(self._shards))
+            self.reap(i)
+            i += 1
+
+    async def close(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            try:
+                await self._reaper
+            except asyncio.CancelledError:
+                pass
+            self._reaper = None
 
 
 class BalancesCache:
-    def __init__(self):
-        self._store: Dict[str, Any] = {}
-        self._lock = asyncio.Lock()
+    def __init__(self, max_entries: Optional[int] = 10000):
+        self._cache = TTLCache(ttl=None, max_entries=max_entries, reap_interval=None)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
 
     async def get(self, account_id: str) -> Optional[Any]:
-        async with self._lock:
-            return self._store.get(account_id)
+        return self._cache.get_nowait(account_id)
 
     async def set(self, account_id: str, balances: Any):
-        async with self._lock:
-            self._store[account_id] = {
-                "balances": balances,
-                "last_update": time.time(),
-            }
+        self._cache.set_nowait(account_id, {
+            "balances": balances,
+            "last_update": time.time(),
+        })
 
     async def invalidate(self, account_id: str):
-        async with self._lock:
-            if account_id in self._store:
-                del self._store[account_id]
+        await self._cache.invalidate(account_id)
 
     async def clear(self):
-        async with self._lock:
-            self._store.clear()
+        await self._cache.clear()
 
 
 # Singleton instances for easy import/use
-price_cache = TTLCache(ttl=7.0)  # default to 7s
+# default to 7s, serve up to 5s stale while one refresh runs
+price_cache = TTLCache(ttl=7.0, max_entries=50000, stale_ttl=5.0, early_refresh_beta=1.0)
 balances_cache = BalancesCache()
 
 
+async def cached_price(client, symbol: str, cache: TTLCache = price_cache) -> Any:
+    """Ticker price through the cache; refreshes go through AsyncAPIClient.
+    Binance error payloads raise instead of being cached as the price."""
+    symbol = symbol.upper()
+
+    async def load():
+        res = await client.get('/api/v3/ticker/price', params={'symbol': symbol})
+        # Binance error payloads look like {"code": -1121, "msg": ...}
+        if isinstance(res, dict) and 'code' in res:
+            raise RuntimeError(f"ticker price {symbol}: {res.get('code')} {res.get('msg')}")
+        return res
+
+    return await cache.get_or_refresh(symbol, load)
+
+
 async def invalidate_on_balance_change(account_id: str):
     # call this when you detect a balance-changing event
     await balances_cache.invalidate(account_id)
@@ -97,5 +348,6 @@ if __name__ == "__main__":
         print(await price_cache.get('BTCUSDT'))
         await asyncio.sleep(8)
         print(await price_cache.get('BTCUSDT'))
+        print(price_cache.stats.as_dict())
 
     asyncio.run(demo())
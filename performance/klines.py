@@ -0,0 +1,160 @@
+"""
+Bulk /api/v3/klines backfill into the backtest kline store
+- Splits each symbol's date range into 1000-candle pages and fetches them
+  through AsyncAPIClient.parallel_get, interleaved across symbols, so the
+  client's weight-aware rate limiter paces the whole run
+- Pages are appended to strategies/backtest/store.KlineStore in time order
+  after each batch; the store tail plus a small JSON checkpoint (needed for
+  ranges that returned no candles, e.g. before a symbol was listed) is the
+  resume point, so a restart continues where it stopped
+- Later runs only request candles after the stored tail; the candle that is
+  still open is never stored
+
+    dl = KlineDownloader(client)
+    await dl.backfill(['BTCUSDT', 'ETHUSDT'], '1m', start='2023-01-01')
+"""
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from strategies.backtest.store import KlineStore, klines_frame, to_millis  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+KLINES_PATH = '/api/v3/klines'
+PAGE_LIMIT = 1000
+
+_UNIT_MS = {'s': 1000, 'm': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+
+def interval_ms(interval: str) -> int:
+    """Length of a kline interval in ms ('1m', '4h', '1d', ...). Calendar
+    months ('1M') have no fixed length and are not supported."""
+    unit = interval[-1]
+    if unit not in _UNIT_MS or not interval[:-1].isdigit():
+        raise ValueError(f'unsupported kline interval: {interval}')
+    return int(interval[:-1]) * _UNIT_MS[unit]
+
+
+class KlineDownloader:
+    def __init__(self, client, store: Optional[KlineStore] = None, checkpoint_path: Optional[str] = None,
+                 page_limit: int = PAGE_LIMIT, concurrency: int = 10, batch_pages: int = 50):
+        """batch_pages is how many pages are fetched between store appends
+        and checkpoint writes; concurrency caps in-flight requests."""
+        self._client = client
+        self.store = store or KlineStore()
+        self.checkpoint_path = checkpoint_path or os.path.join(self.store.root, 'backfill.json')
+        self.page_limit = page_limit
+        self.concurrency = concurrency
+        self.batch_pages = batch_pages
+        self.stats = {'requests': 0, 'candles': 0, 'empty_pages': 0, 'errors': 0}
+
+    # -- checkpoint --------------------------------------------------------
+
+    def _load_checkpoint(self) -> Dict[str, int]:
+        try:
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_checkpoint(self, checkpoint: Dict[str, int]):
+        os.makedirs(os.path.dirname(self.checkpoint_path) or '.', exist_ok=True)
+        tmp = self.checkpoint_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(checkpoint, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.checkpoint_path)
+
+    def resume_point(self, symbol: str, interval: str, start) -> int:
+        """First open_time still to fetch: past the stored tail, the
+        checkpoint and the requested start."""
+        step = interval_ms(interval)
+        start_ms = -(-to_millis(start) // step) * step
+        tail = self.store.last_open_time(symbol, interval)
+        nxt = self._load_checkpoint().get(f'{symbol.upper()}/{interval}', 0)
+        return max(start_ms, nxt, tail + step if tail is not None else 0)
+
+    # -- backfill ----------------------------------------------------------
+
+    def plan(self, symbols: Iterable[str], interval: str, start, end=None) -> List[tuple]:
+        """Pages (symbol, startTime, endTime) still missing, round-robin
+        across symbols. end is exclusive and defaults to the open time of
+        the current (unfinished) candle."""
+        step = interval_ms(interval)
+        current = int(time.time() * 1000) // step * step
+        end_ms = current if end is None else min(to_millis(end), current)
+        per_symbol = []
+        for symbol in symbols:
+            symbol = symbol.upper()
+            t = self.resume_point(symbol, interval, start)
+            pages = []
+            while t < end_ms:
+                page_end = min(t + self.page_limit * step, end_ms)
+                pages.append((symbol, t, page_end - 1))
+                t = page_end
+            per_symbol.append(pages)
+        out = []
+        for i in range(max((len(p) for p in per_symbol), default=0)):
+            out.extend(p[i] for p in per_symbol if i < len(p))
+        return out
+
+    async def backfill(self, symbols: Iterable[str], interval: str, start, end=None) -> Dict[str, int]:
+        """Fetch and store every missing closed candle in [start, end);
+        returns rows added per symbol. Safe to interrupt and call again."""
+        pages = self.plan(symbols, interval, start, end)
+        added: Dict[str, int] = {}
+        failed = set()
+        checkpoint = self._load_checkpoint()
+        for b in range(0, len(pages), self.batch_pages):
+            batch = [p for p in pages[b:b + self.batch_pages] if p[0] not in failed]
+            if not batch:
+                continue
+            params = [{'symbol': s, 'interval': interval, 'startTime': t0, 'endTime': t1, 'limit': self.page_limit}
+                      for s, t0, t1 in batch]
+            results = await self._client.parallel_get([KLINES_PATH] * len(batch), params, concurrency=self.concurrency)
+            self.stats['requests'] += len(batch)
+            # batch is in time order per symbol, so appending in order keeps the store contiguous
+            for (symbol, t0, t1), rows in zip(batch, results):
+                if symbol in failed:
+                    continue
+                if isinstance(rows, dict) and 'code' in rows:
+                    logger.warning('%s %s klines failed: %s', symbol, interval, rows.get('msg'))
+                    self.stats['errors'] += 1
+                    failed.add(symbol)
+                    continue
+                if rows:
+                    n = self.store.append(symbol, interval, klines_frame(rows))
+                    added[symbol] = added.get(symbol, 0) + n
+                    self.stats['candles'] += n
+                else:
+                    self.stats['empty_pages'] += 1
+                checkpoint[f'{symbol}/{interval}'] = t1 + 1
+            self._save_checkpoint(checkpoint)
+        return added
+
+
+if __name__ == "__main__":
+    import tempfile
+    from async_api import AsyncAPIClient
+    from standin import StandinServer
+
+    async def demo():
+        end = (int(time.time() * 1000) // 60_000) * 60_000
+        start = end - 3 * 86_400_000
+        with tempfile.TemporaryDirectory() as tmp:
+            async with StandinServer(latency=0.005, symbols=['BTCUSDT', 'ETHUSDT']) as srv:
+                srv.listing_time['ETHUSDT'] = start + 86_400_000
+                async with AsyncAPIClient(base_url=srv.base_url, rate=6000, per=60, pooled=True) as client:
+                    dl = KlineDownloader(client, KlineStore(tmp))
+                    print('first run', await dl.backfill(['BTCUSDT', 'ETHUSDT'], '1m', start, end), dl.stats)
+                    print('second run', await dl.backfill(['BTCUSDT', 'ETHUSDT'], '1m', start, end), dl.stats)
+                    print(dl.store.load('BTCUSDT', '1m').tail(3))
+
+    asyncio.run(demo())
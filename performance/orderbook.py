@@ -0,0 +1,243 @@
+"""
+Local L2 order book replica
+- REST snapshot (/api/v3/depth) + diff-depth stream (<symbol>@depth@100ms)
+  applied with Binance's update-id sequencing rules
+- Sorted price levels (bisect over a sorted key list + level dict):
+  best bid/ask is O(1), level lookup O(log n)
+- depth_to_price() and vwap() for sizing limit orders against visible depth
+- Sequence gaps mark the book out of sync and trigger an automatic resync
+
+Sequencing (from the Binance docs):
+  1. buffer diff events until the snapshot arrives
+  2. drop events with u <= lastUpdateId
+  3. the first applied event must have U <= lastUpdateId + 1 <= u
+  4. afterwards every event must start at the previous u + 1
+"""
+from __future__ import annotations
+import asyncio
+import bisect
+import logging
+import random
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BookSide:
+    """One side of the book. Keys are kept ascending with the best level
+    first: asks store the price, bids store -price."""
+
+    __slots__ = ('_sign', '_keys', '_levels')
+
+    def __init__(self, is_bid: bool):
+        self._sign = -1.0 if is_bid else 1.0
+        self._keys: List[float] = []
+        self._levels: Dict[float, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def clear(self):
+        self._keys.clear()
+        self._levels.clear()
+
+    def update(self, price: float, qty: float):
+        key = price * self._sign
+        if qty == 0.0:
+            if self._levels.pop(key, None) is not None:
+                i = bisect.bisect_left(self._keys, key)
+                del self._keys[i]
+            return
+        if key not in self._levels:
+            bisect.insort(self._keys, key)
+        self._levels[key] = qty
+
+    def load(self, levels: List[Tuple[float, float]]):
+        self.clear()
+        for price, qty in levels:
+            if qty:
+                self._levels[price * self._sign] = qty
+        self._keys = sorted(self._levels)
+
+    def best(self) -> Optional[Tuple[float, float]]:
+        if not self._keys:
+            return None
+        key = self._keys[0]
+        return key * self._sign, self._levels[key]
+
+    def qty_at(self, price: float) -> float:
+        return self._levels.get(price * self._sign, 0.0)
+
+    def levels(self, n: int | None = None) -> List[Tuple[float, float]]:
+        keys = self._keys if n is None else self._keys[:n]
+        return [(k * self._sign, self._levels[k]) for k in keys]
+
+    def depth_to_price(self, price: float) -> float:
+        """Total quantity at levels equal to or better than price."""
+        end = bisect.bisect_right(self._keys, price * self._sign)
+        levels = self._levels
+        return sum(levels[k] for k in self._keys[:end])
+
+    def vwap(self, qty: float) -> Optional[float]:
+        """Average fill price for taking qty from this side, or None if the
+        visible depth is not enough."""
+        left = qty
+        notional = 0.0
+        for k in self._keys:
+            take = min(left, self._levels[k])
+            notional += take * k * self._sign
+            left -= take
+            if left <= 0:
+                return notional / qty
+        return None
+
+
+class OrderBook:
+    def __init__(self, symbol: str):
+        self.symbol = symbol.upper()
+        self.bids = BookSide(is_bid=True)
+        self.asks = BookSide(is_bid=False)
+        self.last_update_id = 0
+        self.synced = False
+        self._buffer: List[dict] = []
+        self.updates = 0
+        self.resyncs = 0
+
+    # -- sequencing --------------------------------------------------------
+
+    def apply_snapshot(self, snapshot: dict):
+        """Load a /api/v3/depth response and replay buffered diff events.
+        ValueError for an error payload ({"code": -1003, "msg": ...}); the
+        book is left as it was."""
+        if not isinstance(snapshot, dict) or 'code' in snapshot or 'bids' not in snapshot or 'asks' not in snapshot:
+            raise ValueError(f'{self.symbol} bad depth snapshot: {snapshot!r:.200}')
+        self.bids.load([(float(p), float(q)) for p, q in snapshot['bids']])
+        self.asks.load([(float(p), float(q)) for p, q in snapshot['asks']])
+        self.last_update_id = snapshot['lastUpdateId']
+        self.synced = True
+        buffered, self._buffer = self._buffer, []
+        first = True
+        for event in buffered:
+            if event['u'] <= self.last_update_id:
+                continue
+            if first and not (event['U'] <= self.last_update_id + 1 <= event['u']):
+                # snapshot is older than the oldest buffered event
+                self._desync(buffered[buffered.index(event):])
+                return
+            first = False
+            if not self.apply_diff(event):
+                return
+
+    def apply_diff(self, event: dict) -> bool:
+        """Apply one depthUpdate event. Returns False when the book needs a
+        new snapshot (the event is buffered for the resync)."""
+        if not self.synced:
+            self._buffer.append(event)
+            return False
+        if event['u'] <= self.last_update_id:
+            return True
+        if event['U'] > self.last_update_id + 1:
+            logger.warning('%s depth gap: expected %d, got %d', self.symbol, self.last_update_id + 1, event['U'])
+            self._desync([event])
+            return False
+        update = self.bids.update
+        for p, q in event['b']:
+            update(float(p), float(q))
+        update = self.asks.update
+        for p, q in event['a']:
+            update(float(p), float(q))
+        self.last_update_id = event['u']
+        self.updates += 1
+        return True
+
+    def _desync(self, pending: List[dict]):
+        self.synced = False
+        self.resyncs += 1
+        self._buffer = list(pending)
+
+    # -- queries -----------------------------------------------------------
+
+    def best_bid(self) -> Optional[Tuple[float, float]]:
+        return self.bids.best()
+
+    def best_ask(self) -> Optional[Tuple[float, float]]:
+        return self.asks.best()
+
+    def spread(self) -> Optional[float]:
+        b, a = self.bids.best(), self.asks.best()
+        if b is None or a is None:
+            return None
+        return a[0] - b[0]
+
+    def depth_to_price(self, side: str, price: float) -> float:
+        """Quantity available to a taker on `side` ('BUY' walks the asks)
+        up to the limit price."""
+        book = self.asks if side.upper() == 'BUY' else self.bids
+        return book.depth_to_price(price)
+
+    def vwap(self, side: str, qty: float) -> Optional[float]:
+        book = self.asks if side.upper() == 'BUY' else self.bids
+        return book.vwap(qty)
+
+
+class DepthSync:
+    """Keeps OrderBooks in sync from a diff-depth source.
+
+    Feed depthUpdate payloads to on_event(); whenever a book is (or falls)
+    out of sync a snapshot is fetched through the AsyncAPIClient and the
+    buffered events are replayed on top of it. With streams.MarketStream:
+
+        sync = DepthSync(client)
+        MarketStream(['BTCUSDT'], channels=('bookTicker', 'miniTicker', 'depth@100ms'),
+                     depth_handler=sync.on_event)
+    """
+
+    def __init__(self, client, snapshot_limit: int = 1000, on_update: Optional[Callable[[OrderBook], Any]] = None,
+                 retry_delay: float = 0.25, max_retry_delay: float = 30.0):
+        """retry_delay: wait before re-fetching a snapshot that predates the
+        buffered events; a failed fetch waits retry_delay doubling up to
+        max_retry_delay, so one bad symbol cannot spend the shared weight
+        budget on limit=1000 depth calls (weight 50 each)."""
+        self._client = client
+        self._limit = snapshot_limit
+        self._retry_delay = retry_delay
+        self._max_retry_delay = max_retry_delay
+        self._on_update = on_update
+        self.books: Dict[str, OrderBook] = {}
+        self._resyncing: Dict[str, asyncio.Task] = {}
+
+    def book(self, symbol: str) -> OrderBook:
+        symbol = symbol.upper()
+        if symbol not in self.books:
+            self.books[symbol] = OrderBook(symbol)
+        return self.books[symbol]
+
+    def on_event(self, event: dict):
+        ob = self.book(event['s'])
+        if ob.apply_diff(event):
+            if self._on_update is not None:
+                self._on_update(ob)
+        elif ob.symbol not in self._resyncing:
+            self._resyncing[ob.symbol] = asyncio.ensure_future(self._resync(ob))
+
+    async def _resync(self, ob: OrderBook):
+        delay = self._retry_delay
+        try:
+            while True:
+                try:
+                    snapshot = await self._client.get('/api/v3/depth', params={'symbol': ob.symbol, 'limit': self._limit})
+                    ob.apply_snapshot(snapshot)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # stay in the loop: the next depth event must not start another fetch
+                    logger.warning('%s depth snapshot failed: %s', ob.symbol, e)
+                    await asyncio.sleep(delay + random.random() * delay)
+                    delay = min(delay * 2, self._max_retry_delay)
+                    continue
+                if ob.synced:
+                    break
+                # snapshot predates the buffered events; let the stream move on
+                await asyncio.sleep(self._retry_delay)
+        finally:
+            self._resyncing.pop(ob.symbol, None)
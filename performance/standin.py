@@ -0,0 +1,266 @@
+"""
+Local stand-in for the Binance REST API
+- Serves the JSON files in test/mocks on their /api/v3 paths
+- Sends X-MBX-USED-WEIGHT-1M headers like the exchange does
+- Counts requests and distinct client connections, so pooling can be checked
+- Optional artificial latency to make network effects visible in benchmarks
+- /stream websocket that replays recorded combined-stream frames
+  (test/mocks/stream_frames.json) for the requested streams, honours
+  SUBSCRIBE/UNSUBSCRIBE and can drop connections to exercise reconnects
+- listenKey endpoints and a /ws/<listenKey> user-data stream fed by
+  push_user_event(); account.json is the account snapshot
+- /api/v3/klines with deterministic synthetic candles up to the current
+  one (listing_time sets when a symbol's history starts)
+
+Used by benchmark.py and the __main__ demos to exercise the clients offline.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import math
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+try:
+    from aiohttp import web
+except Exception:
+    web = None  # type: ignore
+
+from async_api import endpoint_weight
+from klines import interval_ms
+
+MOCK_DIR = Path(__file__).resolve().parents[1] / 'test' / 'mocks'
+
+
+def load_mock(name: str) -> Any:
+    return json.loads((MOCK_DIR / name).read_text())
+
+
+class StandinServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, symbols: Optional[List[str]] = None):
+        """symbols is the listed universe used by the full-book ticker call."""
+        if web is None:
+            raise RuntimeError("aiohttp is required for StandinServer")
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.symbols = list(symbols or [load_mock('ticker_price_BTCUSDT.json')['symbol']])
+        self.requests = 0
+        self.paths: Dict[str, int] = {}
+        self._peers: set = set()
+        self._used_weight = 0
+        self._window_start = time.monotonic()
+        self._runner: Optional[web.AppRunner] = None
+
+        @web.middleware
+        async def middleware(request, handler):
+            return await self._middleware(request, handler)
+
+        self.app = web.Application(middlewares=[middleware])
+        self.app.router.add_get('/api/v3/ping', self._static('ping.json'))
+        self.app.router.add_get('/api/v3/time', self._static('time.json'))
+        self.app.router.add_get('/api/v3/account', self._static('account.json'))
+        self.app.router.add_get('/api/v3/ticker/price', self._ticker_price)
+        self.app.router.add_get('/api/v3/klines', self._klines)
+        self.app.router.add_get('/stream', self._stream)
+        self.app.router.add_post('/api/v3/userDataStream', self._listen_key)
+        self.app.router.add_put('/api/v3/userDataStream', self._listen_key)
+        self.app.router.add_delete('/api/v3/userDataStream', self._listen_key)
+        self.app.router.add_get('/ws/{listen_key}', self._user_stream)
+        self._user_sockets: List[Any] = []
+        self.listen_keys = 0
+        self.stream_frames: List[dict] = load_mock('stream_frames.json')
+        self.stream_interval = 0.01
+        self.drop_after: Optional[int] = None
+        self.ws_connections = 0
+        self._ws_seq = 0
+        self.listing_time: Dict[str, int] = {}
+
+    @property
+    def connections(self) -> int:
+        return len(self._peers)
+
+    @property
+    def base_url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    def add_route(self, method: str, path: str, handler: Callable[[Any], Awaitable[Any]]):
+        self.app.router.add_route(method, path, handler)
+
+    async def _middleware(self, request, handler):
+        self.requests += 1
+        self.paths[request.path] = self.paths.get(request.path, 0) + 1
+        self._peers.add((request.transport.get_extra_info('peername'), id(request.transport)))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        now = time.monotonic()
+        if now - self._window_start >= 60:
+            self._window_start = now
+            self._used_weight = 0
+        self._used_weight += endpoint_weight(request.method, request.path, dict(request.query))
+        resp = await handler(request)
+        resp.headers['X-MBX-USED-WEIGHT-1M'] = str(self._used_weight)
+        return resp
+
+    def _static(self, name: str):
+        body = load_mock(name)
+
+        async def handler(request):
+            return web.json_response(body)
+        return handler
+
+    def _price(self, symbol: str) -> str:
+        mock = load_mock('ticker_price_BTCUSDT.json')
+        return mock['price'] if symbol == mock['symbol'] else synthetic_price(symbol)
+
+    async def _ticker_price(self, request):
+        symbol = request.query.get('symbol')
+        if symbol:
+            return web.json_response({'symbol': symbol, 'price': self._price(symbol)})
+        if 'symbols' in request.query:
+            try:
+                wanted = json.loads(request.query['symbols'])
+            except ValueError:
+                return web.json_response({'code': -1100, 'msg': 'Illegal characters found in parameter symbols'}, status=400)
+            unknown = [s for s in wanted if s not in self.symbols]
+            if unknown:
+                return web.json_response({'code': -1121, 'msg': 'Invalid symbol.'}, status=400)
+            return web.json_response([{'symbol': s, 'price': self._price(s)} for s in wanted])
+        return web.json_response([{'symbol': s, 'price': self._price(s)} for s in self.symbols])
+
+    async def _klines(self, request):
+        q = request.query
+        symbol = q.get('symbol')
+        if symbol not in self.symbols:
+            return web.json_response({'code': -1121, 'msg': 'Invalid symbol.'}, status=400)
+        try:
+            step = interval_ms(q.get('interval', ''))
+        except ValueError:
+            return web.json_response({'code': -1120, 'msg': 'Invalid interval.'}, status=400)
+        limit = min(int(q.get('limit', 500)), 1000)
+        current = int(time.time() * 1000) // step * step
+        last = min(int(q['endTime']) // step * step if 'endTime' in q else current, current)
+        first = -(-max(int(q.get('startTime', 0)), self.listing_time.get(symbol, 0)) // step) * step
+        if 'startTime' not in q:
+            first = max(first, last - (limit - 1) * step)
+        return web.json_response([synthetic_kline(symbol, t, step) for t in range(first, min(last + 1, first + limit * step), step)])
+
+    async def _stream(self, request):
+        """Replay recorded frames in a loop, restamping update ids and event
+        times so every frame looks newer than the last one sent on any
+        connection, like a live feed."""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.ws_connections += 1
+        streams = set(filter(None, request.query.get('streams', '').split('/')))
+
+        async def control():
+            async for msg in ws:
+                if msg.type != web.WSMsgType.TEXT:
+                    continue
+                req = json.loads(msg.data)
+                if req.get('method') == 'SUBSCRIBE':
+                    streams.update(req.get('params', []))
+                elif req.get('method') == 'UNSUBSCRIBE':
+                    streams.difference_update(req.get('params', []))
+                await ws.send_json({'result': None, 'id': req.get('id')})
+
+        reader = asyncio.ensure_future(control())
+        sent = 0
+        try:
+            while not ws.closed:
+                for frame in self.stream_frames:
+                    if frame['stream'] not in streams:
+                        continue
+                    if self.drop_after is not None and sent >= self.drop_after:
+                        await ws.close()
+                        return ws
+                    self._ws_seq += 1
+                    data = dict(frame['data'])
+                    if 'u' in data:
+                        data['u'] = self._ws_seq
+                    if 'E' in data:
+                        data['E'] = int(time.time() * 1000)
+                    await ws.send_json({'stream': frame['stream'], 'data': data})
+                    sent += 1
+                    await asyncio.sleep(self.stream_interval)
+                await asyncio.sleep(self.stream_interval)
+        except ConnectionResetError:
+            pass
+        finally:
+            reader.cancel()
+        return ws
+
+    async def _listen_key(self, request):
+        if request.method == 'POST':
+            self.listen_keys += 1
+            return web.json_response({'listenKey': f'standin-listen-key-{self.listen_keys}'})
+        return web.json_response({})
+
+    async def _user_stream(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._user_sockets.append(ws)
+        try:
+            async for _ in ws:
+                pass
+        finally:
+            self._user_sockets.remove(ws)
+        return ws
+
+    async def push_user_event(self, event: dict):
+        """Send one user-data event to every connected /ws/<listenKey> client."""
+        for ws in list(self._user_sockets):
+            await ws.send_json(event)
+
+    async def drop_user_streams(self):
+        for ws in list(self._user_sockets):
+            await ws.close()
+
+    async def start(self) -> str:
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if self.port == 0:
+            self.port = site._server.sockets[0].getsockname()[1]
+        return self.base_url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+
+def synthetic_price(symbol: str) -> str:
+    """Deterministic per-symbol price so repeated runs return the same data."""
+    h = sum((i + 1) * ord(c) for i, c in enumerate(symbol))
+    return f'{(h % 5000) / 10 + 1:.8f}'
+
+
+def synthetic_kline(symbol: str, open_time: int, step: int) -> list:
+    """Deterministic candle in the /api/v3/klines row format."""
+    base = float(synthetic_price(symbol))
+    x = open_time / step
+    o = base * (1 + 0.01 * math.sin(x / 97))
+    c = base * (1 + 0.01 * math.sin((x + 1) / 97))
+    vol = 1 + (open_time // step) % 7
+    return [open_time, f'{o:.8f}', f'{max(o, c) * 1.0002:.8f}', f'{min(o, c) * 0.9998:.8f}', f'{c:.8f}', f'{vol:.8f}',
+            open_time + step - 1, f'{vol * c:.8f}', int(vol * 10), f'{vol / 2:.8f}', f'{vol * c / 2:.8f}', '0']
+
+
+if __name__ == "__main__":
+    async def demo():
+        async with StandinServer() as srv:
+            print('stand-in listening on', srv.base_url)
+            await asyncio.Event().wait()
+
+    asyncio.run(demo())
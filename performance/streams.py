@@ -0,0 +1,254 @@
+"""
+WebSocket market-data streams feeding price_cache
+- Combined <symbol>@bookTicker / <symbol>@miniTicker streams for the symbols in use
+- Live SUBSCRIBE/UNSUBSCRIBE when the symbol set changes
+- Reconnect with jittered exponential backoff
+- Planned rollover before Binance's 24h forced disconnect: the new connection
+  is opened first and the old one closed once the new one delivers data, so
+  there is no gap; stale frames from the overlap are dropped by event id/time
+
+Cache entries keep the REST ticker shape ({'symbol', 'price'}) plus bid/ask,
+so readers of price_cache do not care where the price came from.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+try:
+    import aiohttp
+except Exception:
+    aiohttp = None  # type: ignore
+
+try:
+    import orjson as _json
+except Exception:
+    import json as _json
+
+logger = logging.getLogger(__name__)
+
+STREAM_URL = 'wss://stream.binance.com:9443'
+# Binance drops every connection after 24h; roll over a bit earlier
+MAX_CONNECTION_LIFETIME = 23.5 * 3600
+
+
+class MarketStream:
+    def __init__(self, symbols: Iterable[str] = (), cache: Any = None, base_url: str = STREAM_URL,
+                 channels: Iterable[str] = ('bookTicker', 'miniTicker'), max_lifetime: float = MAX_CONNECTION_LIFETIME,
+                 backoff: float = 0.5, max_backoff: float = 30.0, depth_handler: Optional[Callable[[dict], Any]] = None):
+        """depth_handler receives depthUpdate payloads when a depth channel
+        (e.g. 'depth@100ms') is subscribed; see orderbook.DepthSync."""
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is required for MarketStream")
+        if cache is None:
+            from cache import price_cache
+            cache = price_cache
+        self.base_url = base_url.rstrip('/')
+        self._cache = cache
+        self._channels = tuple(channels)
+        self._symbols: Set[str] = {s.upper() for s in symbols}
+        self._max_lifetime = max_lifetime
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._depth_handler = depth_handler
+        self._state: Dict[str, dict] = {}
+        self._last_seen: Dict[tuple, int] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._task: Optional[asyncio.Task] = None
+        self._msg_id = 0
+        self.connected = asyncio.Event()
+        self.stats = {'connects': 0, 'reconnects': 0, 'rollovers': 0, 'messages': 0, 'stale_dropped': 0}
+
+    # -- subscription management -------------------------------------------
+
+    def _stream_names(self, symbols: Iterable[str]) -> list:
+        return [f'{s.lower()}@{c}' for s in sorted(symbols) for c in self._channels]
+
+    async def _send_method(self, method: str, symbols: Iterable[str]):
+        if self._ws is None or self._ws.closed:
+            return
+        self._msg_id += 1
+        await self._ws.send_str(_dumps({'method': method, 'params': self._stream_names(symbols), 'id': self._msg_id}))
+
+    async def subscribe(self, symbols: Iterable[str]):
+        new = {s.upper() for s in symbols} - self._symbols
+        if new:
+            self._symbols |= new
+            await self._send_method('SUBSCRIBE', new)
+
+    async def unsubscribe(self, symbols: Iterable[str]):
+        gone = {s.upper() for s in symbols} & self._symbols
+        if gone:
+            self._symbols -= gone
+            await self._send_method('UNSUBSCRIBE', gone)
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None
+        if self._session:
+            await self._session.close()
+        self.connected.clear()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def _url(self) -> str:
+        return f'{self.base_url}/stream?streams=' + '/'.join(self._stream_names(self._symbols))
+
+    async def _connect(self) -> "aiohttp.ClientWebSocketResponse":
+        # the server pings every few minutes; aiohttp answers automatically
+        ws = await self._session.ws_connect(self._url(), heartbeat=60.0)
+        self.stats['connects'] += 1
+        return ws
+
+    async def _run(self):
+        delay = self._backoff
+        next_ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        while True:
+            try:
+                ws = next_ws or await self._connect()
+                next_ws = None
+                self._ws = ws
+                self.connected.set()
+                delay = self._backoff
+                deadline = time.monotonic() + self._max_lifetime
+                next_ws = await self._consume(ws, deadline)
+                if next_ws is None:
+                    self.stats['reconnects'] += 1
+            except asyncio.CancelledError:
+                if next_ws is not None:
+                    await next_ws.close()
+                raise
+            except Exception as e:
+                logger.warning('market stream error: %s', e)
+                self.stats['reconnects'] += 1
+            self.connected.clear()
+            if next_ws is None:
+                await asyncio.sleep(delay + random.random() * delay)
+                delay = min(delay * 2, self._max_backoff)
+
+    async def _consume(self, ws, deadline: float) -> Optional["aiohttp.ClientWebSocketResponse"]:
+        """Read frames until the socket drops (returns None) or the lifetime
+        runs out (returns the already-live replacement connection)."""
+        while True:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                return await self._rollover(ws)
+            try:
+                msg = await ws.receive(timeout=timeout)
+            except asyncio.TimeoutError:
+                continue
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                await self._on_frame(msg.data)
+            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.ERROR):
+                return None
+
+    async def _rollover(self, old) -> Optional["aiohttp.ClientWebSocketResponse"]:
+        """Make-before-break: keep reading the old socket until the new one
+        delivers its first data frame, then close the old one."""
+        try:
+            new = await self._connect()
+        except Exception as e:
+            logger.warning('market stream rollover failed: %s', e)
+            await old.close()
+            return None
+        self.stats['rollovers'] += 1
+        new_first = asyncio.ensure_future(new.receive())
+        try:
+            while not new_first.done():
+                old_next = asyncio.ensure_future(old.receive())
+                done, _ = await asyncio.wait({new_first, old_next}, return_when=asyncio.FIRST_COMPLETED)
+                if old_next in done:
+                    msg = old_next.result()
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        await self._on_frame(msg.data)
+                    elif new_first not in done:
+                        # old socket is gone; just wait for the new one
+                        await asyncio.wait({new_first})
+                else:
+                    old_next.cancel()
+        finally:
+            await old.close()
+        msg = new_first.result()
+        if msg.type == aiohttp.WSMsgType.TEXT:
+            await self._on_frame(msg.data)
+            return new
+        await new.close()
+        return None
+
+    # -- frame handling ----------------------------------------------------
+
+    async def _on_frame(self, raw: str):
+        frame = _json.loads(raw)
+        data = frame.get('data') if isinstance(frame, dict) else None
+        if not data or 's' not in data:
+            # subscription acks ({"result": null, "id": n}) and the like
+            return
+        self.stats['messages'] += 1
+        if data.get('e') == 'depthUpdate':
+            if self._depth_handler is not None:
+                self._depth_handler(data)
+            return
+        symbol = data['s']
+        if data.get('e') == '24hrMiniTicker':
+            seq_key, seq = (symbol, 'mini'), data.get('E', 0)
+        else:
+            seq_key, seq = (symbol, 'book'), data.get('u', 0)
+        if seq < self._last_seen.get(seq_key, -1):
+            self.stats['stale_dropped'] += 1
+            return
+        self._last_seen[seq_key] = seq
+        state = self._state.setdefault(symbol, {'symbol': symbol})
+        if seq_key[1] == 'mini':
+            state['price'] = data['c']
+            state['event_time'] = data.get('E')
+        else:
+            state['bid'] = data['b']
+            state['ask'] = data['a']
+            if 'price' not in state:
+                state['price'] = str((float(data['b']) + float(data['a'])) / 2)
+        state['received'] = time.time()
+        await self._cache.set(symbol, dict(state))
+
+
+def _dumps(obj) -> str:
+    out = _json.dumps(obj)
+    return out.decode() if isinstance(out, bytes) else out
+
+
+if __name__ == "__main__":
+    from cache import TTLCache
+    from standin import StandinServer
+
+    async def demo():
+        cache = TTLCache(ttl=7.0)
+        async with StandinServer() as srv:
+            stream = MarketStream(['BTCUSDT'], cache=cache, base_url=srv.base_url.replace('http', 'ws'))
+            async with stream:
+                await asyncio.sleep(0.5)
+                print(await cache.get('BTCUSDT'), stream.stats)
+
+    asyncio.run(demo())
@@ -0,0 +1,246 @@
+"""
+User-data stream consumer keeping balances_cache current
+- Creates the listenKey and keeps it alive (PUT every 30 min, as Binance asks)
+- Applies outboundAccountPosition (absolute free/locked per asset) and
+  balanceUpdate (free delta) events to the cached balances as they arrive
+- Full /api/v3/account snapshot (weight 20) only on (re)connect: events that
+  arrive while the snapshot is in flight are buffered and replayed on top,
+  anything older than the snapshot's updateTime is skipped
+
+balances_cache keeps the /api/v3/account shape: a list of
+{'asset', 'free', 'locked'} dicts with string amounts.
+"""
+from __future__ import annotations
+import asyncio
+import hashlib
+import hmac
+import logging
+import random
+import time
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlencode
+
+try:
+    import aiohttp
+except Exception:
+    aiohttp = None  # type: ignore
+
+try:
+    import orjson as _json
+except Exception:
+    import json as _json
+
+logger = logging.getLogger(__name__)
+
+STREAM_URL = 'wss://stream.binance.com:9443'
+LISTEN_KEY_PATH = '/api/v3/userDataStream'
+KEEPALIVE_INTERVAL = 30 * 60
+
+
+def signed_params(params: dict, api_secret: str) -> dict:
+    """Add timestamp and HMAC-SHA256 signature for SIGNED endpoints."""
+    params = dict(params, timestamp=int(time.time() * 1000))
+    params['signature'] = hmac.new(api_secret.encode(), urlencode(params).encode(), hashlib.sha256).hexdigest()
+    return params
+
+
+class UserDataStream:
+    def __init__(self, client, api_key: str, api_secret: Optional[str] = None, account_id: str = 'default',
+                 cache: Any = None, stream_url: str = STREAM_URL, keepalive_interval: float = KEEPALIVE_INTERVAL,
+                 fetch_account: Optional[Callable[[], Awaitable[dict]]] = None,
+                 backoff: float = 0.5, max_backoff: float = 30.0):
+        """fetch_account overrides how the snapshot is loaded; by default it
+        is a signed GET /api/v3/account through the client."""
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is required for UserDataStream")
+        if fetch_account is None and not api_secret:
+            # /api/v3/account is SIGNED: never send it unsigned
+            raise ValueError("api_secret is required unless fetch_account is given")
+        if cache is None:
+            from cache import balances_cache
+            cache = balances_cache
+        self._client = client
+        self._headers = {'X-MBX-APIKEY': api_key}
+        self._secret = api_secret
+        self.account_id = account_id
+        self._cache = cache
+        self.stream_url = stream_url.rstrip('/')
+        self._keepalive_interval = keepalive_interval
+        self._fetch_account = fetch_account or self._default_fetch_account
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._balances: Dict[str, Dict[str, Decimal]] = {}
+        self._snapshot_time = 0
+        self._buffer: Optional[List[dict]] = None
+        self.listen_key: Optional[str] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self.ready = asyncio.Event()
+        self.stats = {'snapshots': 0, 'events': 0, 'skipped': 0, 'keepalives': 0, 'reconnects': 0}
+
+    # -- REST --------------------------------------------------------------
+
+    async def _default_fetch_account(self) -> dict:
+        return await self._client.get('/api/v3/account', params=signed_params({}, self._secret), headers=self._headers)
+
+    async def _new_listen_key(self) -> str:
+        res = await self._client.post(LISTEN_KEY_PATH, headers=self._headers)
+        return res['listenKey']
+
+    async def _keepalive(self, listen_key: str):
+        while True:
+            await asyncio.sleep(self._keepalive_interval)
+            await self._client.put(LISTEN_KEY_PATH, params={'listenKey': listen_key}, headers=self._headers)
+            self.stats['keepalives'] += 1
+
+    # -- balances ----------------------------------------------------------
+
+    def balances(self) -> List[dict]:
+        return [{'asset': a, 'free': format(v['free'], 'f'), 'locked': format(v['locked'], 'f')} for a, v in sorted(self._balances.items())]
+
+    async def _publish(self):
+        await self._cache.set(self.account_id, self.balances())
+
+    def _load_snapshot(self, account: dict):
+        # an error payload must not publish an empty account: raise so _run reconnects with backoff
+        if not isinstance(account, dict) or 'code' in account or 'balances' not in account:
+            raise RuntimeError(f'bad /api/v3/account snapshot: {account!r:.200}')
+        self._balances = {b['asset']: {'free': Decimal(b['free']), 'locked': Decimal(b['locked'])} for b in account['balances']}
+        self._snapshot_time = account.get('updateTime', 0)
+        self.stats['snapshots'] += 1
+
+    def _apply(self, event: dict) -> bool:
+        etype = event.get('e')
+        if etype == 'outboundAccountPosition':
+            if event.get('u', event.get('E', 0)) < self._snapshot_time:
+                self.stats['skipped'] += 1
+                return False
+            for b in event['B']:
+                self._balances[b['a']] = {'free': Decimal(b['f']), 'locked': Decimal(b['l'])}
+        elif etype == 'balanceUpdate':
+            if event.get('T', event.get('E', 0)) <= self._snapshot_time:
+                self.stats['skipped'] += 1
+                return False
+            bal = self._balances.setdefault(event['a'], {'free': Decimal(0), 'locked': Decimal(0)})
+            bal['free'] += Decimal(event['d'])
+        else:
+            return False
+        self.stats['events'] += 1
+        return True
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.listen_key:
+            try:
+                await self._client.delete(LISTEN_KEY_PATH, params={'listenKey': self.listen_key}, headers=self._headers)
+            except Exception as e:
+                logger.warning('failed to close listenKey: %s', e)
+            self.listen_key = None
+        if self._session:
+            await self._session.close()
+        self.ready.clear()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _run(self):
+        delay = self._backoff
+        while True:
+            keepalive = None
+            try:
+                self.listen_key = await self._new_listen_key()
+                keepalive = asyncio.ensure_future(self._keepalive(self.listen_key))
+                async with self._session.ws_connect(f'{self.stream_url}/ws/{self.listen_key}', heartbeat=60.0) as ws:
+                    await self._sync(ws)
+                    delay = self._backoff
+                    await self._consume(ws)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning('user data stream error: %s', e)
+            finally:
+                if keepalive is not None:
+                    keepalive.cancel()
+            self.ready.clear()
+            self.stats['reconnects'] += 1
+            await asyncio.sleep(delay + random.random() * delay)
+            delay = min(delay * 2, self._max_backoff)
+
+    async def _sync(self, ws):
+        """Load the snapshot while the socket is already buffering events."""
+        self._buffer = []
+        reader = asyncio.ensure_future(self._fill_buffer(ws))
+        try:
+            account = await self._fetch_account()
+        finally:
+            reader.cancel()
+            try:
+                await reader
+            except asyncio.CancelledError:
+                pass
+        self._load_snapshot(account)
+        buffered, self._buffer = self._buffer, None
+        for event in buffered:
+            self._apply(event)
+        await self._publish()
+        self.ready.set()
+
+    async def _fill_buffer(self, ws):
+        async for msg in ws:
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                self._buffer.append(_json.loads(msg.data))
+            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                return
+
+    async def _consume(self, ws):
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                if msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                    return
+                continue
+            event = _json.loads(msg.data)
+            if event.get('e') == 'listenKeyExpired':
+                return
+            if self._apply(event):
+                await self._publish()
+
+
+if __name__ == "__main__":
+    from async_api import AsyncAPIClient
+    from cache import BalancesCache
+    from standin import StandinServer
+
+    async def demo():
+        cache = BalancesCache()
+        async with StandinServer() as srv:
+            async with AsyncAPIClient(base_url=srv.base_url) as client:
+                uds = UserDataStream(client, api_key='demo', api_secret='demo', cache=cache, stream_url=srv.base_url.replace('http', 'ws'))
+                async with uds:
+                    await uds.ready.wait()
+                    print('snapshot', await cache.get('default'))
+                    await srv.push_user_event({'e': 'balanceUpdate', 'E': int(time.time() * 1000), 'a': 'USDT', 'd': '-100.00', 'T': int(time.time() * 1000)})
+                    await srv.push_user_event({'e': 'outboundAccountPosition', 'E': int(time.time() * 1000), 'u': int(time.time() * 1000),
+                                               'B': [{'a': 'BTC', 'f': '0.00600000', 'l': '0.00000000'}]})
+                    await asyncio.sleep(0.1)
+                    print('after events', await cache.get('default'), uds.stats)
+
+    asyncio.run(demo())
@@ -1,6 +1,11 @@
 """
 Pair arbitrage (triangular/simple) between symbols.
 Simple simulation using multiple price series (assumes prices are quoted vs a common quote, e.g., USDT).
+
+Arbitrage.run() is vectorized (mode='loop' keeps the original iterrows
+version as the reference). TriangleScanner scans many triangles per pass over
+a wide (time x symbols) price frame; find_triangles() builds the triangle
+list from exchange pairs.
 """
 import pandas as pd
 import numpy as np
@@ -15,9 +20,21 @@ class Arbitrage:
         self.c = pair_c
         self.fee = fee
 
-    def run(self, price_a: pd.Series, price_b: pd.Series, price_c: pd.Series):
+    def run(self, price_a: pd.Series, price_b: pd.Series, price_c: pd.Series, mode='vectorized'):
         # Align indexes
         df = pd.concat([price_a.rename('pa'), price_b.rename('pb'), price_c.rename('pc')], axis=1).dropna()
+        if mode == 'loop':
+            return self._run_loop(df)
+        if mode != 'vectorized':
+            raise ValueError(f'unknown mode: {mode}')
+        pa, pb, pc = (df[c].to_numpy(dtype=float) for c in ('pa', 'pb', 'pc'))
+        # If pa * pb > pc -> arbitrage (A->B->C->A)
+        hit = pa * pb > pc * (1 + self.fee)
+        if not hit.any():
+            return pd.DataFrame([])
+        return pd.DataFrame({'timestamp': df.index[hit], 'profit_ratio': pa[hit] * pb[hit] / pc[hit] - 1.0})
+
+    def _run_loop(self, df):
         opportunities = []
         for ts, row in df.iterrows():
             # If pa * pb > pc -> arbitrage (A->B->C->A)
@@ -29,3 +46,79 @@ class Arbitrage:
     @staticmethod
     def params_grid():
         return {'fee':[0.0005, 0.00075, 0.001]}
+
+
+def find_triangles(pairs):
+    """Triangles (A/B, B/C, A/C) from exchange pairs.
+
+    pairs: iterable of dicts with symbol/baseAsset/quoteAsset (the
+    /api/v3/exchangeInfo shape) or (symbol, base, quote) tuples.
+    Returns a DataFrame with columns pair_a, pair_b, pair_c, asset_a,
+    asset_b, asset_c, one row per triangle, in the orientation Arbitrage uses.
+    """
+    by_assets = {}
+    by_base = {}
+    for p in pairs:
+        if isinstance(p, dict):
+            sym, base, quote = p['symbol'], p['baseAsset'], p['quoteAsset']
+        else:
+            sym, base, quote = p
+        by_assets[(base, quote)] = sym
+        by_base.setdefault(base, []).append((quote, sym))
+    rows = []
+    for (a, b), sym_ab in by_assets.items():
+        for c, sym_bc in by_base.get(b, ()):
+            sym_ac = by_assets.get((a, c))
+            if sym_ac is not None and c != a:
+                rows.append((sym_ab, sym_bc, sym_ac, a, b, c))
+    return pd.DataFrame(rows, columns=['pair_a', 'pair_b', 'pair_c', 'asset_a', 'asset_b', 'asset_c'])
+
+
+class TriangleScanner:
+    """Scan every triangle over a wide price frame in one vectorized pass.
+
+    prices: DataFrame indexed by timestamp with one column per symbol.
+    Both directions are checked: forward (A->B->C->A, the Arbitrage.run
+    condition pa*pb > pc*(1+fee)) and reverse (pc > pa*pb*(1+fee)).
+    Rows are processed in blocks so memory stays at block x triangles.
+    """
+
+    def __init__(self, triangles: pd.DataFrame, fee=0.00075, block_rows=65536):
+        self.triangles = triangles.reset_index(drop=True)
+        self.fee = fee
+        self.block_rows = block_rows
+
+    def run(self, prices: pd.DataFrame) -> pd.DataFrame:
+        cols = {c: i for i, c in enumerate(prices.columns)}
+        tri = self.triangles
+        present = tri['pair_a'].isin(cols) & tri['pair_b'].isin(cols) & tri['pair_c'].isin(cols)
+        tri_ids = np.flatnonzero(present.to_numpy())
+        ia = tri.loc[present, 'pair_a'].map(cols).to_numpy()
+        ib = tri.loc[present, 'pair_b'].map(cols).to_numpy()
+        ic = tri.loc[present, 'pair_c'].map(cols).to_numpy()
+        values = prices.to_numpy(dtype=float)
+        k = 1.0 + self.fee
+        out_rows, out_tri, out_dir, out_profit = [], [], [], []
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for start in range(0, len(values), self.block_rows):
+                block = values[start:start + self.block_rows]
+                # cross rate vs direct rate for every (row, triangle)
+                ab = block[:, ia] * block[:, ib]
+                c = block[:, ic]
+                for direction, hit, num, den in ((1, ab > c * k, ab, c), (-1, c > ab * k, c, ab)):
+                    r, t = np.nonzero(hit)
+                    out_rows.append(r + start)
+                    out_tri.append(t)
+                    out_dir.append(np.full(len(r), direction, dtype=np.int8))
+                    out_profit.append(num[r, t] / den[r, t] - 1.0)
+        if not out_rows:
+            out_rows, out_tri = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+            out_dir, out_profit = [np.empty(0, dtype=np.int8)], [np.empty(0)]
+        rows, tris, dirs = np.concatenate(out_rows), np.concatenate(out_tri), np.concatenate(out_dir)
+        order = np.lexsort((-dirs, tris, rows))
+        return pd.DataFrame({
+            'timestamp': prices.index[rows[order]],
+            'triangle': tri_ids[tris[order]],
+            'direction': dirs[order],
+            'profit_ratio': np.concatenate(out_profit)[order],
+        })
@@ -0,0 +1,293 @@
+"""
+Benchmarks and equivalence checks for the vectorized strategy engines.
+Run from the repository root:
+
+    python -m strategies.backtest.benchmark grid [ticks]
+    python -m strategies.backtest.benchmark arbitrage [rows] [assets]
+    python -m strategies.backtest.benchmark optimize [ticks] [workers]
+    python -m strategies.backtest.benchmark store [minutes]
+    python -m strategies.backtest.benchmark streaming [symbols] [ticks]
+    python -m strategies.backtest.benchmark indicators [symbols] [bars]
+
+Each benchmark first checks the fast engine against the reference loop on a
+prefix of the series, then times both and prints a JSON summary.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from strategies.arbitrage import Arbitrage, TriangleScanner, find_triangles
+from strategies.backtest.framework import Backtest
+from strategies.backtest.optimizer import ParallelOptimizer
+from strategies.backtest.store import KlineStore
+from strategies.grid import GridTrader
+from strategies.indicators import batch, ta
+from strategies.indicators.streaming import StreamingBollinger, StreamingMACD, StreamingRSI
+
+
+def synthetic_prices(n, start=30000.0, vol=0.0005, seed=42, freq='1min'):
+    """Geometric random walk indexed by a minute clock."""
+    rng = np.random.default_rng(seed)
+    prices = start * np.exp(np.cumsum(rng.normal(0.0, vol, n)))
+    return pd.Series(prices, index=pd.date_range('2024-01-01', periods=n, freq=freq))
+
+
+def assert_same_result(a, b, rtol=1e-9):
+    """Compare two strategy result dicts (floats within rtol, trades frames)."""
+    for key in a:
+        if key == 'trades':
+            ta, tb = a['trades'], b['trades']
+            assert list(ta.columns) == list(tb.columns), (ta.columns, tb.columns)
+            assert len(ta) == len(tb), (len(ta), len(tb))
+            for col in ta.columns:
+                if ta[col].dtype.kind == 'f':
+                    np.testing.assert_allclose(ta[col].to_numpy(), tb[col].to_numpy(), rtol=rtol)
+                else:
+                    assert (ta[col].to_numpy() == tb[col].to_numpy()).all(), col
+        else:
+            np.testing.assert_allclose(a[key], b[key], rtol=rtol, atol=1e-9)
+
+
+def _timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    res = fn(*args, **kwargs)
+    return res, time.perf_counter() - t0
+
+
+def bench_grid(ticks=1_000_000, levels=100, check_ticks=50_000):
+    prices = synthetic_prices(ticks)
+    lo, hi = float(prices.min()), float(prices.max())
+    trader = GridTrader('BTCUSDT', lo, hi, levels, 10_000)
+    head = prices.iloc[:check_ticks]
+    ref, t_loop = _timed(trader.run, head, mode='loop')
+    fast, t_vec_head = _timed(trader.run, head)
+    assert_same_result(ref, fast)
+    full, t_vec = _timed(trader.run, prices)
+    return {
+        'ticks': ticks,
+        'levels': levels,
+        'trades': len(full['trades']),
+        'equivalence_checked_ticks': check_ticks,
+        'loop_s_on_check': t_loop,
+        'vectorized_s_on_check': t_vec_head,
+        'speedup_on_check': t_loop / t_vec_head,
+        'vectorized_s_full': t_vec,
+        'loop_s_full_estimate': t_loop * ticks / check_ticks,
+    }
+
+
+def synthetic_market(rows, assets, quotes=('USDT', 'BTC', 'ETH', 'BNB'), noise=0.00015, seed=11):
+    """Wide price frame for every asset against every quote plus the quote
+    crosses. Prices are consistent cross rates with independent noise, so a
+    few rows show triangular edges above the fee."""
+    rng = np.random.default_rng(seed)
+    names = list(quotes) + [f'A{i:03d}' for i in range(assets)]
+    idx = {n: i for i, n in enumerate(names)}
+    pairs = [(f'{b}{q}', b, q) for qi, q in enumerate(quotes) for b in quotes[qi + 1:]]
+    pairs += [(f'{a}{q}', a, q) for a in names[len(quotes):] for q in quotes]
+    log_usd = np.cumsum(rng.normal(0, 0.0003, (rows, len(names))), axis=0) + np.log(rng.uniform(0.1, 1000, len(names)))
+    log_usd[:, 0] = 0.0
+    values = np.empty((rows, len(pairs)))
+    for j, (_, b, q) in enumerate(pairs):
+        values[:, j] = np.exp(log_usd[:, idx[b]] - log_usd[:, idx[q]] + rng.normal(0, noise, rows))
+    del log_usd
+    frame = pd.DataFrame(values, index=pd.date_range('2024-01-01', periods=rows, freq='1s'), columns=[p[0] for p in pairs])
+    return frame, pairs
+
+
+def bench_arbitrage(rows=1_000_000, assets=24, check_rows=20_000):
+    prices, pairs = synthetic_market(rows, assets)
+    triangles = find_triangles(pairs)
+    head = prices.iloc[:check_rows]
+    scanner = TriangleScanner(triangles)
+    scan_head = scanner.run(head)
+    # check against the loop on the triangle with the most forward edges
+    fwd_hits = scan_head[scan_head.direction == 1].triangle
+    tid = int(fwd_hits.mode().iloc[0]) if len(fwd_hits) else 0
+    t0 = triangles.iloc[tid]
+    arb = Arbitrage(t0.pair_a, t0.pair_b, t0.pair_c, fee=scanner.fee)
+    series = [head[t0.pair_a], head[t0.pair_b], head[t0.pair_c]]
+    ref, t_loop = _timed(arb.run, *series, mode='loop')
+    fast, t_vec = _timed(arb.run, *series)
+    assert_same_result({'trades': ref}, {'trades': fast})
+    fwd = scan_head[(scan_head.triangle == tid) & (scan_head.direction == 1)][['timestamp', 'profit_ratio']].reset_index(drop=True)
+    if len(ref):
+        assert_same_result({'trades': ref}, {'trades': fwd})
+    else:
+        assert len(fwd) == 0
+    found, t_scan = _timed(scanner.run, prices)
+    return {
+        'rows': rows,
+        'symbols': prices.shape[1],
+        'triangles': len(triangles),
+        'opportunities': len(found),
+        'loop_checked_opportunities': len(ref),
+        'loop_s_one_triangle_on_check': t_loop,
+        'vectorized_s_one_triangle_on_check': t_vec,
+        'scanner_s_all_triangles_full': t_scan,
+        'loop_s_all_triangles_full_estimate': t_loop * rows / check_rows * len(triangles),
+    }
+
+
+def bench_optimize(ticks=200_000, workers=4):
+    """Grid sweep serially and on a pool; both must rank every point the
+    same way and pick the same winner, with and without halving."""
+    prices = synthetic_prices(ticks)
+    lo, hi = float(prices.min()), float(prices.max())
+    grid = {'grid_size': [5, 10, 20, 40, 80], 'lower_price': list(np.linspace(lo, lo + (hi - lo) / 2, 8))}
+    fixed = {'symbol': 'BTCUSDT', 'upper_price': hi, 'investment': 1000}
+    out = {'ticks': ticks, 'points': len(ParallelOptimizer(prices, GridTrader, grid).points), 'workers': workers}
+    for label, eta in (('full', None), ('halving', 3)):
+        runs = {}
+        for w in (1, workers):
+            opt = ParallelOptimizer(prices, GridTrader, grid, workers=w, fixed=fixed, eta=eta)
+            best, t = _timed(opt.run)
+            runs[w] = (best, sorted((r['_rung'], r['_index'], r['_score']) for r in opt.results), t)
+        (b1, r1, t1), (bn, rn, tn) = runs[1], runs[workers]
+        assert r1 == rn
+        assert b1['_params'] == bn['_params']
+        assert_same_result({k: b1[k] for k in ('final_cash', 'owned', 'trades')}, bn, rtol=0)
+        out[label] = {'evaluations': len(r1), 'best': b1['_params'], 'roi': b1['roi'],
+                      'serial_s': t1, 'pool_s': tn}
+    legacy = Backtest(prices).optimize(GridTrader, grid, fixed=fixed)
+    assert legacy['_params'] == out['full']['best']
+    return out
+
+
+def bench_store(minutes=525_600):
+    """A year of 1m candles: read_csv (the old load_csv) vs the memmapped
+    store, plus a one-week range slice."""
+    close = synthetic_prices(minutes)
+    df = pd.DataFrame({'open': close.shift(1).fillna(close.iloc[0]), 'high': close * 1.0005, 'low': close * 0.9995,
+                       'close': close, 'volume': 1.0}, index=close.index.rename('timestamp'))
+    with tempfile.TemporaryDirectory() as tmp:
+        csv = os.path.join(tmp, 'BTCUSDT_1m.csv')
+        df.to_csv(csv)
+        parsed, t_csv = _timed(lambda: pd.read_csv(csv, parse_dates=['timestamp'], index_col='timestamp')['close'])
+        store = KlineStore(os.path.join(tmp, 'klines'))
+        added, t_import = _timed(store.import_csv, csv, 'BTCUSDT', '1m')
+        loaded, t_load = _timed(store.load_close, 'BTCUSDT', '1m')
+        assert added == minutes and (loaded.to_numpy() == parsed.to_numpy()).all()
+        assert (loaded.index == parsed.index).all()
+        start = close.index[minutes // 2]
+        week, t_slice = _timed(store.load, 'BTCUSDT', '1m', start, start + pd.Timedelta('7D'))
+        assert len(week) == 7 * 1440 and week.index[0] == start
+        assert store.append('BTCUSDT', '1m', df.iloc[-10:]) == 0
+    return {
+        'candles': minutes,
+        'read_csv_s': t_csv,
+        'import_csv_once_s': t_import,
+        'store_load_close_s': t_load,
+        'store_week_slice_s': t_slice,
+        'speedup': t_csv / t_load,
+    }
+
+
+def synthetic_matrix(ticks, symbols, seed=5):
+    """(time x symbols) frame of independent random walks."""
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(1, 1000, symbols)
+    values = start * np.exp(np.cumsum(rng.normal(0, 0.001, (ticks, symbols)), axis=0))
+    return pd.DataFrame(values, index=pd.date_range('2024-01-01', periods=ticks, freq='1min'),
+                        columns=[f'SYM{i:04d}USDT' for i in range(symbols)])
+
+
+def bench_streaming(symbols=500, ticks=5000, check_symbols=20):
+    """Streaming indicators fed one tick batch (all symbols) at a time vs
+    recomputing ta.py over the history on every tick."""
+    prices = synthetic_matrix(ticks, symbols)
+    values = prices.to_numpy()
+    rsi, macd, boll = StreamingRSI(size=symbols), StreamingMACD(size=symbols), StreamingBollinger(size=symbols)
+    out = {name: np.empty((ticks, symbols)) for name in ('rsi', 'macd', 'signal', 'hist', 'upper', 'mid', 'lower')}
+    t0 = time.perf_counter()
+    for t in range(ticks):
+        row = values[t]
+        out['rsi'][t] = rsi.update(row)
+        out['macd'][t], out['signal'][t], out['hist'][t] = macd.update(row)
+        out['upper'][t], out['mid'][t], out['lower'][t] = boll.update(row)
+    t_stream = time.perf_counter() - t0
+    for col in range(check_symbols):
+        s = prices.iloc[:, col]
+        expected = dict(zip(('macd', 'signal', 'hist'), ta.MACD(s)))
+        expected.update(zip(('upper', 'mid', 'lower'), ta.Bollinger(s)))
+        expected['rsi'] = ta.RSI(s)
+        for name, ref in expected.items():
+            np.testing.assert_allclose(out[name][:, col], ref.to_numpy(), rtol=1e-7, atol=1e-7, err_msg=name)
+    # the old way: a monitor recomputing everything for one symbol on each new tick
+    s = prices.iloc[:, 0]
+    t0 = time.perf_counter()
+    for t in range(ticks - 100, ticks):
+        h = s.iloc[:t + 1]
+        ta.RSI(h), ta.MACD(h), ta.Bollinger(h)
+    t_recompute = (time.perf_counter() - t0) / 100
+    # single symbol, scalar updates
+    one = (StreamingRSI(), StreamingMACD(), StreamingBollinger())
+    t0 = time.perf_counter()
+    for p in values[:, 0]:
+        for ind in one:
+            ind.update(p)
+    t_scalar = (time.perf_counter() - t0) / ticks
+    return {
+        'symbols': symbols,
+        'ticks': ticks,
+        'equivalence_checked_symbols': check_symbols,
+        'stream_s_per_tick_all_symbols': t_stream / ticks,
+        'stream_s_per_tick_one_symbol_scalar': t_scalar,
+        'recompute_s_per_tick_one_symbol': t_recompute,
+        'recompute_s_per_tick_all_symbols_estimate': t_recompute * symbols,
+    }
+
+
+def bench_indicators(symbols=500, bars=10_000):
+    """compute_all() on a (bars x symbols) matrix vs looping ta.py over
+    the columns. A tenth of the symbols list part way through and one has a
+    gap, so NaN handling is compared too."""
+    prices = synthetic_matrix(bars, symbols)
+    values = prices.to_numpy(copy=True)
+    values[:bars // 3, ::10] = np.nan
+    values[bars // 2:bars // 2 + 5, 1] = np.nan
+    prices = pd.DataFrame(values, index=prices.index, columns=prices.columns)
+
+    def loop():
+        out = {k: {} for k in batch.OUTPUTS}
+        for col in prices.columns:
+            s = prices[col]
+            out['rsi'][col] = ta.RSI(s)
+            out['macd'][col], out['signal'][col], out['hist'][col] = ta.MACD(s)
+            out['bb_upper'][col], out['bb_mid'][col], out['bb_lower'][col] = ta.Bollinger(s)
+        return {k: pd.DataFrame(v) for k, v in out.items()}
+
+    ref, t_loop = _timed(loop)
+    res = {'symbols': symbols, 'bars': bars, 'loop_ta_s': t_loop}
+    engines = ['numpy'] + (['numba'] if batch.numba is not None else [])
+    for engine in engines:
+        if engine == 'numba':
+            # first call includes JIT compilation (cached on disk afterwards)
+            _, res['numba_first_call_s'] = _timed(batch.compute_all, prices, engine=engine)
+        out, t = _timed(batch.compute_all, prices, engine=engine)
+        for name in batch.OUTPUTS:
+            np.testing.assert_allclose(out[name].to_numpy(), ref[name].to_numpy(), rtol=1e-7, atol=1e-7, err_msg=f'{engine} {name}')
+        res[f'{engine}_s'] = t
+        res[f'{engine}_speedup'] = t_loop / t
+    return res
+
+
+BENCHMARKS = {
+    'grid': bench_grid,
+    'arbitrage': bench_arbitrage,
+    'optimize': bench_optimize,
+    'store': bench_store,
+    'streaming': bench_streaming,
+    'indicators': bench_indicators,
+}
+
+
+if __name__ == '__main__':
+    name = sys.argv[1] if len(sys.argv) > 1 else 'grid'
+    args = [int(a) for a in sys.argv[2:]]
+    print(json.dumps(BENCHMARKS[name](*args), indent=2, default=str))
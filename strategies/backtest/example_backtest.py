@@ -1,15 +1,27 @@
 """
 Example script that uses the backtest framework to test DCA and Grid strategies using CSV OHLC data.
 """
+import os
+
 import pandas as pd
-from backtest.framework import Backtest
+from .framework import Backtest
+from .store import KlineStore
 from ..dca import DCA
 from ..grid import GridTrader
 
 
-def load_csv(path):
-    df = pd.read_csv(path, parse_dates=['timestamp'], index_col='timestamp')
-    return df['close']
+def load_csv(path, symbol='BTCUSDT', interval='1d', store=None):
+    """Close prices for symbol/interval from the kline store. The CSV is
+    parsed only when it is newer than the last import; the store keeps only
+    candles it has not seen."""
+    store = store or KlineStore()
+    meta = os.path.join(store.path(symbol, interval), 'meta.json')
+    if not os.path.exists(meta) or os.path.getmtime(path) > os.path.getmtime(meta):
+        store.import_csv(path, symbol, interval)
+        if os.path.exists(meta):
+            # nothing new in the CSV: mark it imported anyway
+            os.utime(meta)
+    return store.load_close(symbol, interval)
 
 
 def main():
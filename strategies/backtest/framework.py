@@ -27,20 +27,18 @@ class Backtest:
             report['roi'] = (total - initial_cash) / initial_cash
         return report
 
-    def optimize(self, strategy_cls, param_grid: dict):
-        # param_grid: dict of param->list
-        import itertools
-        keys = list(param_grid.keys())
-        best = None
-        for vals in itertools.product(*[param_grid[k] for k in keys]):
-            params = dict(zip(keys, vals))
-            strat = strategy_cls(**params)
-            res = self.run_strategy(strat)
-            rep = self.performance_report(res)
-            rep['_params'] = params
-            if best is None or rep.get('roi', -999) > best.get('roi', -999):
-                best = rep
-        return best
+    def optimize(self, strategy_cls, param_grid: dict, workers=1, eta=None, on_result=None, **kwargs):
+        """Best report over param_grid (dict of param->list), ranked by roi.
+
+        workers > 1 (None = every core) runs the grid on a process pool with
+        the prices shared through memory-mapped files; eta enables successive
+        halving. on_result is called with each point's report as it finishes.
+        The best point is the same for any worker count. Other kwargs (fixed,
+        columns, score, initial_cash, min_rows) go to ParallelOptimizer.
+        """
+        from .optimizer import ParallelOptimizer
+        opt = ParallelOptimizer(self.price, strategy_cls, param_grid, workers=workers, eta=eta, **kwargs)
+        return opt.run(on_result=on_result)
 
     def save_report(self, report, path):
         os.makedirs(os.path.dirname(path), exist_ok=True)
@@ -0,0 +1,189 @@
+"""
+Parallel parameter sweep used by Backtest.optimize.
+- Grid points run on a process pool. The price data is written once to
+  .npy files that every worker maps read-only (np.load(mmap_mode='r')), so
+  only the params are pickled per task
+- Results stream back as they finish: iter_results() yields them in
+  completion order, run(on_result=...) calls back for each one
+- Optional successive halving (eta): each rung runs the surviving points on
+  a longer prefix of the data and keeps the best 1/eta; the last rung uses
+  the full series
+- Reproducible for any worker count: a task depends only on its params and
+  data prefix, halving waits for the whole rung before ranking, and ranking
+  is by (score, grid order), so ties keep the earliest point like the
+  serial loop did
+
+DataFrames in the streamed reports (e.g. trades) are replaced by their row
+count; run() re-runs the winner in-process and returns its full report.
+"""
+import itertools
+import math
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from .framework import Backtest
+
+_PRICES = None
+
+
+def param_points(param_grid: dict):
+    """itertools.product over the grid as a list of param dicts, in the same
+    order the serial optimizer walked it."""
+    keys = list(param_grid.keys())
+    return [dict(zip(keys, vals)) for vals in itertools.product(*[param_grid[k] for k in keys])]
+
+
+def roi_score(report):
+    return report.get('roi', -999)
+
+
+def share_prices(prices, directory):
+    """Write a Series/DataFrame to .npy files and return the spec workers
+    pass to load_prices(). Values and index are stored as plain arrays."""
+    frame = isinstance(prices, pd.DataFrame)
+    values = prices.to_numpy(dtype=float)
+    np.save(os.path.join(directory, 'values.npy'), values)
+    idx = prices.index
+    spec = {'dir': directory, 'frame': frame, 'name': None if frame else prices.name,
+            'columns': list(prices.columns) if frame else None, 'tz': None, 'index': None}
+    if isinstance(idx, pd.DatetimeIndex):
+        spec['tz'] = str(idx.tz) if idx.tz is not None else None
+        np.save(os.path.join(directory, 'index.npy'), (idx.tz_convert(None) if idx.tz is not None else idx).to_numpy())
+    elif idx.dtype.kind in 'iuf':
+        np.save(os.path.join(directory, 'index.npy'), idx.to_numpy())
+    else:
+        # object/categorical labels cannot be mapped; ship them once with the spec
+        spec['index'] = idx
+    return spec
+
+
+def load_prices(spec):
+    values = np.load(os.path.join(spec['dir'], 'values.npy'), mmap_mode='r')
+    if spec['index'] is not None:
+        idx = spec['index']
+    else:
+        raw = np.load(os.path.join(spec['dir'], 'index.npy'), mmap_mode='r')
+        idx = pd.Index(raw)
+        if spec['tz'] is not None:
+            idx = idx.tz_localize('UTC').tz_convert(spec['tz'])
+    if spec['frame']:
+        return pd.DataFrame(values, index=idx, columns=spec['columns'], copy=False)
+    return pd.Series(values, index=idx, name=spec['name'], copy=False)
+
+
+def _init_worker(spec):
+    global _PRICES
+    _PRICES = load_prices(spec)
+
+
+def evaluate(prices, strategy_cls, params, fixed=None, columns=None, rows=None, initial_cash=1000.0):
+    """One grid point: build the strategy, run it on the first `rows` rows
+    and return (raw result, performance report)."""
+    data = prices if rows is None else prices.iloc[:rows]
+    strat = strategy_cls(**dict(fixed or {}, **params))
+    if columns is not None:
+        res = strat.run(*[data[c] for c in columns])
+    else:
+        res = Backtest(data).run_strategy(strat)
+    if isinstance(res, pd.DataFrame):
+        res = {'trades': res}
+    if isinstance(res, dict) and 'last_price' not in res and isinstance(data, pd.Series) and len(data):
+        res = dict(res, last_price=float(data.iloc[-1]))
+    return res, Backtest.performance_report(res, initial_cash=initial_cash)
+
+
+def _run_point(task, prices=None):
+    index, rows, args = task
+    _, report = evaluate(_PRICES if prices is None else prices, rows=rows, **args)
+    return index, rows, {k: (len(v) if isinstance(v, pd.DataFrame) else v) for k, v in report.items()}
+
+
+class ParallelOptimizer:
+    def __init__(self, prices, strategy_cls, param_grid: dict, workers=None, fixed=None, columns=None,
+                 initial_cash=1000.0, score=None, eta=None, min_rows=1000):
+        """workers=None uses every core; workers <= 1 runs in-process.
+        fixed: constructor kwargs shared by every point (e.g. symbol).
+        columns: for multi-series strategies (Arbitrage), the frame columns
+        passed to run() positionally.
+        score(report) -> float ranks points (default: roi, as before).
+        eta enables successive halving; no rung runs on fewer than min_rows.
+        """
+        self.prices = prices
+        self.strategy_cls = strategy_cls
+        self.points = param_points(param_grid)
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.args = {'strategy_cls': strategy_cls, 'fixed': fixed, 'columns': columns, 'initial_cash': initial_cash}
+        self.score = score or roi_score
+        self.eta = eta
+        self.min_rows = min_rows
+        self.results = []
+
+    def schedule(self):
+        """Rows per rung: a geometric ladder ending at the full series."""
+        n = len(self.prices)
+        if not self.eta or self.eta <= 1 or len(self.points) <= 1:
+            return [n]
+        rungs = math.ceil(math.log(len(self.points), self.eta))
+        ladder = [int(n / self.eta ** r) for r in range(rungs, 0, -1)]
+        return [r for r in ladder if r >= self.min_rows] + [n]
+
+    @staticmethod
+    def _ranked(results):
+        # NaN scores rank last so the order never depends on completion order
+        def key(r):
+            score = r['_score']
+            return (-score if score == score else math.inf, r['_index'])
+        return sorted(results, key=key)
+
+    def iter_results(self):
+        """Yield each point's report as it finishes (with _params, _index,
+        _rows, _rung and _score); self.results holds them all afterwards."""
+        self.results = []
+        survivors = list(range(len(self.points)))
+        schedule = self.schedule()
+        pool = None
+        tmp = None
+        try:
+            if self.workers > 1:
+                tmp = tempfile.TemporaryDirectory(prefix='optimize-')
+                spec = share_prices(self.prices, tmp.name)
+                pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(spec,))
+            for rung, rows in enumerate(schedule):
+                full = rows >= len(self.prices)
+                tasks = [(i, None if full else rows, dict(self.args, params=self.points[i])) for i in survivors]
+                if pool is None:
+                    done = (_run_point(t, self.prices) for t in tasks)
+                else:
+                    done = (f.result() for f in as_completed([pool.submit(_run_point, t) for t in tasks]))
+                rung_results = []
+                for index, _, report in done:
+                    report.update(_params=self.points[index], _index=index, _rows=rows, _rung=rung)
+                    report['_score'] = self.score(report)
+                    rung_results.append(report)
+                    self.results.append(report)
+                    yield report
+                keep = max(1, math.ceil(len(rung_results) / self.eta)) if rung < len(schedule) - 1 else len(rung_results)
+                survivors = sorted(r['_index'] for r in self._ranked(rung_results)[:keep])
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            if tmp is not None:
+                tmp.cleanup()
+
+    def run(self, on_result=None):
+        """Run the sweep and return the best point's full report (with
+        '_params'), or None for an empty grid."""
+        for report in self.iter_results():
+            if on_result is not None:
+                on_result(report)
+        final = [r for r in self.results if r['_rows'] == len(self.prices)]
+        if not final:
+            return None
+        best = self._ranked(final)[0]
+        _, report = evaluate(self.prices, params=best['_params'], **self.args)
+        report['_params'] = best['_params']
+        return report
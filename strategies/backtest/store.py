@@ -0,0 +1,215 @@
+"""
+Columnar on-disk kline store for backtests.
+- One directory per symbol/interval: <root>/<SYMBOL>/<interval>/ with one
+  raw little-endian column file per field (open_time.i8, close.f8, ...) and
+  a meta.json holding the schema and committed row count
+- Reads memory-map the columns; a time range is found with a binary search
+  on open_time, so only the pages inside the range are touched
+- Appends only ever add rows newer than the last stored open_time. Data is
+  written first and meta.json (the commit point) last, so a crash leaves
+  at most some trailing bytes that the next write truncates
+- import_csv() loads an OHLCV CSV once; later runs map the columns instead
+  of parsing text
+
+open_time is epoch milliseconds (the /api/v3/klines unit).
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ROOT = os.environ.get('BINANCE_DATA_DIR', os.path.join('data', 'klines'))
+
+# /api/v3/klines row layout; OHLCV is required, the rest is kept when present
+KLINE_COLUMNS = {
+    'open_time': '<i8',
+    'open': '<f8',
+    'high': '<f8',
+    'low': '<f8',
+    'close': '<f8',
+    'volume': '<f8',
+    'close_time': '<i8',
+    'quote_volume': '<f8',
+    'trades': '<i8',
+    'taker_buy_base': '<f8',
+    'taker_buy_quote': '<f8',
+}
+REQUIRED = ('open_time', 'open', 'high', 'low', 'close', 'volume')
+_EXT = {'<i8': 'i8', '<f8': 'f8'}
+
+
+def to_millis(ts):
+    """Timestamp-like (str, datetime, pd.Timestamp, epoch ms int) -> epoch ms."""
+    if ts is None:
+        return None
+    if isinstance(ts, (int, np.integer)):
+        return int(ts)
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    return int(ts.value // 1_000_000)
+
+
+def klines_frame(rows):
+    """/api/v3/klines payload (list of lists) -> typed DataFrame with the
+    store's column names."""
+    names = list(KLINE_COLUMNS)
+    if not rows:
+        return pd.DataFrame({c: np.empty(0, dtype=d) for c, d in KLINE_COLUMNS.items()})
+    arr = np.asarray([r[:len(names)] for r in rows], dtype=object)
+    return pd.DataFrame({c: arr[:, i].astype(KLINE_COLUMNS[c]) for i, c in enumerate(names)})
+
+
+class KlineStore:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+
+    def path(self, symbol, interval):
+        return os.path.join(self.root, symbol.upper(), interval)
+
+    def _meta(self, symbol, interval):
+        try:
+            with open(os.path.join(self.path(symbol, interval), 'meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _column_file(self, symbol, interval, name, dtype):
+        return os.path.join(self.path(symbol, interval), f'{name}.{_EXT[dtype]}')
+
+    def symbols(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def intervals(self, symbol):
+        p = os.path.join(self.root, symbol.upper())
+        return sorted(d for d in os.listdir(p) if os.path.exists(os.path.join(p, d, 'meta.json'))) if os.path.isdir(p) else []
+
+    def rows(self, symbol, interval):
+        meta = self._meta(symbol, interval)
+        return meta['rows'] if meta else 0
+
+    def last_open_time(self, symbol, interval):
+        """open_time of the newest stored candle (ms), or None."""
+        n = self.rows(symbol, interval)
+        if not n:
+            return None
+        return int(self.column(symbol, interval, 'open_time')[n - 1])
+
+    # -- write -------------------------------------------------------------
+
+    def append(self, symbol, interval, df):
+        """Append candles newer than the last stored one; returns rows added.
+
+        df needs open_time (epoch ms, or a DatetimeIndex / datetime column)
+        plus open/high/low/close/volume; other KLINE_COLUMNS are stored when
+        the first write has them.
+        """
+        df = self._normalize(df)
+        meta = self._meta(symbol, interval)
+        if meta is None:
+            meta = {'version': 1, 'symbol': symbol.upper(), 'interval': interval, 'rows': 0,
+                    'columns': {c: d for c, d in KLINE_COLUMNS.items() if c in df.columns}}
+        missing = [c for c in dict.fromkeys([*REQUIRED, *meta['columns']]) if c not in df.columns]
+        if missing:
+            raise ValueError(f'missing columns for {symbol} {interval}: {missing}')
+        times = df['open_time'].to_numpy(dtype='<i8')
+        if (np.diff(times) <= 0).any():
+            # sort and keep the last copy of any duplicated candle
+            order = np.argsort(times, kind='stable')
+            times = times[order]
+            keep = np.append(times[1:] != times[:-1], True)
+            df, times = df.iloc[order[keep]], times[keep]
+        last = self.last_open_time(symbol, interval)
+        if last is not None:
+            new = times > last
+            df, times = df[new], times[new]
+        if not len(df):
+            return 0
+        os.makedirs(self.path(symbol, interval), exist_ok=True)
+        committed = meta['rows']
+        for name, dtype in meta['columns'].items():
+            fn = self._column_file(symbol, interval, name, dtype)
+            with open(fn, 'ab') as f:
+                # drop bytes from a write that never reached meta.json
+                f.truncate(committed * np.dtype(dtype).itemsize)
+                f.write(df[name].to_numpy(dtype=dtype).tobytes())
+        meta['rows'] = committed + len(df)
+        tmp = os.path.join(self.path(symbol, interval), 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path(symbol, interval), 'meta.json'))
+        return len(df)
+
+    @staticmethod
+    def _normalize(df):
+        if 'open_time' not in df.columns:
+            if 'timestamp' in df.columns:
+                df = df.rename(columns={'timestamp': 'open_time'})
+            elif isinstance(df.index, pd.DatetimeIndex):
+                df = df.rename_axis('open_time').reset_index()
+            else:
+                raise ValueError('klines need an open_time/timestamp column or a DatetimeIndex')
+        t = df['open_time']
+        if t.dtype.kind == 'M':
+            if getattr(t.dt, 'tz', None) is not None:
+                t = t.dt.tz_convert(None)
+            df = df.assign(open_time=t.to_numpy(dtype='datetime64[ms]').astype('<i8'))
+        return df
+
+    def import_csv(self, path, symbol, interval, chunksize=1_000_000, **read_csv_kwargs):
+        """Parse an OHLCV CSV (timestamp/open_time, open, high, low, close,
+        volume, ...) once and append it to the store; returns rows added."""
+        added = 0
+        try:
+            chunks = pd.read_csv(path, chunksize=chunksize, **read_csv_kwargs)
+        except pd.errors.EmptyDataError:
+            return 0
+        for chunk in chunks:
+            chunk.columns = [c.strip().lower() for c in chunk.columns]
+            tcol = 'open_time' if 'open_time' in chunk.columns else 'timestamp'
+            if chunk[tcol].dtype.kind not in 'iu':
+                chunk[tcol] = pd.to_datetime(chunk[tcol], utc=True)
+            added += self.append(symbol, interval, chunk)
+        return added
+
+    # -- read --------------------------------------------------------------
+
+    def column(self, symbol, interval, name):
+        """Read-only memmap over one stored column."""
+        meta = self._meta(symbol, interval)
+        if meta is None:
+            raise KeyError(f'no klines stored for {symbol.upper()} {interval}')
+        dtype = meta['columns'][name]
+        if not meta['rows']:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._column_file(symbol, interval, name, dtype), dtype=dtype, mode='r', shape=(meta['rows'],))
+
+    def span(self, symbol, interval, start=None, end=None):
+        """Row range [lo, hi) of candles with start <= open_time < end."""
+        times = self.column(symbol, interval, 'open_time')
+        lo = 0 if start is None else int(np.searchsorted(times, to_millis(start), 'left'))
+        hi = len(times) if end is None else int(np.searchsorted(times, to_millis(end), 'left'))
+        return lo, max(lo, hi)
+
+    def load(self, symbol, interval, start=None, end=None, columns=None):
+        """Candles with start <= open_time < end as a DataFrame indexed by
+        open time (UTC-naive, like the CSVs). Value columns are views over
+        the memmaps; only the index is materialized."""
+        meta = self._meta(symbol, interval)
+        if meta is None:
+            raise KeyError(f'no klines stored for {symbol.upper()} {interval}')
+        lo, hi = self.span(symbol, interval, start, end)
+        names = [c for c in (columns or meta['columns']) if c != 'open_time']
+        index = pd.DatetimeIndex(self.column(symbol, interval, 'open_time')[lo:hi].astype('datetime64[ms]'), name='timestamp')
+        data = {c: self.column(symbol, interval, c)[lo:hi] for c in names}
+        return pd.DataFrame(data, index=index, copy=False)
+
+    def load_close(self, symbol, interval, start=None, end=None):
+        """Close prices as a Series, the shape strategies' run() expects;
+        empty when nothing is stored for symbol/interval."""
+        if self._meta(symbol, interval) is None:
+            return pd.Series([], index=pd.DatetimeIndex([], name='timestamp'), name='close', dtype='float64')
+        return self.load(symbol, interval, start, end, columns=['close'])['close']
@@ -18,7 +18,7 @@ class DCA:
         balance_base = 0.0  # base asset amount (e.g., BTC)
         cash_spent = 0.0
         trades = []
-        for ts, price in price_series.resample(self.interval).last().iteritems():
+        for ts, price in price_series.resample(self.interval).last().items():
             qty = self.amount / price
             balance_base += qty
             cash_spent += self.amount
@@ -1,10 +1,18 @@
 """
 Grid trading strategy.
 Простая версия: размещает ряд лимитных ордеров вверх и вниз от текущ price.
+
+run() uses a NumPy engine by default (mode='vectorized'); mode='loop' keeps
+the original per-tick loop as the reference implementation.
 """
 import pandas as pd
 import numpy as np
 
+# Owned quantity is rescaled at every 2**_GROUP_SPAN halvings so the closed
+# form below stays inside float range.
+_GROUP_SPAN = 128
+
+
 class GridTrader:
     def __init__(self, symbol, lower_price, upper_price, grid_size, investment):
         self.symbol = symbol
@@ -14,14 +22,21 @@ class GridTrader:
         self.investment = investment
         self.grid = np.linspace(self.lower, self.upper, grid_size)
 
-    def run(self, price_series: pd.Series):
+    def run(self, price_series: pd.Series, mode='vectorized'):
+        if mode == 'loop':
+            return self._run_loop(price_series)
+        if mode == 'vectorized':
+            return self._run_vectorized(price_series)
+        raise ValueError(f'unknown mode: {mode}')
+
+    def _run_loop(self, price_series: pd.Series):
         # Simulate: buy when price crosses grid level from above to below, sell when crosses from below to above
         position = 0.0
         cash = self.investment
         trades = []
         last_price = None
         owned = 0.0
-        for ts, price in price_series.iteritems():
+        for ts, price in price_series.items():
             if last_price is None:
                 last_price = price
                 continue
@@ -41,6 +56,76 @@ class GridTrader:
             last_price = price
         return {'final_cash': cash, 'owned': owned, 'trades': pd.DataFrame(trades)}
 
+    def _run_vectorized(self, price_series: pd.Series):
+        """Same result as the loop without iterating over ticks or levels.
+
+        A tick can only cross levels in one direction, so per tick:
+        - falling from last to p buys once per level in [p, last): searchsorted
+        - rising sells once per level in (last, p], each sell halving `owned`
+        `owned` then follows owned_t = owned_{t-1} * 2**-up_t + buys_t, which
+        is solved with a cumulative sum, rescaled in groups of _GROUP_SPAN
+        halvings to avoid overflow.
+        """
+        prices = price_series.to_numpy(dtype=float)
+        if len(prices) < 2:
+            return {'final_cash': self.investment, 'owned': 0.0, 'trades': pd.DataFrame([])}
+        levels = np.sort(self.grid)
+        last, cur = prices[:-1], prices[1:]
+        valid = ~(np.isnan(last) | np.isnan(cur))
+        n_down = np.searchsorted(levels, last, 'left') - np.searchsorted(levels, cur, 'left')
+        n_up = np.searchsorted(levels, cur, 'right') - np.searchsorted(levels, last, 'right')
+        n_down = np.where(valid & (cur < last), n_down, 0)
+        n_up = np.where(valid & (cur > last), n_up, 0)
+
+        buy_qty = self.investment / self.grid_size / cur
+        first_buy = np.flatnonzero(n_down)
+        if len(first_buy) == 0:
+            # nothing owned, so no sell can happen either
+            return {'final_cash': self.investment, 'owned': 0.0, 'trades': pd.DataFrame([])}
+        n_up[:first_buy[0]] = 0
+
+        # np.where keeps NaN ticks (no trades) out of the running sum
+        added = np.where(n_down > 0, n_down * buy_qty, 0.0)
+        owned_prev = self._owned_before(added, n_up)
+        owned = np.ldexp(owned_prev[-1], -int(n_up[-1])) + added[-1]
+
+        # expand per-tick counts into one row per trade, in tick order
+        counts = n_down + n_up
+        rows = np.repeat(np.arange(len(cur)), counts)
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        j = np.arange(len(rows)) - starts + 1
+        is_buy = n_down[rows] > 0
+        qty = np.where(is_buy, buy_qty[rows], np.ldexp(owned_prev[rows], (-j).astype(np.int32)))
+
+        cash = self.investment - np.sum(np.where(is_buy, qty * cur[rows], 0.0)) + np.sum(np.where(is_buy, 0.0, qty * cur[rows]))
+        if len(rows) == 0:
+            return {'final_cash': float(cash), 'owned': float(owned), 'trades': pd.DataFrame([])}
+        trades = pd.DataFrame({
+            'timestamp': price_series.index[1:][rows],
+            'type': np.where(is_buy, 'buy', 'sell'),
+            'price': cur[rows],
+            'qty': qty,
+        })
+        return {'final_cash': float(cash), 'owned': float(owned), 'trades': trades}
+
+    @staticmethod
+    def _owned_before(added, halvings):
+        """owned before each tick for owned_t = owned_{t-1} * 2**-h_t + a_t."""
+        k_after = np.cumsum(halvings)
+        k_before = k_after - halvings
+        group = k_before // _GROUP_SPAN
+        bounds = np.concatenate(([0], np.flatnonzero(np.diff(group)) + 1, [len(added)]))
+        out = np.empty(len(added))
+        carry = 0.0
+        for s, e in zip(bounds[:-1], bounds[1:]):
+            k0 = k_before[s]
+            scaled = np.ldexp(added[s:e], (k_before[s:e] - k0).astype(np.int32))
+            after = np.ldexp(carry + np.cumsum(scaled), -(k_after[s:e] - k0).astype(np.int32))
+            out[s] = carry
+            out[s + 1:e] = after[:-1]
+            carry = after[-1]
+        return out
+
     @staticmethod
     def params_grid():
         return {'grid_size': [5,10,20], 'investment':[100,500]}
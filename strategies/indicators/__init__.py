@@ -1,2 +1,4 @@
 # Indicators package
 from .ta import RSI, MACD, Bollinger
+from .streaming import StreamingEMA, StreamingRSI, StreamingMACD, StreamingBollinger
+from .batch import compute_all, rsi_matrix, macd_matrix, bollinger_matrix
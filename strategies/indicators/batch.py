@@ -0,0 +1,295 @@
+"""
+Column-wise RSI / MACD / Bollinger over a (time x symbols) price matrix.
+
+compute_all(prices) returns every indicator as a matrix aligned with the
+input (DataFrames in, DataFrames out), matching looping ta.py over the
+columns, NaN layout included (e.g. symbols listed part way through).
+
+Two engines:
+- 'numpy': window sums from blockwise cumulative sums; EMAs as one
+  matrix product per block of rows across all symbols (columns with
+  gaps inside their history step through the NaN-aware recurrence)
+- 'numba': one compiled kernel, parallel over symbols. Used by 'auto' when
+  numba is installed (pip install numba); otherwise NumPy is used
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    import numba
+except Exception:
+    numba = None
+
+# rows per _window_stats block
+_BLOCK_ROWS = 256
+# rows per matrix product in the NumPy EMA
+_EMA_BLOCK = 64
+# the numba kernel rebuilds its sliding Bollinger sums every _RESYNC rows
+_RESYNC = 1024
+
+OUTPUTS = ('rsi', 'macd', 'signal', 'hist', 'bb_upper', 'bb_mid', 'bb_lower')
+
+
+def _as_matrix(prices):
+    values = np.asarray(prices, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    return values
+
+
+def _window_stats(x, period, center=False, squares=False):
+    """Trailing-window sums (and sums of squared deviations from the window
+    mean) over `period` rows; NaN until the window is full and wherever it
+    holds a NaN (pandas min_periods=period).
+
+    Works in row blocks: each block takes cumulative sums over its own rows
+    plus the period - 1 before them, so the sums stay small (bounded
+    rounding error) and the block stays in cache. With center=True values
+    are taken relative to the block's first row, which keeps the variance
+    free of cancellation. Without it a window of zeros sums to exactly zero.
+    """
+    T, S = x.shape
+    total = np.full((T, S), np.nan)
+    dev2 = np.full((T, S), np.nan) if squares else None
+    for b in range(period - 1, T, _BLOCK_ROWS):
+        e = min(T, b + _BLOCK_ROWS)
+        slab = x[b - period + 1:e]
+        missing = np.isnan(slab)
+        has_gaps = missing.any()
+        v = np.where(missing, 0.0, slab) if has_gaps else slab
+        c = v[0] if center else 0.0
+        d = v - c
+        csum = np.zeros((len(d) + 1, S))
+        np.cumsum(d, axis=0, out=csum[1:])
+        wsum = csum[period:] - csum[:-period]
+        if has_gaps:
+            cnan = np.zeros((len(d) + 1, S), dtype=np.int64)
+            np.cumsum(missing, axis=0, out=cnan[1:])
+            bad = cnan[period:] > cnan[:-period]
+        total[b:e] = wsum + period * c
+        if has_gaps:
+            total[b:e][bad] = np.nan
+        if squares:
+            np.cumsum(d * d, axis=0, out=csum[1:])
+            wsq = csum[period:] - csum[:-period]
+            dev2[b:e] = np.maximum(wsq - wsum * wsum / period, 0.0)
+            if has_gaps:
+                dev2[b:e][bad] = np.nan
+    return (total, dev2) if squares else total
+
+
+def _ema(x, span):
+    """ewm(span, adjust=False).mean() per column, with pandas' handling of
+    missing values (ignore_na=False)."""
+    alpha = 2.0 / (span + 1.0)
+    T, S = x.shape
+    out = np.full((T, S), np.nan)
+    missing = np.isnan(x)
+    first = np.where(missing.all(axis=0), T, missing.argmin(axis=0))
+    # a column with no gaps after its first price takes the block recurrence
+    gaps = missing.sum(axis=0) > first
+    plain = np.flatnonzero(~gaps & (first < T))
+    if len(plain):
+        xp = x[:, plain].copy()
+        fp = first[plain]
+        rows = np.arange(T)[:, None]
+        # leading NaNs take the first price, whose EMA is that price
+        xp = np.where(rows < fp, xp[fp, np.arange(len(plain))], xp)
+        yp = _ema_blocks(xp, alpha)
+        yp[rows < fp] = np.nan
+        out[:, plain] = yp
+    gapped = np.flatnonzero(gaps)
+    if len(gapped):
+        # interior gaps reweight the EMA; few columns have them, pandas does it
+        out[:, gapped] = pd.DataFrame(x[:, gapped]).ewm(span=span, adjust=False).mean().to_numpy()
+    return out
+
+
+def _ema_blocks(x, alpha):
+    """y_0 = x_0, y_t = (1 - alpha) y_{t-1} + alpha x_t for gap-free columns.
+
+    Within a block of K rows y = L @ x_block + decay * y_prev, where L is
+    the lower-triangular matrix alpha (1 - alpha)^(i - j), so the recurrence
+    costs one matrix product per K rows instead of K vector steps.
+    """
+    T, S = x.shape
+    out = np.empty((T, S))
+    out[0] = x[0]
+    d = 1.0 - alpha
+    K = _EMA_BLOCK
+    i = np.arange(K)
+    powers = d ** np.abs(i[:, None] - i[None, :])
+    L = np.tril(alpha * powers)
+    carry = d ** (i + 1.0)
+    prev = out[0]
+    for b in range(1, T, K):
+        e = min(T, b + K)
+        k = e - b
+        y = L[:k, :k] @ x[b:e] + carry[:k, None] * prev
+        out[b:e] = y
+        prev = y[-1]
+    return out
+
+
+def rsi_matrix(prices, period=14):
+    x = _as_matrix(prices)
+    delta = np.empty_like(x)
+    delta[0] = np.nan
+    np.subtract(x[1:], x[:-1], out=delta[1:])
+    ma_up = _window_stats(np.maximum(delta, 0.0), period) / period
+    ma_down = _window_stats(np.maximum(-delta, 0.0), period) / period
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100.0 - 100.0 / (1.0 + ma_up / ma_down)
+
+
+def macd_matrix(prices, fast=12, slow=26, signal=9):
+    x = _as_matrix(prices)
+    macd = _ema(x, fast) - _ema(x, slow)
+    signal_line = _ema(macd, signal)
+    return macd, signal_line, macd - signal_line
+
+
+def bollinger_matrix(prices, period=20, mult=2):
+    x = _as_matrix(prices)
+    total, dev2 = _window_stats(x, period, center=True, squares=True)
+    sma = total / period
+    std = np.sqrt(dev2 / (period - 1))
+    return sma + mult * std, sma, sma - mult * std
+
+
+if numba is not None:
+    @numba.njit(cache=True, inline='always')
+    def _nb_ema_step(value, old_wt, seen, x, alpha):
+        if seen:
+            old_wt *= 1.0 - alpha
+        if not np.isnan(x):
+            value = (old_wt * value + alpha * x) / (old_wt + alpha) if seen else x
+            old_wt = 1.0
+            seen = True
+        return value, old_wt, seen
+
+    @numba.njit(cache=True)
+    def _nb_window(col, end, period):
+        """Mean and sum of squared deviations of col[end - period + 1:end + 1]."""
+        total = 0.0
+        for i in range(end - period + 1, end + 1):
+            total += col[i]
+        mean = total / period
+        ss = 0.0
+        for i in range(end - period + 1, end + 1):
+            d = col[i] - mean
+            ss += d * d
+        return mean, ss
+
+    @numba.njit(parallel=True, cache=True)
+    def _nb_compute_all(xt, rsi_period, fast, slow, signal, bb_period, bb_mult, out):
+        """xt is (symbols x time), C-contiguous; out is (outputs x symbols x time)."""
+        S, T = xt.shape
+        a_fast = 2.0 / (fast + 1.0)
+        a_slow = 2.0 / (slow + 1.0)
+        a_sig = 2.0 / (signal + 1.0)
+        for s in numba.prange(S):
+            col = xt[s]
+            gains = np.zeros(T)
+            losses = np.zeros(T)
+            valid = np.zeros(T, dtype=np.bool_)
+            for t in range(1, T):
+                d = col[t] - col[t - 1]
+                if not np.isnan(d):
+                    valid[t] = True
+                    if d > 0.0:
+                        gains[t] = d
+                    elif d < 0.0:
+                        losses[t] = -d
+            # running window sums; the counters make all-zero windows exact
+            up = 0.0
+            down = 0.0
+            n_valid = 0
+            n_up = 0
+            n_down = 0
+            last_nan = -1
+            mean = 0.0
+            m2 = 0.0
+            f, fw, fs = np.nan, 1.0, False
+            sl, sw, ss = np.nan, 1.0, False
+            g, gw, gs = np.nan, 1.0, False
+            for t in range(T):
+                # RSI: rolling mean of gains / losses
+                up += gains[t]
+                down += losses[t]
+                n_valid += valid[t]
+                n_up += gains[t] > 0.0
+                n_down += losses[t] > 0.0
+                if t >= rsi_period:
+                    k = t - rsi_period
+                    up -= gains[k]
+                    down -= losses[k]
+                    n_valid -= valid[k]
+                    n_up -= gains[k] > 0.0
+                    n_down -= losses[k] > 0.0
+                if t < rsi_period or n_valid < rsi_period or (n_up == 0 and n_down == 0):
+                    out[0, s, t] = np.nan
+                elif n_down == 0:
+                    out[0, s, t] = 100.0
+                elif n_up == 0:
+                    out[0, s, t] = 0.0
+                else:
+                    out[0, s, t] = 100.0 - 100.0 / (1.0 + up / down)
+                # MACD
+                f, fw, fs = _nb_ema_step(f, fw, fs, col[t], a_fast)
+                sl, sw, ss = _nb_ema_step(sl, sw, ss, col[t], a_slow)
+                m = f - sl
+                g, gw, gs = _nb_ema_step(g, gw, gs, m, a_sig)
+                out[1, s, t] = m
+                out[2, s, t] = g
+                out[3, s, t] = m - g
+                # Bollinger: sliding Welford, rebuilt after a gap and every
+                # _RESYNC rows so rounding cannot build up
+                if np.isnan(col[t]):
+                    last_nan = t
+                if t - last_nan < bb_period:
+                    out[4, s, t] = np.nan
+                    out[5, s, t] = np.nan
+                    out[6, s, t] = np.nan
+                    continue
+                if t - last_nan == bb_period or (t - last_nan) % _RESYNC == 0:
+                    mean, m2 = _nb_window(col, t, bb_period)
+                else:
+                    old = col[t - bb_period]
+                    new = col[t]
+                    mean_new = mean + (new - old) / bb_period
+                    m2 += (new - old) * (new - mean_new + old - mean)
+                    mean = mean_new
+                std = np.sqrt(max(m2, 0.0) / (bb_period - 1))
+                out[4, s, t] = mean + bb_mult * std
+                out[5, s, t] = mean
+                out[6, s, t] = mean - bb_mult * std
+
+
+def compute_all(prices, rsi_period=14, fast=12, slow=26, signal=9, bb_period=20, bb_mult=2, engine='auto'):
+    """All indicators for every column of `prices` (time x symbols).
+
+    Returns {name: matrix} for the names in OUTPUTS; DataFrames with the
+    input's index and columns when prices is a DataFrame, else arrays.
+    """
+    if engine == 'auto':
+        engine = 'numba' if numba is not None else 'numpy'
+    x = _as_matrix(prices)
+    if engine == 'numba':
+        if numba is None:
+            raise RuntimeError('numba is required for engine="numba"')
+        out = np.empty((len(OUTPUTS), x.shape[1], x.shape[0]))
+        _nb_compute_all(np.ascontiguousarray(x.T), rsi_period, fast, slow, signal, bb_period, float(bb_mult), out)
+        # (time x symbols) views in Fortran order; no copy
+        result = {name: m.T for name, m in zip(OUTPUTS, out)}
+    elif engine == 'numpy':
+        # the EMAs walk rows, so keep rows contiguous
+        x = np.ascontiguousarray(x)
+        result = {'rsi': rsi_matrix(x, rsi_period)}
+        result.update(zip(('macd', 'signal', 'hist'), macd_matrix(x, fast, slow, signal)))
+        result.update(zip(('bb_upper', 'bb_mid', 'bb_lower'), bollinger_matrix(x, bb_period, bb_mult)))
+    else:
+        raise ValueError(f'unknown engine: {engine}')
+    if isinstance(prices, pd.DataFrame):
+        return {k: pd.DataFrame(v, index=prices.index, columns=prices.columns, copy=False) for k, v in result.items()}
+    return result
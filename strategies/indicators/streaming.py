@@ -0,0 +1,139 @@
+"""
+Streaming versions of the indicators in ta.py: O(1) work per tick.
+
+Each object keeps running state (EMAs, ring buffers with running sums) and
+exposes update(price), returning the value the ta.py function would give for
+the newest bar (NaN while the window is filling). With size=N the state is
+a NumPy array and update() takes an array of N prices, so one call advances
+the indicator for N symbols.
+
+- StreamingRSI: rolling mean of gains/losses over `period` (ta.RSI's SMA form)
+- StreamingMACD: adjust=False EMAs, same as ta.MACD
+- StreamingBollinger: sliding-window Welford mean/variance (ddof=1, like
+  pandas rolling std)
+
+Prices must be finite: a NaN would stay in the running sums for good.
+Running sums are rebuilt from the ring buffer every `period * 64` ticks so
+floating-point drift cannot accumulate.
+"""
+import numpy as np
+
+_RESYNC = 64
+
+
+def _state(size):
+    return np.zeros(() if size is None else (size,))
+
+
+def _nan(size):
+    return np.full(() if size is None else (size,), np.nan)
+
+
+class StreamingEMA:
+    __slots__ = ('alpha', 'value')
+
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = None
+
+    def update(self, price):
+        if self.value is None:
+            self.value = np.array(price, dtype=float)
+        else:
+            self.value = self.value + self.alpha * (price - self.value)
+        return self.value
+
+
+class StreamingRSI:
+    __slots__ = ('period', 'value', '_prev', '_gains', '_losses', '_sum_gain', '_sum_loss', '_n')
+
+    def __init__(self, period=14, size=None):
+        self.period = period
+        self.value = _nan(size)
+        self._prev = None
+        shape = (period,) if size is None else (period, size)
+        self._gains = np.zeros(shape)
+        self._losses = np.zeros(shape)
+        self._sum_gain = _state(size)
+        self._sum_loss = _state(size)
+        self._n = 0  # deltas seen
+
+    def update(self, price):
+        price = np.asarray(price, dtype=float)
+        if self._prev is None:
+            self._prev = price
+            return self.value
+        delta = price - self._prev
+        self._prev = price
+        gain = np.maximum(delta, 0.0)
+        loss = np.maximum(-delta, 0.0)
+        j = self._n % self.period
+        self._sum_gain = self._sum_gain + (gain - self._gains[j])
+        self._sum_loss = self._sum_loss + (loss - self._losses[j])
+        self._gains[j] = gain
+        self._losses[j] = loss
+        self._n += 1
+        if self._n % (self.period * _RESYNC) == 0:
+            self._sum_gain = self._gains.sum(axis=0)
+            self._sum_loss = self._losses.sum(axis=0)
+        if self._n >= self.period:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rs = self._sum_gain / self._sum_loss
+                self.value = 100.0 - 100.0 / (1.0 + rs)
+        return self.value
+
+
+class StreamingMACD:
+    __slots__ = ('_fast', '_slow', '_signal', 'macd', 'signal', 'hist')
+
+    def __init__(self, fast=12, slow=26, signal=9, size=None):
+        self._fast = StreamingEMA(fast)
+        self._slow = StreamingEMA(slow)
+        self._signal = StreamingEMA(signal)
+        self.macd = self.signal = self.hist = _nan(size)
+
+    def update(self, price):
+        self.macd = self._fast.update(price) - self._slow.update(price)
+        self.signal = self._signal.update(self.macd)
+        self.hist = self.macd - self.signal
+        return self.macd, self.signal, self.hist
+
+
+class StreamingBollinger:
+    __slots__ = ('period', 'mult', 'upper', 'mid', 'lower', '_window', '_mean', '_m2', '_n')
+
+    def __init__(self, period=20, mult=2, size=None):
+        self.period = period
+        self.mult = mult
+        self.upper = self.mid = self.lower = _nan(size)
+        self._window = np.zeros((period,) if size is None else (period, size))
+        self._mean = _state(size)
+        self._m2 = _state(size)
+        self._n = 0  # prices seen
+
+    def update(self, price):
+        price = np.asarray(price, dtype=float)
+        j = self._n % self.period
+        if self._n < self.period:
+            # growing window: plain Welford
+            count = self._n + 1
+            delta = price - self._mean
+            self._mean = self._mean + delta / count
+            self._m2 = self._m2 + delta * (price - self._mean)
+        else:
+            # sliding window: swap the oldest price for the new one
+            old = self._window[j]
+            mean = self._mean + (price - old) / self.period
+            self._m2 = self._m2 + (price - old) * (price - mean + old - self._mean)
+            self._mean = mean
+        self._window[j] = price
+        self._n += 1
+        if self._n % (self.period * _RESYNC) == 0:
+            self._mean = self._window.mean(axis=0)
+            self._m2 = ((self._window - self._mean) ** 2).sum(axis=0)
+        if self._n >= self.period:
+            std = np.sqrt(np.maximum(self._m2, 0.0) / (self.period - 1))
+            self.mid = self._mean
+            self.upper = self._mean + self.mult * std
+            self.lower = self._mean - self.mult * std
+        return self.upper, self.mid, self.lower
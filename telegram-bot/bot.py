@@ -8,21 +8,39 @@ import sys
 import hmac
 import hashlib
 import json
-from flask import Flask, request, jsonify, send_file
+import logging
+import threading
+from flask import Flask, Response, request, jsonify, stream_with_context
 import requests
 
-# adjust path to import ux modules
+# adjust path to import ux and performance modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'ux')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'performance')))
+# appended, not inserted: monitoring/email.py and monitoring/utils must not shadow the stdlib / our utils.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'monitoring')))
 from parser import parse
 from interactive import DialogManager
 from templates import render_confirmation
-from utils import format_order_table, parse_nl, build_confirmation, pretty_timestamp, export_csv, export_excel, export_json
-from storage import save_order, list_orders, register_webhook, list_webhooks
+from utils import format_order_table, parse_nl, build_confirmation, pretty_timestamp, stream_csv, stream_json, stream_ndjson, stream_xlsx
+from storage import save_order, get_order, list_orders, register_webhook, list_webhooks, iter_order_chunks, next_order_cursor, sql_time
+from cache import price_cache
+from delivery import BackgroundDelivery
 
 app = Flask(__name__)
+logger = logging.getLogger(__name__)
 BOT_TOKEN = os.environ.get('BOT_TOKEN')
+# Bot API base URL; point it at a local stand-in for load tests
+TELEGRAM_API = os.environ.get('TELEGRAM_API', 'https://api.telegram.org').rstrip('/')
 WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET', 'dev-secret')
 DM = DialogManager(__import__('parser'))
+# refuse confirmations when the cached market price is older than this (seconds)
+MAX_PRICE_AGE = float(os.environ.get('MAX_PRICE_AGE', '10'))
+# REST API used to refresh a missing or stale price before a confirmation
+BINANCE_API = os.environ.get('BINANCE_API', 'https://api.binance.com').rstrip('/')
+# symbol -> lock: only confirmations for the same symbol wait on one refresh
+_price_locks = {}
+# pooled async HTTP for Telegram replies and webhook notifications
+DELIVERY = BackgroundDelivery(timeout=5.0)
 
 
 def verify_telegram_request(req):
@@ -34,7 +52,13 @@ def verify_telegram_request(req):
 def webhook():
     if not verify_telegram_request(request):
         return '', 403
-    data = request.get_json(force=True)
+    return jsonify(handle_update(request.get_json(force=True)))
+
+
+def handle_update(data):
+    """Process one Telegram update; returns the webhook's JSON reply.
+    Shared by the Flask view above and the asyncio ingestion server
+    (ingest.py)."""
     # minimal handling: message text and callback_query
     if 'message' in data and data['message'].get('text'):
         msg = data['message']
@@ -46,17 +70,17 @@ def webhook():
         missing = DM.next_prompt(state)
         if missing:
             send_message(chat_id, missing)
-            return jsonify({'ok': True})
+            return {'ok': True}
         err = DM.validate(state)
         if err:
             send_message(chat_id, err)
-            return jsonify({'ok': True})
+            return {'ok': True}
         # save draft order to DB first so we can reference it in callbacks
         oid = save_order(chat_id, user_id, state)
         # send confirmation with inline keyboard (include order id in callbacks)
         confirmation = format_order_table(state)
         msg_id = send_message(chat_id, confirmation, parse_mode='HTML', buttons=build_inline_buttons(state, oid))
-        return jsonify({'ok': True, 'order_id': oid})
+        return {'ok': True, 'order_id': oid}
     if 'callback_query' in data:
         cb = data['callback_query']
         chat_id = cb['message']['chat']['id']
@@ -64,18 +88,22 @@ def webhook():
         # handle simple callbacks: confirm:<id>, edit:<id>, cancel:<id>
         if data_str.startswith('confirm:'):
             oid = int(data_str.split(':',1)[1])
+            err = check_price_age(get_order(oid))
+            if err:
+                send_message(chat_id, err)
+                return {'ok': True, 'refused': 'stale_price'}
             send_message(chat_id, 'Ордeр подтверждён. (Прототип — не отправляет на биржу)')
             notify_webhooks({'event':'order_confirmed','order_id': oid})
-            return jsonify({'ok': True})
+            return {'ok': True}
         if data_str.startswith('cancel:'):
             oid = int(data_str.split(':',1)[1])
             send_message(chat_id, 'Операция отменена.')
-            return jsonify({'ok': True})
+            return {'ok': True}
         if data_str.startswith('edit:'):
             oid = int(data_str.split(':',1)[1])
             send_message(chat_id, 'Откройте диалог для редактирования. (Прототип)')
-            return jsonify({'ok': True})
-    return jsonify({'ok': True})
+            return {'ok': True}
+    return {'ok': True}
 
 
 @app.route('/set_webhook', methods=['GET'])
@@ -85,32 +113,45 @@ def set_webhook():
     webhook_url = os.environ.get('WEBHOOK_URL')
     if not webhook_url:
         return 'WEBHOOK_URL not set', 400
-    r = requests.get(f'https://api.telegram.org/bot{BOT_TOKEN}/setWebhook', params={'url': webhook_url})
+    r = requests.get(f'{TELEGRAM_API}/bot{BOT_TOKEN}/setWebhook', params={'url': webhook_url})
     return (r.text, r.status_code, {'Content-Type': 'application/json'})
 
 
-@app.route('/exports/orders.csv')
-def export_orders_csv():
-    rows = list_orders(1000)
-    path = os.path.join(os.path.dirname(__file__), 'orders_export.csv')
-    export_csv(rows, path)
-    return send_file(path, as_attachment=True, mimetype='text/csv')
-
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+    'json': (stream_json, 'application/json'),
+    'xlsx': (stream_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
 
-@app.route('/exports/orders.xlsx')
-def export_orders_xlsx():
-    rows = list_orders(1000)
-    path = os.path.join(os.path.dirname(__file__), 'orders_export.xlsx')
-    export_excel(rows, path)
-    return send_file(path, as_attachment=True, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
 
-
-@app.route('/exports/orders.json')
-def export_orders_json():
-    rows = list_orders(1000)
-    path = os.path.join(os.path.dirname(__file__), 'orders_export.json')
-    export_json(rows, path)
-    return send_file(path, as_attachment=True, mimetype='application/json')
+@app.route('/exports/orders.<fmt>')
+def export_orders(fmt):
+    # streamed straight from the DB in chunks; optional query args:
+    # after_id (cursor), limit, since / until (ISO time or epoch s), chat_id
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'unknown export format: {fmt}'}), 404
+    try:
+        query = {
+            'after_id': request.args.get('after_id', type=int),
+            'since': request.args.get('since'),
+            'until': request.args.get('until'),
+            'chat_id': request.args.get('chat_id'),
+        }
+        for k in ('since', 'until'):
+            if query[k]:
+                v = query[k]
+                query[k] = sql_time(float(v) if v.replace('.', '', 1).isdigit() else v)
+        limit = request.args.get('limit', type=int)
+        headers = {'Content-Disposition': f'attachment; filename=orders.{fmt}'}
+        cursor = next_order_cursor(limit=limit, **query)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if cursor is not None:
+        headers['X-Next-After-Id'] = str(cursor)
+    writer, mimetype = EXPORT_FORMATS[fmt]
+    body = writer(iter_order_chunks(limit=limit, **query))
+    return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
 
 
 @app.route('/webhooks/register', methods=['POST'])
@@ -132,6 +173,50 @@ def webhooks_list():
     return jsonify(wh)
 
 
+@app.route('/webhooks/stats')
+def webhooks_stats():
+    # per-destination latency / failure counters and retry queue depth
+    return jsonify(DELIVERY.stats())
+
+
+def refresh_price(symbol):
+    """Fetch the ticker price into price_cache; False when no price came back."""
+    try:
+        r = requests.get(f'{BINANCE_API}/api/v3/ticker/price', params={'symbol': symbol}, timeout=5)
+        data = r.json()
+    except Exception as e:
+        logger.warning('price refresh failed for %s: %s', symbol, e)
+        return False
+    # Binance error payloads look like {"code": -1121, "msg": ...}
+    if r.status_code != 200 or not isinstance(data, dict) or 'code' in data or 'price' not in data:
+        logger.warning('price refresh failed for %s: %s', symbol, data)
+        return False
+    price_cache.set_nowait(symbol, data)
+    return True
+
+
+def check_price_age(order, max_age=None):
+    """Return a refusal message unless a price for the order's symbol at most
+    max_age seconds old is cached. A missing or older price is fetched once
+    first; the age compared is the real one, stale-while-revalidate grace or
+    not."""
+    if not order or not order.get('symbol'):
+        return None
+    max_age = MAX_PRICE_AGE if max_age is None else max_age
+    symbol = order['symbol']
+    if len(_price_locks) > 10_000:
+        _price_locks.clear()
+    with _price_locks.setdefault(symbol, threading.Lock()):
+        entry = price_cache.peek(symbol)
+        if (entry is None or entry.age > max_age) and refresh_price(symbol):
+            entry = price_cache.peek(symbol)
+    if entry is None:
+        return f"Нет цены {symbol}, подтверждение невозможно. Повторите команду позже."
+    if entry.age > max_age:
+        return f"Цена {symbol} устарела ({entry.age:.0f} с, лимит {max_age:.0f} с). Повторите команду позже."
+    return None
+
+
 def build_inline_buttons(state, order_id=0):
     # buttons with callback data referencing the saved order id.
     return [
@@ -152,26 +237,28 @@ def send_message(chat_id, text, parse_mode=None, buttons=None):
         # convert to Telegram inline keyboard format
         keyboard = {'inline_keyboard': [[b] for b in buttons]}
         payload['reply_markup'] = json.dumps({'inline_keyboard': keyboard['inline_keyboard']})
-    r = requests.post(f'https://api.telegram.org/bot{BOT_TOKEN}/sendMessage', data=payload)
-    if r.status_code == 200:
-        resp = r.json()
+    ok, resp = DELIVERY.call('post', f'{TELEGRAM_API}/bot{BOT_TOKEN}/sendMessage', data=payload,
+                             destination=f'telegram:{chat_id}', timeout=15)
+    if ok and isinstance(resp, dict):
         return resp.get('result', {}).get('message_id')
-    else:
-        print('send message failed', r.status_code, r.text)
-        return None
+    # failed sends are retried in the background by the delivery pool
+    print('send message failed', resp)
+    return None
 
 
 def notify_webhooks(payload):
-    # send POST to all registered webhooks
+    # POST to all registered webhooks concurrently on the delivery thread;
+    # returns at once, failures go to the pool's retry queue
     whs = list_webhooks()
+    deliveries = []
     for w in whs:
-        try:
-            headers = {}
-            if w.get('token'):
-                headers['Authorization'] = f"Bearer {w['token']}"
-            requests.post(w['url'], json=payload, headers=headers, timeout=5)
-        except Exception as e:
-            print('webhook notify failed', e)
+        headers = {}
+        if w.get('token'):
+            headers['Authorization'] = f"Bearer {w['token']}"
+        deliveries.append((w['url'], payload, headers, f"webhook:{w['id']}:{w['name']}"))
+    if deliveries:
+        return DELIVERY.submit('fan_out', deliveries)
+    return None
 
 
 if __name__ == '__main__':
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+asyncio (aiohttp) ingestion server for Telegram webhook updates.
+
+The Flask /webhook view handles an update before answering, so a slow
+Telegram API or SQLite write holds the webhook open and Telegram re-sends
+the update. This server instead:
+- answers every update at once (200), before any processing
+- drops re-deliveries by update_id (recently seen ids are remembered)
+- puts updates on a bounded queue partitioned by chat_id: one worker per
+  partition, so a chat's updates are handled in order while different
+  chats run in parallel. When the partition is full it answers 503 and
+  Telegram retries later
+- runs bot.handle_update (the same logic as the Flask view) on a thread
+  pool, one thread per worker
+
+    python ingest.py [port]        # serve POST /webhook and GET /stats
+    python ingest.py loadtest      # load test against a local Bot API stand-in
+"""
+import asyncio
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from aiohttp import web
+except Exception:
+    web = None
+
+
+def chat_key(update):
+    """chat id an update belongs to (its ordering key)."""
+    for kind in ('message', 'edited_message', 'channel_post', 'edited_channel_post'):
+        if kind in update:
+            return update[kind].get('chat', {}).get('id')
+    cb = update.get('callback_query')
+    if cb:
+        return (cb.get('message') or {}).get('chat', {}).get('id') or cb.get('from', {}).get('id')
+    return update.get('update_id')
+
+
+class UpdateIngestor:
+    def __init__(self, handler, workers=8, queue_size=1024, dedupe_size=100_000):
+        """handler(update) is a plain function run on the thread pool.
+        queue_size is the total across the `workers` partitions;
+        dedupe_size is how many recent update_ids are remembered."""
+        self.handler = handler
+        self.workers = workers
+        self.partition_size = max(1, queue_size // workers)
+        self.dedupe_size = dedupe_size
+        self._seen = OrderedDict()
+        self._queues = []
+        self._tasks = []
+        self._executor = None
+        self.stats = {'received': 0, 'accepted': 0, 'duplicates': 0, 'rejected': 0, 'processed': 0, 'errors': 0,
+                      'latency_total': 0.0, 'latency_max': 0.0}
+
+    async def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='update')
+        self._queues = [asyncio.Queue(self.partition_size) for _ in range(self.workers)]
+        self._tasks = [asyncio.ensure_future(self._work(q)) for q in self._queues]
+
+    async def close(self, timeout=30.0):
+        """Finish queued updates (up to timeout), then stop the workers."""
+        try:
+            await asyncio.wait_for(asyncio.gather(*[q.join() for q in self._queues]), timeout)
+        except asyncio.TimeoutError:
+            pass
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False)
+
+    def offer(self, update):
+        """'accepted', 'duplicate' or 'full' (not queued; the sender should
+        retry). Never blocks."""
+        self.stats['received'] += 1
+        uid = update.get('update_id')
+        if uid is not None and uid in self._seen:
+            self._seen.move_to_end(uid)
+            self.stats['duplicates'] += 1
+            return 'duplicate'
+        q = self._queues[hash(chat_key(update)) % self.workers]
+        try:
+            q.put_nowait((time.perf_counter(), update))
+        except asyncio.QueueFull:
+            self.stats['rejected'] += 1
+            return 'full'
+        if uid is not None:
+            self._seen[uid] = None
+            if len(self._seen) > self.dedupe_size:
+                self._seen.popitem(last=False)
+        self.stats['accepted'] += 1
+        return 'accepted'
+
+    async def _work(self, q):
+        loop = asyncio.get_running_loop()
+        while True:
+            t0, update = await q.get()
+            try:
+                await loop.run_in_executor(self._executor, self.handler, update)
+                self.stats['processed'] += 1
+            except Exception as e:
+                self.stats['errors'] += 1
+                print('update', update.get('update_id'), 'failed:', e)
+            finally:
+                latency = time.perf_counter() - t0
+                self.stats['latency_total'] += latency
+                self.stats['latency_max'] = max(self.stats['latency_max'], latency)
+                q.task_done()
+
+    def as_dict(self):
+        s = dict(self.stats)
+        done = s['processed'] + s['errors']
+        s['latency_avg_ms'] = round(s.pop('latency_total') / done * 1000, 2) if done else None
+        s['latency_max_ms'] = round(s.pop('latency_max') * 1000, 2)
+        s['queued'] = sum(q.qsize() for q in self._queues)
+        return s
+
+
+def make_app(ingestor, secret_token=None):
+    """aiohttp app with POST /webhook and GET /stats. secret_token, when
+    set, must match the X-Telegram-Bot-Api-Secret-Token header (setWebhook's
+    secret_token)."""
+    if web is None:
+        raise RuntimeError('aiohttp is required for the ingestion server')
+
+    async def webhook(request):
+        if secret_token and request.headers.get('X-Telegram-Bot-Api-Secret-Token') != secret_token:
+            return web.Response(status=403)
+        try:
+            update = await request.json()
+        except Exception:
+            return web.json_response({'ok': False, 'error': 'invalid JSON'}, status=400)
+        if ingestor.offer(update) == 'full':
+            return web.json_response({'ok': False, 'error': 'busy'}, status=503, headers={'Retry-After': '1'})
+        return web.json_response({'ok': True})
+
+    async def stats(request):
+        return web.json_response(ingestor.as_dict())
+
+    async def on_startup(app):
+        await ingestor.start()
+
+    async def on_cleanup(app):
+        await ingestor.close()
+
+    app = web.Application()
+    app.add_routes([web.post('/webhook', webhook), web.get('/stats', stats)])
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def serve(port=8081, workers=8):
+    from bot import handle_update
+    ingestor = UpdateIngestor(handle_update, workers=workers)
+    web.run_app(make_app(ingestor, os.environ.get('TELEGRAM_SECRET_TOKEN')), port=port)
+
+
+async def loadtest(chats=200, per_chat=5, duplicate_every=10, api_latency=0.05, workers=8):
+    """Fire chats * per_chat updates (plus re-deliveries) at the ingestion
+    server while a local Bot API stand-in answers sendMessage after
+    api_latency seconds; report webhook ack latency, end-to-end time and
+    per-chat ordering."""
+    import random
+    import tempfile
+    import aiohttp
+
+    sent = []
+
+    async def send_message(request):
+        await asyncio.sleep(api_latency)
+        form = await request.post()
+        sent.append((form['chat_id'], form['text']))
+        return web.json_response({'ok': True, 'result': {'message_id': len(sent)}})
+
+    api = web.Application()
+    api.add_routes([web.post('/bot{token}/sendMessage', send_message)])
+    api_runner = web.AppRunner(api)
+    await api_runner.setup()
+    api_site = web.TCPSite(api_runner, '127.0.0.1', 0)
+    await api_site.start()
+    api_port = api_site._server.sockets[0].getsockname()[1]
+
+    tmp = tempfile.mkdtemp()
+    os.environ['BOT_TOKEN'] = 'loadtest'
+    os.environ['TELEGRAM_API'] = f'http://127.0.0.1:{api_port}'
+    # no exchangeInfo download from the parser's symbol index
+    os.environ['UX_SYMBOLS_OFFLINE'] = '1'
+    import storage
+    storage.DB_PATH = os.path.join(tmp, 'loadtest.db')
+    import bot
+
+    order = {}
+
+    def handler(update):
+        # record the processing order per chat, then run the real handler
+        order.setdefault(chat_key(update), []).append(update['update_id'])
+        bot.handle_update(update)
+
+    ingestor = UpdateIngestor(handler, workers=workers)
+    runner = web.AppRunner(make_app(ingestor))
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/webhook"
+
+    texts = ['купи 0.01 BTC по рынку', 'sell 2 ETH limit 3500', 'купи BTC', 'buy 0.5 BNBUSDT']
+    rng = random.Random(7)
+    acks = []
+    uid = [0]
+
+    async def chat(session, chat_id):
+        for _ in range(per_chat):
+            uid[0] += 1
+            update = {'update_id': uid[0], 'message': {'chat': {'id': chat_id}, 'from': {'id': chat_id},
+                                                       'text': rng.choice(texts)}}
+            for _ in range(2 if uid[0] % duplicate_every == 0 else 1):
+                t0 = time.perf_counter()
+                async with session.post(url, json=update) as r:
+                    await r.read()
+                    assert r.status == 200, r.status
+                acks.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*[chat(session, 1000 + c) for c in range(chats)])
+    t_ack = time.perf_counter() - t0
+    await ingestor.close(timeout=300)
+    t_done = time.perf_counter() - t0
+    await runner.cleanup()
+
+    acks.sort()
+    in_order = all(ids == sorted(ids) for ids in order.values())
+    print(f'{len(acks)} webhook calls ({chats} chats x {per_chat} updates + re-deliveries) acknowledged in {t_ack:.2f}s; '
+          f'ack p50 {acks[len(acks) // 2] * 1000:.1f}ms, p99 {acks[int(len(acks) * 0.99)] * 1000:.1f}ms')
+    print(f'all processed after {t_done:.2f}s; {len(sent)} sendMessage calls at {api_latency * 1000:.0f}ms each; '
+          f'per-chat order kept: {in_order}')
+    print(ingestor.as_dict())
+
+    # the Flask view answers only after handling the update (run off the
+    # event loop, which is serving the stand-in)
+    def sync_updates():
+        for i in range(20):
+            bot.handle_update({'update_id': -i, 'message': {'chat': {'id': 1}, 'from': {'id': 1}, 'text': texts[0]}})
+
+    t0 = time.perf_counter()
+    await asyncio.get_running_loop().run_in_executor(None, sync_updates)
+    print(f'synchronous handling (Flask /webhook): {(time.perf_counter() - t0) / 20 * 1000:.1f}ms before each ack')
+    bot.DELIVERY.close()
+    await api_runner.cleanup()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'loadtest':
+        asyncio.run(loadtest())
+    else:
+        serve(int(sys.argv[1]) if len(sys.argv) > 1 else int(os.environ.get('PORT', 8081)))
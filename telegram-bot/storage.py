@@ -1,8 +1,34 @@
-import sqlite3
+"""
+SQLite storage for captured orders and registered notification webhooks.
+
+- One connection per thread (thread-local cache) instead of a new
+  sqlite3.connect per call; each connection keeps its compiled statements
+  (cached_statements), so the fixed SQL below is prepared once per thread
+- WAL journaling: readers never block the writer. synchronous=NORMAL by
+  default, so commits do not fsync (the WAL is synced at checkpoints);
+  BOT_SQLITE_SYNC=FULL makes every commit durable
+- orders(chat_id, created_at) index for per-chat history and time ranges
+- Group commit: save_order() calls from concurrent threads are handed to
+  one writer thread that inserts whatever is queued in a single
+  transaction; each caller still gets its id only after the commit.
+  A failed batch is retried row by row, so only the bad row's caller
+  gets the exception.
+  BOT_GROUP_COMMIT=0 writes from the calling thread instead
+
+Run `python storage.py [threads] [orders_per_thread]` for a writer
+concurrency benchmark.
+"""
 import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timezone
 from typing import List
 
 DB_PATH = os.path.join(os.path.dirname(__file__), 'bot_storage.db')
+SYNCHRONOUS = os.environ.get('BOT_SQLITE_SYNC', 'NORMAL').upper()
+GROUP_COMMIT = os.environ.get('BOT_GROUP_COMMIT', '1') != '0'
 
 SCHEMA = '''
 CREATE TABLE IF NOT EXISTS orders (
@@ -20,6 +46,8 @@ CREATE TABLE IF NOT EXISTS orders (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX IF NOT EXISTS idx_orders_chat_created ON orders (chat_id, created_at);
+
 CREATE TABLE IF NOT EXISTS webhooks (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     name TEXT,
@@ -29,41 +57,291 @@ CREATE TABLE IF NOT EXISTS webhooks (
 );
 '''
 
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA cache_size=-16000',  # KiB
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA busy_timeout=5000',
+)
+
+# orders table columns, in schema order (exports use this fixed list)
+ORDER_COLUMNS = ('id', 'chat_id', 'user_id', 'raw_text', 'side', 'quantity', 'symbol', 'base_asset', 'quote_asset',
+                 'order_type', 'price', 'created_at')
+ORDER_FIELDS = ('raw_text', 'side', 'quantity', 'symbol', 'base_asset', 'quote_asset', 'order_type', 'price')
+INSERT_ORDER = 'INSERT INTO orders (chat_id,user_id,raw_text,side,quantity,symbol,base_asset,quote_asset,order_type,price) VALUES (?,?,?,?,?,?,?,?,?,?)'
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+
+def _connect(path):
+    c = sqlite3.connect(path, timeout=5.0, cached_statements=256)
+    for pragma in PRAGMAS:
+        c.execute(pragma)
+    c.execute(f'PRAGMA synchronous={SYNCHRONOUS}')
+    c.row_factory = sqlite3.Row
+    with _schema_lock:
+        if path not in _schema_ready:
+            c.executescript(SCHEMA)
+            c.commit()
+            _schema_ready.add(path)
+    return c
+
 
 def get_conn():
-    first = not os.path.exists(DB_PATH)
-    c = sqlite3.connect(DB_PATH)
-    if first:
-        c.executescript(SCHEMA)
-        c.commit()
+    """This thread's connection to DB_PATH (opened on first use)."""
+    conns = getattr(_local, 'conns', None)
+    if conns is None:
+        conns = _local.conns = {}
+    c = conns.get(DB_PATH)
+    if c is None:
+        c = conns[DB_PATH] = _connect(DB_PATH)
     return c
 
 
+def close_conn():
+    """Close this thread's connections (thread exit closes them too)."""
+    for c in getattr(_local, 'conns', {}).values():
+        c.close()
+    _local.conns = {}
+
+
+def _order_params(chat_id, user_id, order: dict):
+    return (str(chat_id), str(user_id), *[order.get(k) for k in ORDER_FIELDS])
+
+
+def save_orders(orders) -> List[int]:
+    """Insert [(chat_id, user_id, order), ...] in one transaction; returns ids."""
+    c = get_conn()
+    ids = []
+    with c:
+        for chat_id, user_id, order in orders:
+            ids.append(c.execute(INSERT_ORDER, _order_params(chat_id, user_id, order)).lastrowid)
+    return ids
+
+
+class GroupCommitter:
+    """Single writer thread that commits queued order inserts in batches."""
+
+    def __init__(self, max_batch=500):
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='order-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, chat_id, user_id, order: dict) -> Future:
+        self._ensure_thread()
+        fut = Future()
+        self._queue.put((DB_PATH, _order_params(chat_id, user_id, order), fut))
+        return fut
+
+    def _run(self):
+        conns = {}
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # DB_PATH may be switched (tests, benchmarks); commit per file
+            by_path = {}
+            for item in batch:
+                by_path.setdefault(item[0], []).append(item)
+            for path, items in by_path.items():
+                try:
+                    c = conns.get(path)
+                    if c is None:
+                        c = conns[path] = _connect(path)
+                    with c:
+                        ids = [c.execute(INSERT_ORDER, params).lastrowid for _, params, _ in items]
+                except Exception as e:
+                    if len(items) == 1 or path not in conns:
+                        for _, _, fut in items:
+                            fut.set_exception(e)
+                    else:
+                        # the batch was rolled back: redo it row by row so
+                        # only the bad rows fail
+                        self._commit_each(conns[path], items)
+                    continue
+                self.batches += 1
+                self.rows += len(items)
+                for (_, _, fut), oid in zip(items, ids):
+                    fut.set_result(oid)
+
+    def _commit_each(self, c, items):
+        for _, params, fut in items:
+            try:
+                with c:
+                    oid = c.execute(INSERT_ORDER, params).lastrowid
+            except Exception as e:
+                fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += 1
+            fut.set_result(oid)
+
+
+_committer = GroupCommitter()
+
+
 def save_order(chat_id, user_id, order: dict):
+    if GROUP_COMMIT:
+        return _committer.submit(chat_id, user_id, order).result()
     c = get_conn()
     with c:
-        c.execute('''INSERT INTO orders (chat_id,user_id,raw_text,side,quantity,symbol,base_asset,quote_asset,order_type,price) VALUES (?,?,?,?,?,?,?,?,?,?)''', (
-            str(chat_id), str(user_id), order.get('raw_text'), order.get('side'), order.get('quantity'), order.get('symbol'), order.get('base_asset'), order.get('quote_asset'), order.get('order_type'), order.get('price')
-        ))
-        return c.lastrowid
+        return c.execute(INSERT_ORDER, _order_params(chat_id, user_id, order)).lastrowid
+
+
+def get_order(order_id):
+    c = get_conn()
+    r = c.execute('SELECT * FROM orders WHERE id = ?', (order_id,)).fetchone()
+    return dict(r) if r else None
 
 
 def list_orders(limit=100):
     c = get_conn()
-    c.row_factory = sqlite3.Row
     cur = c.execute('SELECT * FROM orders ORDER BY id DESC LIMIT ?', (limit,))
     return [dict(r) for r in cur.fetchall()]
 
 
+def sql_time(ts):
+    """datetime / epoch seconds / ISO string -> created_at text (UTC);
+    ValueError for anything else."""
+    if isinstance(ts, (int, float)):
+        ts = datetime.fromtimestamp(ts, timezone.utc)
+    elif isinstance(ts, str):
+        ts = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _order_filter(after_id=None, since=None, until=None, chat_id=None):
+    clauses, params = [], []
+    if after_id:
+        clauses.append('id > ?')
+        params.append(int(after_id))
+    if chat_id is not None:
+        clauses.append('chat_id = ?')
+        params.append(str(chat_id))
+    if since is not None:
+        clauses.append('created_at >= ?')
+        params.append(sql_time(since))
+    if until is not None:
+        clauses.append('created_at < ?')
+        params.append(sql_time(until))
+    return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+
+def iter_order_chunks(after_id=None, since=None, until=None, chat_id=None, limit=None, chunk_size=1000):
+    """Yield lists of order rows (tuples in ORDER_COLUMNS order), oldest
+    first, for orders with id > after_id and since <= created_at < until.
+
+    Keyset pagination on id: each chunk is its own short query, so memory
+    stays at one chunk and no read transaction is held between chunks.
+    """
+    c = get_conn()
+    cols = ','.join(ORDER_COLUMNS)
+    remaining = limit
+    last = after_id or 0
+    while remaining is None or remaining > 0:
+        n = chunk_size if remaining is None else min(chunk_size, remaining)
+        where, params = _order_filter(last, since, until, chat_id)
+        rows = c.execute(f'SELECT {cols} FROM orders{where} ORDER BY id LIMIT ?', (*params, n)).fetchall()
+        if not rows:
+            return
+        yield [tuple(r) for r in rows]
+        last = rows[-1][0]
+        if remaining is not None:
+            remaining -= len(rows)
+        if len(rows) < n:
+            return
+
+
+def next_order_cursor(after_id=None, since=None, until=None, chat_id=None, limit=None):
+    """after_id for the page following iter_order_chunks(..., limit=limit),
+    or None when that page is the last one."""
+    if not limit:
+        return None
+    where, params = _order_filter(after_id, since, until, chat_id)
+    c = get_conn()
+    rows = c.execute(f'SELECT id FROM orders{where} ORDER BY id LIMIT 2 OFFSET ?', (*params, limit - 1)).fetchall()
+    return rows[0][0] if len(rows) == 2 else None
+
+
 def register_webhook(name, url, token):
     c = get_conn()
     with c:
-        c.execute('INSERT INTO webhooks (name,url,token) VALUES (?,?,?)', (name, url, token))
-        return c.lastrowid
+        return c.execute('INSERT INTO webhooks (name,url,token) VALUES (?,?,?)', (name, url, token)).lastrowid
 
 
 def list_webhooks():
     c = get_conn()
-    c.row_factory = sqlite3.Row
     cur = c.execute('SELECT * FROM webhooks ORDER BY id DESC')
     return [dict(r) for r in cur.fetchall()]
+
+
+if __name__ == '__main__':
+    import sys
+    import tempfile
+    import time
+
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    order = {'raw_text': 'купи 0.01 BTC', 'side': 'BUY', 'quantity': 0.01, 'symbol': 'BTCUSDT',
+             'base_asset': 'BTC', 'quote_asset': 'USDT', 'order_type': 'MARKET', 'price': None}
+
+    def legacy_save(path, chat_id):
+        # the previous behaviour: new connection per call, rollback journal, never closed
+        c = sqlite3.connect(path, timeout=30.0)
+        with c:
+            return c.execute(INSERT_ORDER, _order_params(chat_id, 1, order)).lastrowid
+
+    def run(label, fn):
+        errors = []
+
+        def writer(t):
+            try:
+                for _ in range(per_thread):
+                    fn(1000 + t)
+            except Exception as e:
+                errors.append(e)
+
+        ts = [threading.Thread(target=writer, args=(t,)) for t in range(threads)]
+        t0 = time.perf_counter()
+        for t in ts:
+            t.start()
+        for t in ts:
+            t.join()
+        took = time.perf_counter() - t0
+        n = threads * per_thread
+        print(f'{label:<32} {n / took:>9,.0f} orders/s  ({n} orders, {threads} threads, {len(errors)} errors)')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, 'legacy.db')
+        c = sqlite3.connect(legacy)
+        c.executescript(SCHEMA)
+        c.close()
+        run('per-call connect, rollback', lambda chat: legacy_save(legacy, chat))
+
+        for sync in ('NORMAL', 'FULL'):
+            SYNCHRONOUS = sync
+            DB_PATH = os.path.join(tmp, f'direct-{sync}.db')
+            GROUP_COMMIT = False
+            run(f'thread-local, WAL, {sync}', lambda chat: save_order(chat, 1, order))
+            DB_PATH = os.path.join(tmp, f'group-{sync}.db')
+            GROUP_COMMIT = True
+            rows, batches = _committer.rows, _committer.batches
+            run('  + group commit', lambda chat: save_order(chat, 1, order))
+            print(f'    {_committer.rows - rows} rows in {_committer.batches - batches} transactions')
+            assert len(list_orders(threads * per_thread)) == threads * per_thread
@@ -2,13 +2,16 @@ import sys
 import os
 from datetime import datetime
 import csv
+import io
 import json
+import tempfile
 
 # add ux path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'ux')))
 from parser import parse
 from interactive import DialogManager
 from templates import render_confirmation
+from storage import ORDER_COLUMNS
 
 # simple emoji helpers
 EMOJI = {
@@ -57,36 +60,89 @@ def pretty_timestamp(ts=None):
     return ts.strftime('%Y-%m-%d %H:%M:%S')
 
 
-def export_csv(rows, path):
-    keys = set()
-    for r in rows:
-        keys.update(r.keys())
-    keys = sorted(keys)
-    with open(path, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=keys)
-        writer.writeheader()
-        for r in rows:
-            writer.writerow(r)
+# Streaming exports: each writer takes an iterable of row chunks (lists of
+# tuples in `columns` order, e.g. storage.iter_order_chunks()) and yields
+# the encoded output piece by piece, so memory stays at one chunk.
 
+def _take(buf):
+    data = buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+    return data
 
-def export_json(rows, path):
-    with open(path, 'w') as f:
-        json.dump(rows, f, indent=2, default=str)
+
+def stream_csv(chunks, columns=ORDER_COLUMNS):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    yield _take(buf)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield _take(buf)
+
+
+def _json_rows(rows, columns):
+    return [json.dumps(dict(zip(columns, r)), ensure_ascii=False, default=str) for r in rows]
+
+
+def stream_ndjson(chunks, columns=ORDER_COLUMNS):
+    for rows in chunks:
+        if rows:
+            yield '\n'.join(_json_rows(rows, columns)) + '\n'
+
+
+def stream_json(chunks, columns=ORDER_COLUMNS):
+    """One JSON array, written incrementally."""
+    yield '['
+    sep = '\n'
+    for rows in chunks:
+        if rows:
+            yield sep + ',\n'.join(_json_rows(rows, columns))
+            sep = ',\n'
+    yield '\n]\n'
 
 
-def export_excel(rows, path):
+def stream_xlsx(chunks, columns=ORDER_COLUMNS, spool_size=8 * 1024 * 1024, block_size=64 * 1024):
+    """openpyxl write-only workbook (rows are not kept in memory). The
+    finished file is spooled in memory up to spool_size, then in an
+    anonymous temporary file, and yielded in block_size pieces."""
     try:
         from openpyxl import Workbook
-        wb = Workbook()
-        ws = wb.active
-        if not rows:
-            wb.save(path)
-            return
-        keys = sorted(set().union(*[set(r.keys()) for r in rows]))
-        ws.append(keys)
+    except ImportError:
+        # fallback: CSV content (not a real xlsx but acceptable for prototype)
+        for part in stream_csv(chunks, columns):
+            yield part.encode('utf-8')
+        return
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('orders')
+    ws.append(list(columns))
+    for rows in chunks:
         for r in rows:
-            ws.append([r.get(k) for k in keys])
-        wb.save(path)
-    except Exception:
-        # fallback: write CSV with .xlsx extension (not a real xlsx but acceptable for prototype)
-        export_csv(rows, path)
+            ws.append(list(r))
+    with tempfile.SpooledTemporaryFile(max_size=spool_size) as f:
+        wb.save(f)
+        f.seek(0)
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            yield block
+
+
+def _as_chunks(rows, columns):
+    return [[tuple(r.get(k) for k in columns) for r in rows]]
+
+
+def export_csv(rows, path, columns=ORDER_COLUMNS):
+    with open(path, 'w', newline='') as f:
+        f.writelines(stream_csv(_as_chunks(rows, columns), columns))
+
+
+def export_json(rows, path, columns=ORDER_COLUMNS):
+    with open(path, 'w') as f:
+        f.writelines(stream_json(_as_chunks(rows, columns), columns))
+
+
+def export_excel(rows, path, columns=ORDER_COLUMNS):
+    with open(path, 'wb') as f:
+        f.writelines(stream_xlsx(_as_chunks(rows, columns), columns))
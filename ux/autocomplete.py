@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 """
 Simple autocompletion helper for symbols and base assets.
-Uses a small curated list (extendable by fetching exchange metadata).
+Uses the exchange symbol index (symbol_index.py, ranked by 24h volume) once
+it is loaded, and a small curated list until then.
 """
+from symbol_index import get_index
+
 POPULAR_PAIRS = [
     {'symbol': 'BTCUSDT', 'base': 'BTC', 'quote': 'USDT'},
     {'symbol': 'ETHUSDT', 'base': 'ETH', 'quote': 'USDT'},
@@ -15,6 +18,9 @@ POPULAR_PAIRS = [
 
 
 def suggest_symbols(prefix: str, limit: int = 5):
+    idx = get_index()
+    if len(idx):
+        return idx.suggest(prefix, limit)
     p = prefix.upper()
     res = [x for x in POPULAR_PAIRS if x['base'].startswith(p) or x['symbol'].startswith(p) or x['quote'].startswith(p)]
     return res[:limit]
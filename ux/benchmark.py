@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Parser corpus check, parser throughput and symbol index benchmarks.
+
+    python benchmark.py [parses]
+
+Checks parser.parse against every command in corpus.json (RU / EN commands
+from examples.md and the README, with the expected dict minus raw_text),
+then times parses per second over the corpus (target: 100k/s) next to the
+previous multi-pass parser.
+
+The symbol index part serves a synthetic ~2,000-pair exchangeInfo from a
+local stand-in: first load (background download), cached start, ETag
+revalidation (304), prefix lookups against a linear scan, and the corpus
+again with the full index.
+"""
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import symbol_index
+from parser import SIDE_MAP, ORDER_TYPE_KEYWORDS, parse
+from symbol_index import IndexLoader, SymbolIndex
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus.json')
+
+
+def load_corpus(path=CORPUS):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def check(corpus):
+    """List of (text, field, expected, got) mismatches."""
+    bad = []
+    for case in corpus:
+        got = parse(case['text'])
+        if got['raw_text'] != case['text'].strip():
+            bad.append((case['text'], 'raw_text', case['text'].strip(), got['raw_text']))
+        for k, v in case['expected'].items():
+            if got.get(k) != v:
+                bad.append((case['text'], k, v, got.get(k)))
+    return bad
+
+
+def legacy_parse(text):
+    # the previous parser: one regex search (or compile) per concept and keyword
+    text = text.strip()
+    side = next((v for k, v in SIDE_MAP.items() if re.search(rf"\b{k}\b", text, re.IGNORECASE)), None)
+    order_type = next((v for k, v in ORDER_TYPE_KEYWORDS.items() if k in text.lower()), None)
+    qty = None
+    tokens = re.split(r"\s+", text)
+    for i, tok in enumerate(tokens):
+        if qty is None and tok.lower() in SIDE_MAP:
+            for j in range(i + 1, min(i + 4, len(tokens))):
+                m = re.match(r"(\d+(?:[\.,]\d+)?)", tokens[j])
+                if m:
+                    qty = float(m.group(1).replace(',', '.'))
+                    break
+    if qty is None:
+        m = re.search(r"(\d+(?:[\.,]\d+)?)", text)
+        qty = float(m.group(1).replace(',', '.')) if m else None
+    sym = None
+    m = re.search(r"([A-Za-z]{2,6})(?:/|\s*)?([A-Za-z]{2,6})", text)
+    if m:
+        sym = (m.group(1).upper(), m.group(2).upper())
+    else:
+        t = re.search(r"\b([A-Za-z]{5,10})\b", text)
+        if t:
+            s = t.group(1).upper()
+            sym = next(((s[:-len(q)], q) for q in ['USDT', 'USDC', 'BTC', 'ETH', 'BNB'] if s.endswith(q) and len(s) > len(q)), None)
+    m = re.search(r"(по цене|at)\s*(\d+[\.,]?\d*)", text.lower()) or re.search(r"\b(\d+[\.,]?\d*)\s*(?:\$|usd|usdt)?\b", text.lower())
+    price = float(m.group(m.lastindex).replace(',', '.')) if m else None
+    if price and order_type is None:
+        order_type = 'LIMIT'
+    if order_type != 'LIMIT':
+        price = None
+    return {'raw_text': text, 'side': side, 'quantity': qty, 'order_type': order_type, 'price': price,
+            'symbol': f'{sym[0]}{sym[1]}' if sym else None, 'base_asset': sym[0] if sym else None,
+            'quote_asset': sym[1] if sym else None}
+
+
+def throughput(fn, texts, n):
+    k = len(texts)
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(texts[i % k])
+    return n / (time.perf_counter() - t0)
+
+
+LISTED = ['BTC', 'ETH', 'BNB', 'SOL', 'XRP', 'DOGE', 'ADA', 'TRX', 'LINK', 'AVAX', 'DOT', 'PEPE', 'ARB', 'TON',
+          'SHIB', 'LTC', 'NEAR', 'APT', 'OP', 'SUI', 'WBTC', 'FET', 'INJ', 'ATOM', 'FIL']
+QUOTE_ODDS = (('USDT', 1.0), ('FDUSD', 0.3), ('USDC', 0.3), ('BTC', 0.4), ('ETH', 0.15), ('BNB', 0.15),
+              ('TRY', 0.25), ('EUR', 0.1), ('BRL', 0.05), ('JPY', 0.03))
+
+
+def synthetic_exchange(n_pairs=2000, seed=7):
+    """(exchangeInfo body, ticker/24hr rows) with about n_pairs pairs."""
+    rng = random.Random(seed)
+    usd = {'BTC': 60000.0, 'ETH': 3000.0, 'BNB': 550.0, 'EUR': 1.08, 'BRL': 0.18}
+    bases = list(LISTED)
+    seen = set(bases) | {q for q, _ in QUOTE_ODDS}
+    symbols, tickers = [], []
+
+    def add(base, quote, vol_usd, price):
+        sym = base + quote
+        symbols.append({'symbol': sym, 'status': 'TRADING', 'baseAsset': base, 'quoteAsset': quote})
+        quote_usd = usd.get(quote, 1.0) if quote != 'TRY' else 1 / 33.0
+        tickers.append({'symbol': sym, 'lastPrice': str(price), 'quoteVolume': f'{vol_usd / quote_usd:.2f}'})
+
+    for q in ('BTC', 'ETH', 'BNB', 'EUR', 'BRL'):
+        add(q, 'USDT', 1e8, usd[q])
+    add('USDT', 'TRY', 5e7, 33.0)
+    rank = 0
+    while len(symbols) < n_pairs:
+        if rank >= len(bases):
+            name = ''.join(rng.choice('ABCDEFGHIJKLMNOPRSTUVWXYZ') for _ in range(rng.randint(3, 5)))
+            if name in seen:
+                continue
+            seen.add(name)
+            bases.append(name)
+        base = bases[rank]
+        for quote, odds in QUOTE_ODDS:
+            if base != quote and base + quote not in {'BTCUSDT', 'ETHUSDT', 'BNBUSDT'} and \
+                    (base in LISTED or rng.random() < odds):
+                add(base, quote, rng.lognormvariate(13, 2) * (100 if base in LISTED else 1) / (1 + rank / 5), 1.0)
+        rank += 1
+    return {'timezone': 'UTC', 'symbols': symbols}, tickers
+
+
+def serve_exchange(info, tickers, etag='"v1"'):
+    """Local exchangeInfo / ticker/24hr stand-in; returns (server, base_url, hits)."""
+    bodies = {'/api/v3/exchangeInfo': json.dumps(info).encode(), '/api/v3/ticker/24hr': json.dumps(tickers).encode()}
+    hits = {'exchangeInfo': 0, 'not_modified': 0, 'ticker': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            if path == '/api/v3/exchangeInfo':
+                hits['exchangeInfo'] += 1
+                if self.headers.get('If-None-Match') == etag:
+                    hits['not_modified'] += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+            else:
+                hits['ticker'] += 1
+            body = bodies[path]
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            if path == '/api/v3/exchangeInfo':
+                self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}', hits
+
+
+def per_call_us(fn, args, n):
+    k = len(args)
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(args[i % k])
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def bench_index(corpus, n=100_000):
+    info, tickers = synthetic_exchange()
+    server, base_url, hits = serve_exchange(info, tickers)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'symbols.json')
+        loader = IndexLoader(path=path, base_url=base_url, max_age=3600)
+        t0 = time.perf_counter()
+        first = loader.get()
+        t_get = time.perf_counter() - t0
+        loader.ready.wait(60)
+        t_ready = time.perf_counter() - t0
+        idx = loader.get()
+        print(f'index: {len(idx)} pairs, {len(idx.quotes)} quotes; first get_index() returned in {t_get * 1000:.2f}ms '
+              f'with {len(first)} pairs, download + build done after {t_ready * 1000:.0f}ms')
+
+        t0 = time.perf_counter()
+        cached = IndexLoader(path=path, base_url=base_url, max_age=3600).get()
+        print(f'restart from disk cache: {len(cached)} pairs in {(time.perf_counter() - t0) * 1000:.1f}ms, '
+              f'exchangeInfo requests so far {hits["exchangeInfo"]}')
+
+        data = symbol_index.read_cache(path)
+        data['fetched_at'] -= 7200
+        symbol_index.write_cache(data, path)
+        stale = IndexLoader(path=path, base_url=base_url, max_age=3600)
+        stale.get()
+        stale.ready.wait(60)
+        print(f'stale cache revalidated: {hits["not_modified"]} x 304 Not Modified, {len(stale.get())} pairs, '
+              f'error {stale.error}')
+    server.shutdown()
+
+    pairs = [{'symbol': r['symbol'], 'base': r['baseAsset'], 'quote': r['quoteAsset']} for r in info['symbols']]
+
+    def linear(prefix, limit=5):
+        # the previous suggest_symbols over the same pairs (unranked)
+        p = prefix.upper()
+        return [x for x in pairs if x['base'].startswith(p) or x['symbol'].startswith(p) or x['quote'].startswith(p)][:limit]
+
+    prefixes = ['b', 'BT', 'BTC', 'eth', 'US', 'DOGE', 'X', 'SOLU', 'FD', 'zz']
+    names = [r['symbol'] for r in info['symbols'][::97]] + ['DOGEUSDT', 'WBTC', 'NEWCOINUSDT', 'BTCFDUSD']
+    print(f'suggest():   {per_call_us(idx.suggest, prefixes, n):.2f}us per lookup '
+          f'(linear scan over {len(pairs)} pairs: {per_call_us(linear, prefixes, n // 100):.0f}us)')
+    print(f'split():     {per_call_us(idx.split, names, n):.2f}us per symbol')
+    print('suggest("BTC"):', [p['symbol'] for p in idx.suggest('BTC')])
+    print('split:', {s: idx.split(s) for s in ('DOGEUSDT', 'WBTC', 'NEWCOINUSDT', 'BTCFDUSD')})
+
+    symbol_index.set_index(idx)
+    bad = check(corpus)
+    print(f'corpus with the full index: {len(corpus) - len({b[0] for b in bad})}/{len(corpus)}')
+    return bad
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    symbol_index.set_index(SymbolIndex())   # fallback quotes only; no download
+    corpus = load_corpus()
+    bad = check(corpus)
+    for text, field, want, got in bad:
+        print(f'MISMATCH {text!r}: {field} expected {want!r}, got {got!r}')
+    legacy_ok = sum(all(legacy_parse(c['text']).get(k) == v for k, v in c['expected'].items()) for c in corpus)
+    print(f'corpus: {len(corpus) - len({b[0] for b in bad})}/{len(corpus)} commands parsed as expected '
+          f'(previous parser: {legacy_ok}/{len(corpus)})')
+
+    texts = [c['text'] for c in corpus]
+    fast = throughput(parse, texts, n)
+    slow = throughput(legacy_parse, texts, n // 4)
+    print(f'single-pass parse: {fast:>10,.0f} parses/s ({1e6 / fast:.1f} us each)')
+    print(f'previous parser:   {slow:>10,.0f} parses/s ({1e6 / slow:.1f} us each)  x{fast / slow:.1f}')
+
+    bad += bench_index(corpus)
+    for text, field, want, got in bad:
+        print(f'MISMATCH {text!r}: {field} expected {want!r}, got {got!r}')
+    sys.exit(1 if bad else 0)
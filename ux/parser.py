@@ -9,10 +9,30 @@ Examples:
 Notes:
 - Conservative: parser extracts intent and parameters but does not validate against exchange rules.
 - Returns a dict with keys: side, quantity, base_asset, quote_asset (optional), symbol (optional), order_type, price (optional), raw_text
+- Single pass: one precompiled alternation (TOKEN_RE) splits the lowercased
+  text into tokens, and side, quantity, symbol, order type and price are all
+  read off that one token list.
+
+Rules:
+- side: first side word (SIDE_MAP, whole word)
+- quantity: first number within 3 tokens after the side word, else the first number
+  that is not a price
+- price: number after "at" / "@" / "по цене" / "по" / "limit" / "лимит"; otherwise a
+  second number after the quantity ("sell 2 eth 1800")
+- order_type: first market / limit keyword; a price with no keyword means LIMIT,
+  MARKET drops the price
+- symbol: BTC/USDT, BTC-USDT, "BTC USDT" or BTCUSDT (exchange symbol, else longest
+  known quote suffix leaving a base of 2+ letters; see symbol_index.py); a lone
+  base ("купи 0.1 BTC", "buy 2 wbtc") gets DEFAULT_QUOTE
+
+Run `python benchmark.py` (this folder) to check the parser against the
+command corpus (corpus.json) and measure parses/s.
 """
 import re
 from typing import Optional, Dict
 
+from symbol_index import get_index
+
 SIDE_MAP = {
     'куп': 'BUY', 'купи': 'BUY', 'купить': 'BUY', 'покупаю': 'BUY', 'buy': 'BUY', 'b': 'BUY',
     'прод': 'SELL', 'продай': 'SELL', 'продать': 'SELL', 'sell': 'SELL', 's': 'SELL'
@@ -23,102 +43,176 @@ ORDER_TYPE_KEYWORDS = {
     'limit': 'LIMIT', 'лимит': 'LIMIT', 'по цене': 'LIMIT'
 }
 
-SYMBOL_RE = re.compile(r"([A-Za-z]{2,6})(?:/|\s*)?([A-Za-z]{2,6})")
-AMOUNT_RE = re.compile(r"(\d+(?:[\.,]\d+)?)")
-PRICE_RE = re.compile(r"(по цене|at)\s*(\d+[\.,]?\d*)")
+DEFAULT_QUOTE = 'USDT'
+
+# latin words that are never asset names
+STOP_WORDS = frozenset((
+    'a', 'an', 'the', 'i', 'me', 'my', 'please', 'pls', 'now', 'place', 'order', 'for', 'of', 'with', 'to',
+    'price', 'want', 'id', 'like', 'all', 'some', 'usd',
+))
+
+# one alternation for the whole command: (number, word, connector); keywords
+# are then told apart by dict lookups on the word
+TOKEN_RE = re.compile(r"(\d+(?:[.,]\d+)?)|([^\W\d_]+)|([/@-])")
+
+# word -> (kind, value). Single-word order type keywords match as prefixes
+# (рыночным, лимитный); two-word ones ('по рынку', 'по цене') by the word
+# after the first
+_WORDS = {k: ('side', v) for k, v in SIDE_MAP.items()}
+_WORDS['at'] = ('at', None)
+_WORDS.update((w, ('stop', None)) for w in STOP_WORDS)
+_TYPE_PREFIXES = {}
+_FOLLOWERS = {}
+for _k, _v in ORDER_TYPE_KEYWORDS.items():
+    _first, *_rest = _k.split()
+    if _rest:
+        _WORDS[_first] = ('lead', None)
+        _FOLLOWERS.setdefault(_first, {})[_rest[0]] = _v
+    else:
+        _TYPE_PREFIXES[_k[:5]] = (_k, _v)
 
 
 def normalize_num(s: str) -> float:
     return float(s.replace(',', '.'))
 
 
+def split_symbol(s: str) -> Optional[Dict[str, str]]:
+    """BTCUSDT -> {'base': 'BTC', 'quote': 'USDT', 'symbol': 'BTCUSDT'}, or None
+    when s is a base asset or does not end with a known quote asset."""
+    sym = get_index().split(s)
+    return {'base': sym[0], 'quote': sym[1], 'symbol': sym[0] + sym[1]} if sym else None
+
+
+# word -> (kind, value) for every word seen so far (bounded)
+_kinds = dict(_WORDS)
+
+
+def _word_kind(w: str):
+    p = _TYPE_PREFIXES.get(w[:5])
+    if p is not None and w.startswith(p[0]):
+        k = ('type', p[1])
+    elif w.isascii() and len(w) > 1:
+        k = ('asset', None)
+    else:
+        k = ('other', None)
+    if len(_kinds) > 50_000:
+        _kinds.clear()
+        _kinds.update(_WORDS)
+    _kinds[w] = k
+    return k
+
+
+def _scan(text: str):
+    """(side, quantity, order_type, price, (base, quote) or None) in one
+    pass over TOKEN_RE tokens."""
+    side = order_type = None
+    side_at = -1
+    price_next = False   # previous token was at / @ / limit / лимит / по цене / по
+    lead = None          # words that complete a two-word keyword started by the previous word
+    joined = False       # previous token was a / or - (BTC/USDT)
+    nums = []            # (token index, text, is an explicit price)
+    assets = []          # (token index, latin word, joined to the previous word)
+    i = 0
+    for num, word, conn in TOKEN_RE.findall(text.lower()):
+        if conn:
+            if conn == '@':
+                price_next = True
+            else:
+                joined = True
+            continue
+        if num:
+            nums.append((i, num, price_next))
+            price_next = False
+        else:
+            kind, value = _kinds.get(word) or _word_kind(word)
+            if lead is not None and word in lead:
+                kind, value = 'type', lead[word]
+            if kind == 'type':
+                if order_type is None:
+                    order_type = value
+            elif kind == 'side':
+                if side is None:
+                    side, side_at = value, i
+            elif kind == 'asset':
+                assets.append((i, word, joined))
+            lead = _FOLLOWERS[word] if kind == 'lead' else None
+            price_next = kind == 'at' or kind == 'lead' or value == 'LIMIT'
+        joined = False
+        i += 1
+
+    qty = price = None
+    if nums:
+        q = None
+        if side_at >= 0:
+            for n in nums:
+                if not n[2] and 0 < n[0] - side_at <= 3:
+                    q = n
+                    break
+        for n in nums:
+            if n[2]:
+                if price is None:
+                    price = normalize_num(n[1])
+            elif q is None:
+                q = n
+        if q is not None:
+            qty = normalize_num(q[1])
+            if price is None:
+                for n in nums:
+                    if not n[2] and n[0] > q[0]:
+                        price = normalize_num(n[1])
+                        break
+
+    sym = None
+    if assets:
+        idx = get_index()
+        j, w, _ = assets[0]
+        w = w.upper()
+        nxt = assets[1] if len(assets) > 1 else None
+        if nxt is not None and nxt[0] == j + 1 and (nxt[2] or idx.is_quote(nxt[1].upper())):
+            sym = (w, nxt[1].upper())
+        else:
+            sym = idx.split(w)
+            if sym is None and w != DEFAULT_QUOTE:
+                sym = (w, DEFAULT_QUOTE)
+    return side, qty, order_type, price, sym
+
+
 def parse_symbol(text: str) -> Optional[Dict[str, str]]:
-    m = SYMBOL_RE.search(text)
-    if m:
-        a, b = m.group(1).upper(), m.group(2).upper()
-        return {'base': a, 'quote': b, 'symbol': f'{a}{b}'}
-    # try single token like BTCUSDT
-    t = re.search(r"\b([A-Za-z]{5,10})\b", text)
-    if t:
-        s = t.group(1).upper()
-        # heuristic: split by common quote assets
-        for q in ['USDT', 'USDC', 'BTC', 'ETH', 'BNB']:
-            if s.endswith(q) and len(s) > len(q):
-                return {'base': s[:-len(q)], 'quote': q, 'symbol': s}
-    return None
+    sym = _scan(text)[4]
+    return {'base': sym[0], 'quote': sym[1], 'symbol': sym[0] + sym[1]} if sym else None
 
 
 def parse_side(text: str) -> Optional[str]:
-    for k, v in SIDE_MAP.items():
-        if re.search(rf"\b{k}\b", text, re.IGNORECASE):
-            return v
-    return None
+    return _scan(text)[0]
 
 
 def parse_order_type(text: str) -> Optional[str]:
-    for k, v in ORDER_TYPE_KEYWORDS.items():
-        if k in text.lower():
-            return v
-    return None
+    return _scan(text)[2]
 
 
 def parse_quantity(text: str) -> Optional[float]:
-    # find quantity near keywords like buy/sell/купи
-    tokens = re.split(r"\s+", text)
-    for i, tok in enumerate(tokens):
-        if tok.lower() in SIDE_MAP:
-            # look next tokens for numbers
-            for j in range(i+1, min(i+4, len(tokens))):
-                m = AMOUNT_RE.match(tokens[j])
-                if m:
-                    return normalize_num(m.group(1))
-    # fallback: first number
-    m = AMOUNT_RE.search(text)
-    if m:
-        return normalize_num(m.group(1))
-    return None
+    return _scan(text)[1]
 
 
 def parse_price(text: str) -> Optional[float]:
-    m = PRICE_RE.search(text.lower())
-    if m:
-        return normalize_num(m.group(2))
-    # try pattern like "at 1800" or "1800$"
-    m2 = re.search(r"\b(\d+[\.,]?\d*)\s*(?:\$|usd|usdt)?\b", text.lower())
-    if m2:
-        return normalize_num(m2.group(1))
-    return None
+    return _scan(text)[3]
 
 
 def parse(text: str) -> Dict:
     text = text.strip()
-    res = {
-        'raw_text': text,
-        'side': parse_side(text),
-        'quantity': parse_quantity(text),
-        'order_type': parse_order_type(text),
-        'price': None,
-        'symbol': None,
-        'base_asset': None,
-        'quote_asset': None,
-    }
-    sym = parse_symbol(text)
-    if sym:
-        res['symbol'] = sym['symbol']
-        res['base_asset'] = sym['base']
-        res['quote_asset'] = sym['quote']
-    # price only if limit or explicit
-    price = parse_price(text)
-    if price and res['order_type'] == 'LIMIT':
-        res['price'] = price
-    elif price and res['order_type'] is None:
-        # if there's a price and no type, assume LIMIT
-        res['price'] = price
-        res['order_type'] = 'LIMIT'
+    side, qty, order_type, price, sym = _scan(text)
+    # price only if limit or explicit; a price with no type means LIMIT
+    if price is not None and order_type is None:
+        order_type = 'LIMIT'
     # if order type explicit market, clear price
-    if res['order_type'] == 'MARKET':
-        res['price'] = None
-    return res
+    if order_type == 'MARKET':
+        price = None
+    if sym:
+        base, quote = sym
+        return {'raw_text': text, 'side': side, 'quantity': qty, 'order_type': order_type, 'price': price,
+                'symbol': base + quote, 'base_asset': base, 'quote_asset': quote}
+    return {'raw_text': text, 'side': side, 'quantity': qty, 'order_type': order_type, 'price': price,
+            'symbol': None, 'base_asset': None, 'quote_asset': None}
 
 
 if __name__ == '__main__':
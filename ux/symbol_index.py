@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Exchange symbol index for autocomplete and symbol parsing.
+
+Built from /api/v3/exchangeInfo (TRADING pairs) and ranked by 24h volume
+(/api/v3/ticker/24hr quoteVolume, converted to USDT):
+- prefix trie over symbols, base assets and quote assets; each trie node
+  keeps its best-ranked symbols, so a lookup is one dict step per prefix
+  character, however many pairs are listed
+- split(): exact symbol -> (base, quote) from the exchange data; a known
+  base asset is never split; anything else by its longest quote suffix,
+  leaving a base of at least MIN_BASE_LEN characters. Without exchange data
+  the wrapped / staked assets in FALLBACK_BASES count as known bases, so
+  "WBTC" parses the same before and after the index loads
+
+Loading is lazy and never waits on the network: the first get_index() reads
+the disk cache (if any) and, when it is missing or older than MAX_AGE,
+refreshes it on a background thread. Until then an empty index answers with
+the fallback quote list. Refreshes are conditional (If-None-Match /
+If-Modified-Since); the cache file records its format version and the
+exchangeInfo ETag / Last-Modified.
+
+    python symbol_index.py [prefix]    # wait for the index, print suggestions
+"""
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+BINANCE_API = os.environ.get('BINANCE_API', 'https://api.binance.com').rstrip('/')
+CACHE_PATH = os.environ.get('UX_SYMBOLS_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'binance-skill',
+                                                              'exchange_symbols.json'))
+# seconds before the cached index is revalidated
+MAX_AGE = float(os.environ.get('UX_SYMBOLS_MAX_AGE', 6 * 3600))
+# UX_SYMBOLS_OFFLINE=1: use the disk cache only, never download
+OFFLINE = os.environ.get('UX_SYMBOLS_OFFLINE', '0') == '1'
+CACHE_FORMAT = 1
+
+# quote assets known without exchange data
+FALLBACK_QUOTES = ('FDUSD', 'USDT', 'USDC', 'BUSD', 'TUSD', 'BTC', 'ETH', 'BNB', 'EUR', 'TRY')
+# assets ending with a quote asset that are bases themselves (without exchange data)
+FALLBACK_BASES = ('WBTC', 'WETH', 'WBNB', 'WBETH', 'BETH', 'STETH', 'WSTETH', 'CBETH', 'RETH', 'SETH')
+# shortest base split off by a quote suffix
+MIN_BASE_LEN = 2
+# quoted in USD already (volume ranking)
+STABLE_QUOTES = frozenset(('USDT', 'USDC', 'FDUSD', 'BUSD', 'TUSD', 'DAI', 'USDP', 'USD'))
+
+
+class _Node:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+
+class SymbolIndex:
+    def __init__(self, pairs=(), top_k=20):
+        """pairs: (symbol, base, quote, volume) tuples or exchangeInfo symbol
+        dicts (volume 0). top_k bounds the suggestions kept per prefix."""
+        rows = []
+        for p in pairs:
+            if isinstance(p, dict):
+                rows.append((p['symbol'], p['baseAsset'], p['quoteAsset'], 0.0))
+            else:
+                rows.append((p[0], p[1], p[2], float(p[3]) if len(p) > 3 else 0.0))
+        rows.sort(key=lambda r: (-r[3], r[0]))
+        self.top_k = top_k
+        self.volume = {r[0]: r[3] for r in rows}
+        self.pairs = {r[0]: {'symbol': r[0], 'base': r[1], 'quote': r[2]} for r in rows}
+        self.bases = frozenset(r[1] for r in rows) or frozenset(FALLBACK_BASES)
+        self.quotes = frozenset(r[2] for r in rows) or frozenset(FALLBACK_QUOTES)
+        self._quote_lengths = sorted({len(q) for q in self.quotes}, reverse=True)
+        self._root = _Node()
+        # symbols arrive best-ranked first, so each node's list is already in
+        # rank order and stops growing at top_k
+        for sym, base, quote, _ in rows:
+            for key in (sym, base, quote):
+                node = self._root
+                for ch in key:
+                    nxt = node.children.get(ch)
+                    if nxt is None:
+                        nxt = node.children[ch] = _Node()
+                    node = nxt
+                    top = node.top
+                    if len(top) < top_k and (not top or top[-1] is not sym):
+                        top.append(sym)
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[Dict[str, str]]:
+        """Pairs whose symbol, base or quote starts with prefix, highest 24h
+        volume first (at most top_k)."""
+        node = self._root
+        for ch in prefix.upper():
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        pairs = self.pairs
+        return [pairs[s] for s in node.top[:limit]]
+
+    def is_quote(self, asset: str) -> bool:
+        return asset in self.quotes
+
+    def split(self, s: str) -> Optional[Tuple[str, str]]:
+        """BTCUSDT -> ('BTC', 'USDT'); None for a base asset or no known quote."""
+        s = s.upper()
+        p = self.pairs.get(s)
+        if p is not None:
+            return p['base'], p['quote']
+        if s in self.bases:
+            return None
+        n = len(s)
+        for k in self._quote_lengths:
+            if n - k >= MIN_BASE_LEN and s[-k:] in self.quotes:
+                return s[:-k], s[-k:]
+        return None
+
+
+def _get_json(url, headers=None, timeout=15.0):
+    """(status, response headers, parsed body or None for 304)."""
+    req = urllib.request.Request(url, headers={'Accept-Encoding': 'identity', **(headers or {})})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            return r.status, r.headers, json.loads(r.read())
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return 304, e.headers, None
+        raise
+
+
+def usd_volumes(pairs, tickers) -> List[Tuple[str, str, str, float]]:
+    """(symbol, base, quote) pairs + /api/v3/ticker/24hr rows ->
+    (symbol, base, quote, 24h volume in USDT). Other quotes are converted at
+    the QUOTEUSDT (or inverse USDTQUOTE) last price; pairs with no ticker or
+    no conversion rank as 0."""
+    last = {t['symbol']: float(t.get('lastPrice') or 0) for t in tickers}
+    qvol = {t['symbol']: float(t.get('quoteVolume') or 0) for t in tickers}
+    rates = {}
+    out = []
+    for sym, base, quote in pairs:
+        rate = rates.get(quote)
+        if rate is None:
+            if quote in STABLE_QUOTES:
+                rate = 1.0
+            elif last.get(quote + 'USDT'):
+                rate = last[quote + 'USDT']
+            else:
+                inverse = last.get('USDT' + quote)
+                rate = 1.0 / inverse if inverse else 0.0
+            rates[quote] = rate
+        out.append((sym, base, quote, round(qvol.get(sym, 0.0) * rate, 2)))
+    return out
+
+
+def fetch_pairs(base_url=BINANCE_API, etag=None, last_modified=None, timeout=15.0):
+    """Conditional exchangeInfo request plus the 24h tickers. Returns
+    (TRADING (symbol, base, quote) pairs, or None when not modified; etag;
+    last_modified; ticker rows)."""
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    status, h, info = _get_json(f'{base_url}/api/v3/exchangeInfo', headers, timeout)
+    pairs = None
+    if status != 304:
+        pairs = [(s['symbol'], s['baseAsset'], s['quoteAsset']) for s in info['symbols']
+                 if s.get('status', 'TRADING') == 'TRADING']
+    _, _, tickers = _get_json(f'{base_url}/api/v3/ticker/24hr?type=MINI', timeout=timeout)
+    return pairs, h.get('ETag') or etag, h.get('Last-Modified') or last_modified, tickers
+
+
+def read_cache(path=CACHE_PATH) -> Optional[dict]:
+    """Cached index data, or None when missing, unreadable or of another format."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if data.get('format') == CACHE_FORMAT else None
+
+
+def write_cache(data, path=CACHE_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+class IndexLoader:
+    # seconds before a failed refresh is retried
+    RETRY_AFTER = 60.0
+
+    def __init__(self, path=CACHE_PATH, base_url=BINANCE_API, max_age=MAX_AGE, offline=OFFLINE):
+        self.path = path
+        self.base_url = base_url
+        self.max_age = max_age
+        self.offline = offline
+        self.index = SymbolIndex()
+        self.fetched_at = 0.0
+        self.error = None
+        self.ready = threading.Event()   # set once the first refresh (or cache read) is done
+        self._data = None
+        self._lock = threading.Lock()
+        self._started = False
+        self._refreshing = False
+        self._next_check = float('inf')
+
+    def get(self) -> SymbolIndex:
+        """Current index; never blocks on the network."""
+        if not self._started:
+            self._start()
+        elif time.time() >= self._next_check:
+            self.refresh_async()
+        return self.index
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            data = read_cache(self.path)
+            if data:
+                self._data = data
+                self.index = SymbolIndex(data['pairs'])
+                self.fetched_at = data['fetched_at']
+            self._started = True
+        if self.offline:
+            self.ready.set()
+        elif time.time() - self.fetched_at < self.max_age:
+            self._next_check = self.fetched_at + self.max_age
+            self.ready.set()
+        else:
+            self.refresh_async()
+
+    def refresh_async(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            self._next_check = time.time() + self.RETRY_AFTER
+        threading.Thread(target=self._refresh, name='symbol-index', daemon=True).start()
+
+    def _refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            self.error = repr(e)
+            print('symbol index refresh failed:', e)
+        finally:
+            self._refreshing = False
+            self.ready.set()
+
+    def refresh(self):
+        """Revalidate exchangeInfo, re-rank by 24h volume, swap the index in
+        and rewrite the disk cache (blocking)."""
+        old = self._data or {}
+        pairs, etag, last_modified, tickers = fetch_pairs(self.base_url, old.get('etag'), old.get('last_modified'))
+        if pairs is None:
+            pairs = [tuple(p[:3]) for p in old['pairs']]
+        rows = usd_volumes(pairs, tickers)
+        self.index = SymbolIndex(rows)
+        self.fetched_at = time.time()
+        self._next_check = self.fetched_at + self.max_age
+        self.error = None
+        self._data = {'format': CACHE_FORMAT, 'etag': etag, 'last_modified': last_modified,
+                      'fetched_at': self.fetched_at, 'pairs': rows}
+        write_cache(self._data, self.path)
+
+
+_loader = IndexLoader()
+
+
+def get_index() -> SymbolIndex:
+    """The shared index (loaded lazily; empty until the first download)."""
+    return _loader.get()
+
+
+def set_index(index: SymbolIndex):
+    """Use a prebuilt index from now on (no disk cache or download)."""
+    global _loader
+    loader = IndexLoader(offline=True)
+    loader.index = index
+    loader._started = True
+    loader.ready.set()
+    _loader = loader
+
+
+def wait_ready(timeout: Optional[float] = None) -> bool:
+    """Block until the first load finishes (for scripts; bots should not)."""
+    _loader.get()
+    return _loader.ready.wait(timeout)
+
+
+if __name__ == '__main__':
+    import sys
+    prefix = sys.argv[1] if len(sys.argv) > 1 else 'BTC'
+    t0 = time.perf_counter()
+    get_index()
+    print(f'get_index() returned after {(time.perf_counter() - t0) * 1000:.1f}ms')
+    wait_ready(60)
+    idx = get_index()
+    print(f'{len(idx)} pairs, {len(idx.quotes)} quote assets, cache {_loader.path}, error {_loader.error}')
+    t0 = time.perf_counter()
+    for _ in range(10_000):
+        res = idx.suggest(prefix)
+    print(f'suggest({prefix!r}): {(time.perf_counter() - t0) / 10_000 * 1e6:.2f}us', [p['symbol'] for p in res])